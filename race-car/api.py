@@ -1,24 +1,97 @@
+import os
+import json
 import time
+import atexit
+import logging
 import uvicorn
 import datetime
-from fastapi import Body, FastAPI
+from functools import lru_cache
+from typing import Optional
+from fastapi import Body, FastAPI, Header, Response
 from dtos import RaceCarPredictRequestDto, RaceCarPredictResponseDto
 
 # from pyngrok import ngrok
 from heuristic import HeuristicAgent
+from planner import PlannerAgent
+from mlp_policy import MlpPolicy
+from sessions import AgentSessions
+from request_log import RequestRecorder
 
 app = FastAPI()
 start_time = time.time()
-
-agent = HeuristicAgent()
-
-
+logger = logging.getLogger(__name__)
+
+@lru_cache(maxsize=1)
+def load_policy(path: str) -> MlpPolicy:
+    return MlpPolicy.load(path)
+
+
+def new_mlp_policy() -> MlpPolicy:
+    # Read the file once; every game gets its own copy
+    policy = load_policy(os.environ.get("RACE_CAR_POLICY", "policy.npz"))
+    return MlpPolicy(policy.params, policy.hidden, policy.durations)
+
+
+# Pick the agent with RACE_CAR_AGENT=heuristic|planner|mlp
+# (mlp loads the policy saved by train_policy.py from RACE_CAR_POLICY)
+AGENTS = {"heuristic": HeuristicAgent, "planner": PlannerAgent, "mlp": new_mlp_policy}
+
+# Every game gets its own agent, see sessions.py
+sessions = AgentSessions(
+    AGENTS[os.environ.get("RACE_CAR_AGENT", "heuristic")],
+    max_sessions=int(os.environ.get("RACE_CAR_MAX_SESSIONS", 256)),
+    idle_seconds=float(os.environ.get("RACE_CAR_SESSION_IDLE", 600)),
+)
+
+# Opt-in: RACE_CAR_RECORD=requests.bin logs every request and answer (see request_log.py)
+recorder = None
+if os.environ.get("RACE_CAR_RECORD"):
+    recorder = RequestRecorder(
+        os.environ["RACE_CAR_RECORD"],
+        max_bytes=int(float(os.environ.get("RACE_CAR_RECORD_MAX_MB", 64)) * (1 << 20)),
+        backups=int(os.environ.get("RACE_CAR_RECORD_BACKUPS", 5)),
+    )
+    atexit.register(recorder.close)
+
+# The JSON of every action name, so responses are joined instead of serialised
+ENCODED_ACTIONS = {
+    name: json.dumps(name).encode()
+    for name in ["NOTHING", "ACCELERATE", "DECELERATE", "STEER_LEFT", "STEER_RIGHT"]
+}
+
+
+def encode_actions(actions: list[str]) -> bytes:
+    try:
+        return b'{"actions":[' + b",".join([ENCODED_ACTIONS[a] for a in actions]) + b"]}"
+    except KeyError:
+        return RaceCarPredictResponseDto(actions=actions).model_dump_json().encode()
+
+
+# The handler is async, but decide runs right on the event loop: the agents
+# are CPU-bound and hold the GIL, so a thread would not let other requests
+# run any sooner and only adds overhead. Nothing is awaited between picking
+# the session and deciding, so requests of one session never run at once.
 @app.post("/predict", response_model=RaceCarPredictResponseDto)
-def predict(request: RaceCarPredictRequestDto = Body(...)):
-
-    actions = agent.decide(request)
-
-    return RaceCarPredictResponseDto(actions=actions)
+async def predict(
+    request: RaceCarPredictRequestDto = Body(...),
+    x_session_id: Optional[str] = Header(None),
+    x_session_fork: Optional[str] = Header(None),
+):
+
+    agent = sessions.agent_for(request, x_session_id, x_session_fork)
+    if recorder is None:
+        actions = agent.decide(request)
+    else:
+        start = time.perf_counter_ns()
+        actions = agent.decide(request)
+        latency_us = (time.perf_counter_ns() - start) // 1000
+        try:
+            recorder.record(request, actions, latency_us, x_session_id or "")
+        except Exception:
+            # Recording must never fail a prediction (e.g. an unknown action or an out-of-range field)
+            logger.exception("Could not record the request")
+
+    return Response(content=encode_actions(actions), media_type="application/json")
 
 
 @app.get("/api")
@@ -26,6 +99,7 @@ def hello():
     return {
         "service": "race-car-usecase",
         "uptime": "{}".format(datetime.timedelta(seconds=time.time() - start_time)),
+        "sessions": sessions.stats(),
     }
 
 
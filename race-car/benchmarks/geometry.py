@@ -0,0 +1,81 @@
+"""
+Micro-benchmark of the geometry layer and the simulator tick.
+
+Measures the raw simulator (update_game + check_collisions, no agent) in
+ticks per second, with and without reading the sensors on every tick, and
+the per-call cost of the Vector and Car operations used on every tick:
+
+    python -m benchmarks.geometry
+    python -m benchmarks.geometry --ticks 20000 --json geometry.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import timeit
+
+from src.game.core import GameState
+from src.mathematics.vector import Vector
+
+ACTIONS = ["ACCELERATE"] * 20 + ["NOTHING"] * 40 + ["DECELERATE"] * 20
+
+
+def tick_rate(ticks: int, seed: int = 1, read_sensors: bool = False) -> float:
+    """
+    Play one game for the given number of ticks with a fixed action pattern.
+
+    Cars keep moving after a crash, so every tick does the same work.
+
+    :param ticks: The number of ticks to play.
+    :param seed: The seed of the game.
+    :param read_sensors: Whether to compute the sensor readings on every tick.
+    :return: Ticks per second.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = GameState.create("", seed)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        state.update_game(ACTIONS[tick % len(ACTIONS)])
+        state.check_collisions()
+        if read_sensors:
+            state.read_sensors()
+    return ticks / (time.perf_counter() - start)
+
+
+def per_call_ns(statement: str, setup: str, number: int = 200_000) -> float:
+    """The mean time of one statement in nanoseconds (best of 3 runs)."""
+    times = timeit.repeat(statement, setup, number=number, repeat=3, globals=globals())
+    return min(times) / number * 1e9
+
+
+def run(ticks: int) -> dict:
+    state_setup = "state = GameState.create('', 1); state.update_game('NOTHING'); car = state.ego"
+    return {
+        "ticks_per_second": tick_rate(ticks),
+        "ticks_per_second_with_sensors": tick_rate(ticks, read_sensors=True),
+        "ns_vector_add": per_call_ns("a.add(b)", "a = Vector(1.5, 2.5); b = Vector(3.0, 4.0)"),
+        "ns_vector_rotate": per_call_ns("a.rotate(22.5)", "a = Vector(0, -1000)"),
+        "ns_car_rect": per_call_ns("car.rect", state_setup),
+        "ns_check_collisions": per_call_ns("state.check_collisions()", state_setup, 50_000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the geometry layer")
+    parser.add_argument("--ticks", type=int, default=10_000, help="Ticks per tick-rate run")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args.ticks)
+    for name, value in results.items():
+        print(f"{name:32s} {value:12.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], **results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
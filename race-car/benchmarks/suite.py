@@ -0,0 +1,298 @@
+"""
+Benchmark suite with tracked baselines.
+
+Every case runs on fixed seeds and fixed inputs, so two runs do the same
+work and only the timings differ:
+
+    headless     ticks/s of full headless episodes with HeuristicAgent, and
+                 of the raw simulator (update_game + check_collisions)
+    sensors      one sensor update (update_sensors + read_sensors) per number of other cars
+    collisions   one check_collisions per number of other cars
+    decide       HeuristicAgent.decide latency per driving state (the state
+                 the agent was in when it was asked)
+    predict      /predict latency through FastAPI's TestClient
+
+The suite runs repeat rounds and keeps the best value of every metric.
+Results are compared with a JSON baseline; a metric regresses when it is
+worse than the baseline by more than its threshold (a fraction of the
+baseline value). The exit status is 1 if anything regressed:
+
+    python -m benchmarks.suite                        # compare with benchmarks/baseline.json
+    python -m benchmarks.suite --only sensors,decide
+    python -m benchmarks.suite --update-baseline      # after an intended change
+
+Timings depend on the machine, so keep the baseline of the machine you
+measure on, and run the suite before and after every performance change to
+src/ and heuristic.py.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import timeit
+from statistics import median
+
+import numpy as np
+
+from benchmarks.geometry import tick_rate
+from dtos import RaceCarPredictRequestDto
+from heuristic import HeuristicAgent
+from src.elements.car import Car
+from src.game.core import GameState
+from src.game.headless import run_headless
+from src.mathematics.vector import Vector
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+TAIL_THRESHOLD = 0.5  # p95 latencies are noisier than medians
+SEEDS = [100, 101, 102]
+CAR_COUNTS = [0, 1, 2, 4, 8]
+CASES = ["headless", "sensors", "collisions", "decide", "predict"]
+
+
+def metric(value: float, unit: str, higher_is_better: bool = False) -> dict:
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}  # run() adds the case
+
+
+def percentile_ms(times_ns: list[int], q: float) -> float:
+    return float(np.percentile(times_ns, q)) / 1e6
+
+
+# --- Cases -----------------------------------------------------------------------
+def bench_headless() -> dict:
+    ticks = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for seed in SEEDS:
+            ticks += run_headless(seed, agent=HeuristicAgent()).ticks
+    elapsed = time.perf_counter() - start
+    return {
+        "headless_ticks_per_second": metric(ticks / elapsed, "ticks/s", True),
+        "sim_ticks_per_second": metric(tick_rate(10_000), "ticks/s", True),
+    }
+
+
+def state_with_cars(count: int) -> GameState:
+    """
+    A game on seed 1 with the given number of other cars, spread over the lanes
+    and within sensor range of the ego car.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = GameState.create("", 1)
+    lane_height = state.road.get_lane_height()
+    for k in range(count):
+        lane = state.road.lanes[k % len(state.road.lanes)]
+        car = Car("blue", Vector(8, 0), lane=lane, target_height=int(lane_height * 0.8))
+        car.x = 100 + (k * 397) % 1400
+        car.y = int((lane.y_start + lane.y_end) / 2 - car.height / 2)
+        state.cars.append(car)
+    return state
+
+
+def bench_sensors() -> dict:
+    results = {}
+    for count in CAR_COUNTS:
+        state = state_with_cars(count)
+        times = timeit.repeat(
+            "state.update_sensors(); state.read_sensors()", number=500, repeat=5, globals={"state": state}
+        )
+        results[f"sensors_us_cars_{count}"] = metric(min(times) / 500 * 1e6, "us")
+    return results
+
+
+def bench_collisions() -> dict:
+    results = {}
+    for count in CAR_COUNTS:
+        state = state_with_cars(count)
+        times = timeit.repeat("state.check_collisions()", number=20_000, repeat=5, globals={"state": state})
+        results[f"collisions_ns_cars_{count}"] = metric(min(times) / 20_000 * 1e9, "ns")
+    return results
+
+
+class TimedAgent:
+    """Wraps an agent, timing every decide call by the agent's state before the call."""
+
+    def __init__(self, agent: HeuristicAgent):
+        self.agent = agent
+        self.times: dict[str, list[int]] = {}
+        self.requests: list[RaceCarPredictRequestDto] = []
+
+    def decide(self, request: RaceCarPredictRequestDto) -> list[str]:
+        state = self.agent.driving_state.value
+        start = time.perf_counter_ns()
+        actions = self.agent.decide(request)
+        self.times.setdefault(state, []).append(time.perf_counter_ns() - start)
+        self.requests.append(request)
+        return actions
+
+
+def recorded_requests() -> TimedAgent:
+    """Play the benchmark seeds with a TimedAgent around HeuristicAgent."""
+    timed = TimedAgent(HeuristicAgent())
+    with contextlib.redirect_stdout(io.StringIO()):
+        for seed in SEEDS:
+            timed.agent = HeuristicAgent()
+            run_headless(seed, agent=timed)
+    return timed
+
+
+def bench_decide() -> dict:
+    timed = recorded_requests()
+    results = {}
+    for state, times in sorted(timed.times.items()):
+        results[f"decide_us_{state}"] = metric(median(times) / 1e3, "us")
+    every = [t for times in timed.times.values() for t in times]
+    results["decide_us_p95"] = metric(float(np.percentile(every, 95)) / 1e3, "us")
+    return results
+
+
+def bench_predict(count: int = 300) -> dict:
+    from fastapi.testclient import TestClient
+
+    import api
+
+    requests = recorded_requests().requests[:count]
+    bodies = [request.model_dump_json() for request in requests]
+    headers = {"Content-Type": "application/json"}
+    times = []
+    with TestClient(api.app) as client:
+        client.post("/predict", content=bodies[0], headers=headers)  # Warm up
+        for body in bodies:
+            start = time.perf_counter_ns()
+            client.post("/predict", content=body, headers=headers).raise_for_status()
+            times.append(time.perf_counter_ns() - start)
+    return {
+        "predict_ms_p50": metric(percentile_ms(times, 50), "ms"),
+        "predict_ms_p95": metric(percentile_ms(times, 95), "ms"),
+    }
+
+
+BENCHMARKS = {
+    "headless": bench_headless,
+    "sensors": bench_sensors,
+    "collisions": bench_collisions,
+    "decide": bench_decide,
+    "predict": bench_predict,
+}
+
+
+def best(a: dict, b: dict) -> dict:
+    """The better of two measurements of the same metric."""
+    if a["higher_is_better"]:
+        return a if a["value"] >= b["value"] else b
+    return a if a["value"] <= b["value"] else b
+
+
+def run(cases: list[str], repeat: int = 1) -> dict:
+    """
+    Run the cases, keeping the best value of every metric over repeat rounds,
+    which filters out most of the noise of other processes.
+    """
+    metrics = {}
+    for _ in range(repeat):
+        for case in cases:
+            start = time.perf_counter()
+            for name, entry in BENCHMARKS[case]().items():
+                entry["case"] = case
+                metrics[name] = best(metrics[name], entry) if name in metrics else entry
+            print(f"{case:12s} done in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return metrics
+
+
+def default_threshold(name: str) -> float:
+    return TAIL_THRESHOLD if name.endswith("_p95") else DEFAULT_THRESHOLD
+
+
+# --- Baselines -------------------------------------------------------------------
+def load_baseline(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, metrics: dict, old: dict | None = None, cases: list[str] | None = None):
+    """
+    Save metrics as the baseline, keeping the thresholds of the old baseline.
+
+    Old metrics of cases that did not run are kept. Old metrics of the cases
+    that ran, but that they no longer report, are dropped, and so are old
+    metrics of no known case.
+
+    :param cases: The cases that ran (default is the cases of metrics).
+    """
+    old_metrics = (old or {}).get("metrics", {})
+    ran = set(cases) if cases is not None else {entry["case"] for entry in metrics.values()}
+    thresholds = {name: entry.get("threshold", default_threshold(name)) for name, entry in old_metrics.items()}
+    merged = {
+        name: entry
+        for name, entry in old_metrics.items()
+        if entry.get("case") in BENCHMARKS and entry["case"] not in ran
+    }
+    for name, entry in metrics.items():
+        merged[name] = {**entry, "threshold": thresholds.get(name, default_threshold(name))}
+    with open(path, "w") as f:
+        json.dump({"python": sys.version.split()[0], "metrics": merged}, f, indent=2)
+
+
+def compare(metrics: dict, baseline: dict) -> list[dict]:
+    """
+    Compare results with a baseline.
+
+    :return: One row per metric in both, with the relative change of the value,
+        how much worse that is (negative is better), and whether that is beyond
+        the metric's threshold.
+    """
+    rows = []
+    for name, entry in metrics.items():
+        base = baseline.get("metrics", {}).get(name)
+        if base is None or not base["value"]:
+            continue
+        change = (entry["value"] - base["value"]) / base["value"]
+        worse = -change if entry["higher_is_better"] else change
+        threshold = base.get("threshold", default_threshold(name))
+        rows.append(
+            dict(name=name, change=change, worse=worse, threshold=threshold, regressed=worse > threshold)
+        )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--only", default=",".join(CASES), help=f"Comma-separated cases of {CASES}")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare with")
+    parser.add_argument("--repeat", type=int, default=3, help="Rounds to keep the best value of (default: 3)")
+    parser.add_argument("--update-baseline", action="store_true", help="Save the results as the baseline")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    cases = [case for case in args.only.split(",") if case]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"Unknown cases: {sorted(unknown)}")
+
+    metrics = run(cases, args.repeat)
+    baseline = load_baseline(args.baseline) if os.path.exists(args.baseline) else None
+    rows = {row["name"]: row for row in compare(metrics, baseline)} if baseline else {}
+
+    for name, entry in metrics.items():
+        line = f"{name:32s} {entry['value']:12.2f} {entry['unit']:6s}"
+        if name in rows:
+            row = rows[name]
+            line += f" {row['change']:+8.1%}" + ("  REGRESSED" if row["regressed"] else "")
+        print(line)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"python": sys.version.split()[0], "metrics": metrics}, f, indent=2)
+    if args.update_baseline:
+        save_baseline(args.baseline, metrics, baseline, cases)
+        print(f"Saved the baseline to {args.baseline}")
+    elif any(row["regressed"] for row in rows.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
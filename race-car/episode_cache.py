@@ -0,0 +1,97 @@
+"""
+Persistent on-disk cache of episode results, keyed by (agent config, seed).
+
+Episodes are deterministic for a given config, seed, sensor_removal and
+source code, so their results can be reused across tuner runs. Every key
+includes a hash of the simulator and agent source (src/, heuristic.py,
+dtos.py); when any of them changes, old entries no longer match and are
+deleted the next time the cache is opened.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FILES = ["heuristic.py", "dtos.py"]
+SOURCE_DIRS = ["src"]
+
+
+def source_hash(root: str = ROOT) -> str:
+    """Hash of the simulator and agent source code."""
+    paths = [os.path.join(root, f) for f in SOURCE_FILES]
+    for d in SOURCE_DIRS:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(root, d)):
+            dirnames[:] = [n for n in dirnames if n != "__pycache__"]
+            paths += [os.path.join(dirpath, f) for f in filenames if f.endswith(".py")]
+
+    h = hashlib.sha256()
+    for path in sorted(paths):
+        h.update(os.path.relpath(path, root).encode())
+        with open(path, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+class EpisodeCache:
+    def __init__(self, path: str = "episode_cache.sqlite", source: str | None = None):
+        """
+        Open (or create) the cache and drop entries from other source versions.
+
+        :param path: The SQLite file to store the results in.
+        :param source: The source hash to use (default is source_hash()).
+        """
+        self.path = path
+        self.source = source or source_hash()
+        self.hits = 0
+        self.misses = 0
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS episodes ("
+            " key TEXT PRIMARY KEY, source TEXT NOT NULL, result TEXT NOT NULL)"
+        )
+        self.conn.execute("DELETE FROM episodes WHERE source != ?", (self.source,))
+        self.conn.commit()
+
+    def key(self, cfg: dict, seed: int, sensor_removal: int = 0) -> str:
+        """Content address of an episode."""
+        payload = json.dumps(
+            dict(cfg=cfg, seed=seed, sensor_removal=sensor_removal, source=self.source),
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get_many(
+        self, cfg: dict, seeds: list[int], sensor_removal: int = 0
+    ) -> dict[int, dict]:
+        """Cached results of the given seeds, as {seed: result dict}."""
+        keys = {self.key(cfg, s, sensor_removal): s for s in seeds}
+        found = {}
+        items = list(keys)
+        for i in range(0, len(items), 500):  # Stay below SQLite's variable limit
+            chunk = items[i : i + 500]
+            rows = self.conn.execute(
+                f"SELECT key, result FROM episodes WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for key, result in rows:
+                found[keys[key]] = json.loads(result)
+        self.hits += len(found)
+        self.misses += len(seeds) - len(found)
+        return found
+
+    def put_many(self, cfg: dict, results: list[dict], sensor_removal: int = 0):
+        """Store results; every result dict must have a 'seed' key."""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO episodes (key, source, result) VALUES (?, ?, ?)",
+            [
+                (self.key(cfg, r["seed"], sensor_removal), self.source, json.dumps(r))
+                for r in results
+            ],
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
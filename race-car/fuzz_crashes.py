@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Crash-scenario fuzzer for HeuristicAgent.
+
+Mines seeds that make the agent fail and keeps them as a corpus of short,
+reproducible scenarios, so tuning and regression runs can spend their
+episodes on informative seeds:
+
+1) Scan: play every (seed, sensor_removal) headless, over a process pool.
+2) Select the episodes that crashed, and the ones whose distance is in the
+   lowest percentile of the episodes that did not.
+3) Minimise every crash to the shortest failing window: the game is
+   replayed from the recorded actions up to a handover tick, and a fresh
+   agent drives from there. Bisection looks for a late handover after which
+   the agent still has the same crash, on the same tick (an earlier or a
+   different crash does not count). A scenario then only needs the cheap
+   replay of the prefix plus a few agent ticks. Whether the crash happens is
+   not monotonic in the handover tick, so this is a short window that
+   reproduces the crash, not always the shortest one.
+4) Save the scenarios with their expected outcomes as JSON.
+
+    python fuzz_crashes.py mine --seeds 0:2000 --removals 0,4 --workers 8 --out corpus.json
+    python fuzz_crashes.py check corpus.json     # after changing the agent
+
+The tuner can run on the corpus seeds: python optimize_max_speed.py --corpus corpus.json
+"""
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+
+import numpy as np
+
+from heuristic import HeuristicAgent
+from src.game.action_log import ActionLog
+from src.game.core import MAX_TICKS
+from src.game.headless import run_headless, continue_headless
+from src.game.replay import Replayer
+
+CORPUS_VERSION = 2
+
+
+@dataclass
+class Scenario:
+    seed: int
+    sensor_removal: int
+    kind: str  # "crash" or "low_distance"
+    start_tick: int  # Ticks replayed from the prefix before the agent takes over
+    end_tick: int  # Last tick the agent plays
+    prefix: str  # Base64 of the ActionLog of the first start_tick ticks
+    expected_crashed: bool
+    expected_distance: float
+    expected_crash_tick: int  # The tick the agent crashes on, -1 if it does not
+    episode_distance: float  # Distance of the full episode the scenario came from
+    episode_ticks: int
+
+
+def _make_agent(cfg: dict | None) -> HeuristicAgent:
+    return HeuristicAgent(**(cfg or {}))
+
+
+def _encode(log: ActionLog) -> str:
+    return base64.b64encode(log.to_bytes()).decode()
+
+
+def _decode(prefix: str) -> ActionLog:
+    return ActionLog.from_bytes(base64.b64decode(prefix))
+
+
+# --- Playing scenarios -----------------------------------------------------------
+def play_scenario(scenario: Scenario, cfg: dict | None = None):
+    """
+    Play a scenario with a fresh agent.
+
+    :param scenario: The scenario to play.
+    :param cfg: HeuristicAgent keyword arguments (default is the default agent).
+    :return: The final game state.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        if scenario.start_tick == 0:
+            return run_headless(
+                scenario.seed,
+                sensor_removal=scenario.sensor_removal,
+                agent=_make_agent(cfg),
+                max_ticks=scenario.end_tick,
+            )
+        state = Replayer(_decode(scenario.prefix)).run()
+        return continue_headless(state, agent=_make_agent(cfg), max_ticks=scenario.end_tick)
+
+
+def crash_tick(state) -> int:
+    """The tick a finished game crashed on, -1 if it did not crash."""
+    return state.ticks - 1 if state.crashed else -1  # ticks is incremented once more before the game ends
+
+
+def _crash_tick_after(seed: int, sensor_removal: int, log: ActionLog, start: int, end: int, cfg) -> int:
+    prefix = ActionLog(seed, sensor_removal, log.actions[:start])
+    scenario = Scenario(seed, sensor_removal, "crash", start, end, _encode(prefix), True, 0.0, -1, 0.0, 0)
+    return crash_tick(play_scenario(scenario, cfg))
+
+
+# --- Mining ----------------------------------------------------------------------
+def _scan_chunk(tasks: list[tuple[int, int]], cfg: dict | None) -> list[dict]:
+    """Worker task: play full episodes; keep the action log of crashes only."""
+    results = []
+    for seed, sensor_removal in tasks:
+        log = ActionLog(seed, sensor_removal)
+        with contextlib.redirect_stdout(io.StringIO()):
+            state = run_headless(
+                seed, sensor_removal=sensor_removal, agent=_make_agent(cfg), action_log=log
+            )
+        results.append(
+            dict(
+                seed=seed,
+                sensor_removal=sensor_removal,
+                distance=float(state.distance),
+                crashed=bool(state.crashed),
+                ticks=int(state.ticks),
+                log=_encode(log) if state.crashed else "",
+            )
+        )
+    return results
+
+
+def minimise_crash(episode: dict, cfg: dict | None = None, min_window: int = 30, slack: int = 0) -> Scenario:
+    """
+    Find a late handover tick after which a fresh agent still has the
+    episode's crash, on the same tick.
+
+    :param episode: A crashed episode from the scan.
+    :param cfg: HeuristicAgent keyword arguments.
+    :param min_window: The fewest ticks the agent gets to react.
+    :param slack: Extra ticks played after the crash tick.
+    :return: The scenario.
+    """
+    seed, sensor_removal = episode["seed"], episode["sensor_removal"]
+    log = _decode(episode["log"])
+    tick = episode["ticks"] - 1  # ticks is incremented once more before the game ends
+    end = tick + slack
+
+    def reproduces(window: int) -> bool:
+        return _crash_tick_after(seed, sensor_removal, log, tick - window, end, cfg) == tick
+
+    # The full window is the episode itself, so it has the crash. Gallop up
+    # from min_window to the first window that has it too, then bisect below
+    # that; hi always keeps a window with the crash, and shorter is better
+    lo, hi = min(min_window, tick), tick
+    window = lo
+    while window < tick:
+        if reproduces(window):
+            hi = window
+            break
+        lo = window + 1
+        window *= 2
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if reproduces(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    start = tick - hi
+
+    prefix = ActionLog(seed, sensor_removal, log.actions[:start])
+    scenario = Scenario(
+        seed, sensor_removal, "crash", start, end, _encode(prefix), True, 0.0, tick,
+        episode["distance"], episode["ticks"],
+    )
+    state = play_scenario(scenario, cfg)
+    scenario.expected_crashed = bool(state.crashed)
+    scenario.expected_distance = float(state.distance)
+    scenario.expected_crash_tick = crash_tick(state)
+    return scenario
+
+
+def _minimise_chunk(episodes: list[dict], cfg, min_window: int, slack: int) -> list[Scenario]:
+    return [minimise_crash(episode, cfg, min_window, slack) for episode in episodes]
+
+
+def _chunks(items: list, workers: int) -> list[list]:
+    size = max(1, math.ceil(len(items) / (max(1, workers) * 4)))
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _map(fn, chunks: list[list], workers: int, *args) -> list:
+    if workers <= 1:
+        return [result for chunk in chunks for result in fn(chunk, *args)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fn, chunk, *args) for chunk in chunks]
+        return [result for future in futures for result in future.result()]
+
+
+def mine(
+    seeds: list[int],
+    removals: list[int],
+    workers: int = 1,
+    percentile: float = 5.0,
+    cfg: dict | None = None,
+    min_window: int = 30,
+    slack: int = 0,
+) -> list[Scenario]:
+    """
+    Scan the seeds and turn the failures into scenarios.
+
+    :param seeds: The seeds to scan.
+    :param removals: The sensor_removal values to scan every seed with.
+    :param workers: Processes to run episodes in.
+    :param percentile: Episodes that did not crash but drove less than this
+        percentile of their distances are kept as well.
+    :param cfg: HeuristicAgent keyword arguments.
+    :param min_window: The fewest ticks the agent gets to react in a crash scenario.
+    :param slack: Extra ticks played after the crash tick.
+    :return: The scenarios, crashes first.
+    """
+    tasks = [(seed, removal) for removal in removals for seed in seeds]
+    t0 = time.time()
+    episodes = _map(_scan_chunk, _chunks(tasks, workers), workers, cfg)
+    crashed = [e for e in episodes if e["crashed"]]
+    finished = [e for e in episodes if not e["crashed"]]
+    print(
+        f"Scanned {len(episodes)} episodes in {time.time() - t0:.1f}s: "
+        f"{len(crashed)} crashed ({len(crashed) / max(1, len(episodes)):.1%})"
+    )
+
+    t0 = time.time()
+    scenarios = _map(_minimise_chunk, _chunks(crashed, workers), workers, cfg, min_window, slack)
+    if scenarios:
+        windows = [s.end_tick - s.start_tick for s in scenarios]
+        print(
+            f"Minimised {len(scenarios)} crashes in {time.time() - t0:.1f}s: "
+            f"median window {np.median(windows):.0f} ticks (of {np.median([s.episode_ticks for s in scenarios]):.0f})"
+        )
+
+    if finished and percentile > 0:
+        cutoff = np.percentile([e["distance"] for e in finished], percentile)
+        for e in finished:
+            if e["distance"] <= cutoff:
+                scenarios.append(
+                    Scenario(
+                        e["seed"], e["sensor_removal"], "low_distance", 0, MAX_TICKS, "",
+                        False, e["distance"], -1, e["distance"], e["ticks"],
+                    )
+                )
+        print(f"Kept {sum(s.kind == 'low_distance' for s in scenarios)} episodes below {cutoff:.0f} distance")
+    return scenarios
+
+
+# --- Corpus ----------------------------------------------------------------------
+def save_corpus(path: str, scenarios: list[Scenario], cfg: dict | None = None):
+    with open(path, "w") as f:
+        json.dump(
+            dict(version=CORPUS_VERSION, agent_cfg=cfg or {}, scenarios=[asdict(s) for s in scenarios]),
+            f,
+            indent=2,
+        )
+
+
+def load_corpus(path: str) -> list[Scenario]:
+    with open(path, "r") as f:
+        data = json.load(f)
+    if data.get("version") != CORPUS_VERSION:
+        raise ValueError(f"Unsupported corpus version {data.get('version')}")
+    return [Scenario(**s) for s in data["scenarios"]]
+
+
+def corpus_seeds(path: str, sensor_removal: int = 0) -> list[int]:
+    """
+    The distinct seeds of a corpus for one sensor_removal value, in corpus order.
+
+    :raises ValueError: If the corpus has no scenario with that sensor_removal.
+    """
+    scenarios = load_corpus(path)
+    seeds = [s.seed for s in scenarios if s.sensor_removal == sensor_removal]
+    if not seeds:
+        removals = sorted({s.sensor_removal for s in scenarios})
+        raise ValueError(
+            f"{path} has no scenarios with sensor_removal={sensor_removal} "
+            f"(it has {removals or 'no scenarios'}); mine it with --removals {sensor_removal}"
+        )
+    return list(dict.fromkeys(seeds))
+
+
+def _check_chunk(scenarios: list[Scenario], cfg) -> list[dict]:
+    results = []
+    for scenario in scenarios:
+        state = play_scenario(scenario, cfg)
+        results.append(dict(crashed=bool(state.crashed), distance=float(state.distance)))
+    return results
+
+
+def check(scenarios: list[Scenario], workers: int = 1, cfg: dict | None = None) -> dict:
+    """
+    Play every scenario with the current agent and compare with the expected outcomes.
+
+    :return: Counts of crash scenarios that are fixed / still crash, new crashes in
+        low-distance scenarios, and the mean distance change of those.
+    """
+    results = _map(_check_chunk, _chunks(scenarios, workers), workers, cfg)
+    summary = dict(scenarios=len(scenarios), fixed=0, still_crashing=0, new_crashes=0, distance_change=0.0)
+    low = 0
+    for scenario, result in zip(scenarios, results):
+        if scenario.kind == "crash":
+            if result["crashed"]:
+                summary["still_crashing"] += 1
+            else:
+                summary["fixed"] += 1
+        else:
+            low += 1
+            summary["new_crashes"] += int(result["crashed"] and not scenario.expected_crashed)
+            summary["distance_change"] += result["distance"] - scenario.expected_distance
+    summary["distance_change"] /= max(1, low)
+    return summary
+
+
+# --- Main ------------------------------------------------------------------------
+def _seed_range(text: str) -> list[int]:
+    start, _, end = text.partition(":")
+    return list(range(int(start), int(end))) if end else [int(start)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mine crash scenarios for HeuristicAgent")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    mine_parser = commands.add_parser("mine", help="Scan seeds and save a scenario corpus")
+    mine_parser.add_argument("--seeds", default="0:1000", help="Seed range start:end (default: 0:1000)")
+    mine_parser.add_argument("--removals", default="0", help="Comma-separated sensor_removal values")
+    mine_parser.add_argument("--percentile", type=float, default=5.0, help="Also keep the lowest-distance percent")
+    mine_parser.add_argument("--min-window", type=int, default=30, help="Fewest ticks the agent gets to react")
+    mine_parser.add_argument("--workers", type=int, default=1, help="Processes to run episodes in")
+    mine_parser.add_argument("--out", default="corpus.json", help="Where to save the corpus")
+
+    check_parser = commands.add_parser("check", help="Replay a corpus with the current agent")
+    check_parser.add_argument("corpus", help="The corpus to check")
+    check_parser.add_argument("--workers", type=int, default=1, help="Processes to run episodes in")
+    args = parser.parse_args()
+
+    if args.command == "mine":
+        removals = [int(r) for r in args.removals.split(",")]
+        scenarios = mine(
+            _seed_range(args.seeds), removals, workers=args.workers,
+            percentile=args.percentile, min_window=args.min_window,
+        )
+        save_corpus(args.out, scenarios)
+        print(f"Saved {len(scenarios)} scenarios to {args.out}")
+    else:
+        t0 = time.time()
+        summary = check(load_corpus(args.corpus), workers=args.workers)
+        print(json.dumps(summary, indent=2))
+        print(f"Checked in {time.time() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
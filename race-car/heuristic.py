@@ -159,6 +159,12 @@ class DrivingState(Enum):
 
 TICK_SECONDS = 0.1  # approximate sim tick
 
+# Geometry for the cruise horizon of a driving batch (see src/game/core.py)
+SENSOR_RANGE = 1000.0
+EGO_HALF_LENGTH = 180.0  # Sensors measure from the middle of the 360 px ego car
+MAX_RELATIVE_SPEED = 5.5  # New cars drive at most 5 faster/slower than the ego car
+SPEED_DRIFT = 0.1  # Largest change of another car's speed per tick
+
 
 class HeuristicAgent:
     def __init__(
@@ -169,6 +175,10 @@ class HeuristicAgent:
         safety_margin: float = 0.6,
         match_tol: float = 1.2,
         max_accel_actions: int = 50,
+        adaptive_batch: bool = True,
+        max_batch_actions: int = 60,
+        horizon_margin: float = 50.0,
+        traffic_memory: int = 120,
     ):
         self.base_max_speed = base_max_speed
         self.speed_ramp_rate = speed_ramp_rate
@@ -194,6 +204,15 @@ class HeuristicAgent:
         self.lane_change_target = None
         self.last_measurement = {}
 
+        # Longer driving batches when no car is expected to get close before they end
+        self.adaptive_batch = adaptive_batch
+        self.max_batch_actions = max_batch_actions
+        self.horizon_margin = horizon_margin
+        self.traffic_memory = traffic_memory
+        self.speed_history: list[tuple[int, float]] = []  # (tick, ego speed) per call
+
+        self.requests = 0  # decide() calls, i.e. /predict requests
+
     def _update_max_speed(self, state):
         self.elapsed_time = state.elapsed_ticks
         self.max_speed = self.base_max_speed + self.speed_ramp_rate * self.elapsed_time
@@ -201,6 +220,9 @@ class HeuristicAgent:
 
     def decide(self, state: RaceCarPredictRequestDto) -> list[str]:
         self._update_max_speed(state)
+        self.requests += 1
+        if self.adaptive_batch:
+            self._remember_speed(state)
 
         front = state.sensors.get("front")
         prev_front = self.last_measurement.get("front")
@@ -362,7 +384,98 @@ class HeuristicAgent:
 
         return max(0.0, other_car_speed)  # Speed can't be negative
 
+    def _remember_speed(self, state: RaceCarPredictRequestDto):
+        history = self.speed_history
+        if history and state.elapsed_ticks < history[-1][0]:
+            history.clear()  # A new game started
+        elif history and state.elapsed_ticks == history[-1][0]:
+            history.pop()  # Asked again for the same tick, e.g. after a discarded prefetch
+        history.append((state.elapsed_ticks, state.velocity["x"]))
+        while history[0][0] < state.elapsed_ticks - self.traffic_memory:
+            history.pop(0)
+
     def _drive(self, state: RaceCarPredictRequestDto) -> list[str]:
+        actions = self._drive_actions(state)
+        if not self.adaptive_batch or abs(state.velocity.get("y", 0.0)) > 0.05:
+            return actions
+
+        # Keep cruising towards the (ramping) max speed for as long as _cruise_horizon allows
+        plan = list(actions)
+        speed = state.velocity["x"] + 0.1 * plan.count("ACCELERATE")
+        while len(plan) < self.max_batch_actions:
+            cap = self.max_speed + self.speed_ramp_rate * len(plan)
+            if speed + 0.1 <= cap:
+                plan.append("ACCELERATE")
+                speed += 0.1
+            else:
+                plan.append("NOTHING")
+
+        horizon = self._cruise_horizon(state, plan)
+        if horizon <= len(actions):
+            return actions
+        logger.info(f"Driving {horizon} ticks ahead")
+        # The game pops actions from the end of the list
+        return plan[:horizon][::-1]
+
+    def _cruise_horizon(self, state: RaceCarPredictRequestDto, plan: list[str]) -> int:
+        """
+        The number of actions of plan to play before asking again.
+
+        This is a tuned heuristic, not a guarantee. It assumes:
+
+        - The ego car is centred in its lane, so the front and back beams see
+          every car that can get in its way while it drives straight. A car
+          caught half-way through a lane change is not covered.
+        - A car the front or back sensor does not see is at least
+          SENSOR_RANGE away.
+        - Cars drive within MAX_RELATIVE_SPEED of the ego speeds of the last
+          traffic_memory ticks (cars are placed at most 5 faster or slower
+          than the ego car), plus SPEED_DRIFT per tick from now on. A car that
+          was placed earlier, or has drifted since it was placed, can be
+          faster or slower; a true worst case (drift on every tick since the
+          car was placed) would rule out every longer batch.
+
+        Under these assumptions a prefix is kept if, at its end, the gap to
+        such a car still covers the distance needed to match its speed at 0.1
+        per tick, plus horizon_margin. Without a front or back sensor
+        (sensor_removal) the gap is unknown, so nothing beyond the normal
+        batch is played.
+        """
+        if "front" not in state.sensors or "back" not in state.sensors:
+            return 0
+        speeds = [speed for _, speed in self.speed_history] or [state.velocity["x"]]
+        slowest = min(speeds) - MAX_RELATIVE_SPEED
+        fastest = max(speeds) + MAX_RELATIVE_SPEED
+
+        # None means the sensor sees nothing; 0.0 is a car touching the ego car
+        front = SENSOR_RANGE if state.sensors["front"] is None else state.sensors["front"]
+        back = SENSOR_RANGE if state.sensors["back"] is None else state.sensors["back"]
+        front_gap = front - EGO_HALF_LENGTH
+        back_gap = back - EGO_HALF_LENGTH
+
+        speed = state.velocity["x"]
+        horizon = 0
+        for tick, action in enumerate(plan, start=1):
+            if action == "ACCELERATE":
+                speed += 0.1
+            elif action == "DECELERATE":
+                speed = max(0.0, speed - 0.1)
+            front_closing = speed - (slowest - SPEED_DRIFT * tick)
+            back_closing = (fastest + SPEED_DRIFT * tick) - speed
+            front_gap -= front_closing
+            back_gap -= back_closing
+
+            front_stop = 5 * max(0.0, front_closing) ** 2  # v^2 / (2 * 0.1)
+            back_stop = 5 * max(0.0, back_closing) ** 2
+            if (
+                front_gap < front_stop + self.horizon_margin
+                or back_gap < back_stop + self.horizon_margin
+            ):
+                break
+            horizon = tick
+        return horizon
+
+    def _drive_actions(self, state: RaceCarPredictRequestDto) -> list[str]:
         ego_speed = state.velocity["x"]
         max_actions = 20
         min_actions = 10
@@ -0,0 +1,123 @@
+"""
+Agent that asks a running /predict endpoint for its actions.
+
+HttpAgent posts every RaceCarPredictRequestDto to the endpoint over one
+requests.Session, so all requests of a game reuse the same keep-alive
+connection instead of opening a new one each time, like the competition's
+evaluation client does. It measures the round-trip time of every request
+and counts the requests of every game. Every HttpAgent sends its own
+session header, so a server that plays several games at once keeps a
+separate agent for each (see sessions.py). fork() gives a copy for
+speculative requests that the server answers with a copy of this session's
+agent (see src/game/prefetch.py):
+
+    python api.py                      # in one terminal
+    python test_game_with_api.py       # in another, plays against http://localhost:9052
+"""
+
+import copy
+import time
+import uuid
+
+import numpy as np
+import requests
+
+from dtos import RaceCarPredictRequestDto, RaceCarPredictResponseDto
+from sessions import SESSION_FORK_HEADER, SESSION_HEADER
+
+
+class HttpAgent:
+    def __init__(
+        self,
+        api_url: str,
+        timeout: float = 5.0,
+        pool_size: int = 1,
+        session_id: str | None = None,
+    ):
+        """
+        Initialize a HttpAgent object.
+
+        :param api_url: The URL of the server, with or without the /predict path.
+        :param timeout: The number of seconds to wait for a response.
+        :param pool_size: The number of keep-alive connections to keep open.
+        :param session_id: Sent as the session header, so the server keeps a
+            separate agent for this client (default is a random id).
+        """
+        url = api_url.rstrip("/")
+        self.url = url if url.endswith("/predict") else url + "/predict"
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.headers = {
+            "Content-Type": "application/json",
+            SESSION_HEADER: session_id or uuid.uuid4().hex,
+        }
+
+        self.latencies: list[float] = []  # Round-trip time of every request, in seconds
+        self.requests_per_episode: list[int] = []
+        self.last_tick = -1
+
+    def decide(self, state: RaceCarPredictRequestDto) -> list[str]:
+        # Equal ticks are the same game: a PrefetchDriver asks again after discarding a batch
+        if state.elapsed_ticks < self.last_tick or not self.requests_per_episode:
+            self.requests_per_episode.append(0)  # A new game started
+        self.last_tick = state.elapsed_ticks
+
+        start = time.perf_counter()
+        response = self.session.post(
+            self.url,
+            data=state.model_dump_json(),
+            headers=self.headers,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        actions = RaceCarPredictResponseDto.model_validate_json(response.content).actions
+        self.latencies.append(time.perf_counter() - start)
+        self.requests_per_episode[-1] += 1
+
+        return actions
+
+    def fork(self) -> "HttpAgent":
+        """
+        A copy for speculative requests. The server answers it with a copy of
+        this session's agent, so this session is untouched unless adopt() is
+        called. It shares the connections and the statistics of this agent.
+        """
+        fork = copy.copy(self)
+        fork.headers = {
+            **self.headers,
+            SESSION_HEADER: uuid.uuid4().hex,
+            SESSION_FORK_HEADER: self.headers[SESSION_HEADER],
+        }
+        return fork
+
+    def adopt(self, fork: "HttpAgent"):
+        """Continue the game in the session of a fork whose answer was used."""
+        self.headers = {**self.headers, SESSION_HEADER: fork.headers[SESSION_HEADER]}
+        self.last_tick = fork.last_tick
+
+    def summary(self) -> dict:
+        """
+        Summarize the requests made so far.
+
+        :return: The number of requests, the requests of the current game and
+            the mean, median, 95th percentile and maximum latency in milliseconds.
+        """
+        latencies = np.array(self.latencies) * 1000
+        if not len(latencies):
+            return {"requests": 0, "episode_requests": 0}
+        return {
+            "requests": len(latencies),
+            "episode_requests": self.requests_per_episode[-1],
+            "mean_ms": float(latencies.mean()),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "max_ms": float(latencies.max()),
+        }
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,198 @@
+"""
+Closed-form kinematics of the ego car for whole action sequences.
+
+Every action changes the ego velocity by a constant step (Car.speed_up,
+Car.slow_down and Car.turn add or subtract 0.1), and every tick adds the
+velocity to the distance and to the ego's y. So the state after any action
+sequence is a prefix sum of the steps, and many candidate sequences can be
+rolled out at once with np.cumsum instead of stepping the simulator:
+
+    codes = encode([switch_up(), brake(), ["NOTHING"] * 60])
+    trajectory = rollout(codes, vx=10.0)
+    first = first_crash(trajectory, cars)   # -1 where the sequence is safe
+
+The sums are accumulated in tick order, exactly like the game adds them, so
+velocity, distance and y match GameState bit for bit (the braking clamp at
+zero speed is stepped per tick for the few sequences that reach it).
+The walls never move, so wall crashes are exact too. Other cars change
+speed randomly on every tick, so their boxes are predicted at constant
+speed, optionally widened by speed_margin pixels per tick on both sides.
+
+Coordinates are the game's screen coordinates: the ego car stays at
+EGO_LEFT, and another car moves by its speed minus the ego speed.
+"""
+
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from src.game.action_log import ACTION_CODES, ACTION_NAMES
+
+SPEED_STEP = 0.1
+
+# Velocity changes of every action code
+DELTA_X = np.zeros(len(ACTION_NAMES))
+DELTA_X[ACTION_CODES["ACCELERATE"]] = SPEED_STEP
+DELTA_X[ACTION_CODES["DECELERATE"]] = -SPEED_STEP
+DELTA_Y = np.zeros(len(ACTION_NAMES))
+DELTA_Y[ACTION_CODES["STEER_LEFT"]] = -SPEED_STEP
+DELTA_Y[ACTION_CODES["STEER_RIGHT"]] = SPEED_STEP
+
+# Geometry of the game (see src/game/core.py and src/elements/road.py)
+ROAD_TOP = 40  # Bottom edge of the top wall
+ROAD_BOTTOM = 1160  # Top edge of the bottom wall
+CAR_WIDTH = 360
+CAR_HEIGHT = 179
+EGO_LEFT = 1600 // 2 - CAR_WIDTH // 2
+EGO_START_Y = 510
+
+
+class Trajectory(NamedTuple):
+    """
+    The ego state after every tick of every sequence, all (C, H).
+
+    Column t is the state after tick t + 1 was played.
+    """
+
+    vx: np.ndarray
+    vy: np.ndarray
+    distance: np.ndarray  # Distance driven, from the distance given to rollout
+    y: np.ndarray  # Top of the ego car, as a float
+    top: np.ndarray  # Top of the ego car rect (truncated like Rect)
+
+
+def encode(plans: list[list[str]], as_returned: bool = True, horizon: Optional[int] = None) -> np.ndarray:
+    """
+    Turn action lists into an array of action codes in playing order.
+
+    :param plans: One action list per candidate, e.g. switch_up() + brake().
+    :param as_returned: Whether the lists are in the order decide() returns them;
+        the game plays them from the end. False for lists in playing order.
+    :param horizon: The number of ticks (default is the longest plan). Shorter
+        plans are padded with NOTHING, longer ones are cut.
+    :return: (C, H) int8 codes.
+    """
+    horizon = max((len(plan) for plan in plans), default=0) if horizon is None else horizon
+    codes = np.zeros((len(plans), horizon), dtype=np.int8)
+    for i, plan in enumerate(plans):
+        ordered = plan[::-1] if as_returned else plan
+        row = [ACTION_CODES.get(action, 0) for action in ordered[:horizon]]
+        codes[i, : len(row)] = row
+    return codes
+
+
+def _accumulate(start, steps: np.ndarray) -> np.ndarray:
+    """start + steps[0], + steps[1], ... added one at a time like the game does."""
+    start = np.broadcast_to(np.asarray(start, dtype=np.float64), steps.shape[:1])
+    return np.cumsum(np.concatenate([start[:, None], steps], axis=1), axis=1)[:, 1:]
+
+
+def rollout(
+    codes: np.ndarray,
+    vx: float,
+    vy: float = 0.0,
+    y: float = EGO_START_Y,
+    distance: float = 0.0,
+) -> Trajectory:
+    """
+    The ego state over time for every sequence of action codes.
+
+    :param codes: (C, H) action codes in playing order, see encode.
+    :param vx: The current x velocity.
+    :param vy: The current y velocity.
+    :param y: The current top of the ego car (the game starts it at EGO_START_Y;
+        agents that only see requests integrate velocity y to track it).
+    :param distance: The current distance.
+    :return: The trajectory.
+    """
+    codes = np.atleast_2d(codes)
+    velocity_x = _accumulate(vx, DELTA_X[codes])
+    # Braking stops at zero speed. Sequences that brake that far are rare, and
+    # are stepped tick by tick so they still add up exactly like the game
+    stopped = np.flatnonzero((velocity_x < 0).any(axis=1))
+    if len(stopped):
+        steps = DELTA_X[codes[stopped]]
+        speed = np.full(len(stopped), float(vx))
+        for t in range(codes.shape[1]):
+            speed = np.maximum(speed + steps[:, t], 0.0)
+            velocity_x[stopped, t] = speed
+    velocity_y = _accumulate(vy, DELTA_Y[codes])
+    position_y = _accumulate(y, velocity_y)
+    return Trajectory(
+        vx=velocity_x,
+        vy=velocity_y,
+        distance=_accumulate(distance, velocity_x),
+        y=position_y,
+        top=np.trunc(position_y).astype(np.int64),
+    )
+
+
+def wall_crashes(trajectory: Trajectory, height: int = CAR_HEIGHT) -> np.ndarray:
+    """(C, H) whether the ego car touches a wall after every tick."""
+    top = trajectory.top
+    return (top < ROAD_TOP) | (top + height > ROAD_BOTTOM)
+
+
+def car_crashes(
+    trajectory: Trajectory,
+    cars: np.ndarray,
+    speed_margin: float = 0.0,
+    width: int = CAR_WIDTH,
+    height: int = CAR_HEIGHT,
+) -> np.ndarray:
+    """
+    (C, H) whether the ego car overlaps any of the predicted car boxes after every tick.
+
+    :param cars: (K, 5) rows of left, top, width, height and x velocity of the
+        other cars now, in screen coordinates (see car_boxes).
+    :param speed_margin: Widens every box by this many pixels per tick on both sides.
+    """
+    cars = np.asarray(cars, dtype=np.float64).reshape(-1, 5)
+    c, h = trajectory.top.shape
+    if not len(cars):
+        return np.zeros((c, h), dtype=bool)
+    left, top, car_width, car_height, car_vx = (column[None, None, :] for column in cars.T)
+    ticks = np.arange(1, h + 1)[None, :, None]
+    # car.x += car.vx - ego.vx on every tick, so after t ticks it moved car.vx * t minus what ego drove
+    driven = np.cumsum(trajectory.vx, axis=1)[:, :, None]
+    car_left = np.trunc(left + car_vx * ticks - driven)
+    spread = speed_margin * ticks
+    ego_top = trajectory.top[:, :, None]
+    overlap = (
+        (EGO_LEFT < car_left + car_width + spread)
+        & (car_left - spread < EGO_LEFT + width)
+        & (ego_top < top + car_height)
+        & (top < ego_top + height)
+    )
+    return overlap.any(axis=2)
+
+
+def first_crash(
+    trajectory: Trajectory,
+    cars: Optional[np.ndarray] = None,
+    speed_margin: float = 0.0,
+) -> np.ndarray:
+    """
+    The first tick index on which each sequence crashes into a wall or a car.
+
+    :return: (C,) column indices into the trajectory, -1 where there is no crash.
+    """
+    crash = wall_crashes(trajectory)
+    if cars is not None:
+        crash |= car_crashes(trajectory, cars, speed_margin)
+    return np.where(crash.any(axis=1), crash.argmax(axis=1), -1)
+
+
+def car_boxes(state) -> np.ndarray:
+    """
+    The (K, 5) car rows of a GameState for car_crashes, for tuners and tests
+    that have the game at hand.
+    """
+    return np.array(
+        [
+            (int(car.x), int(car.y), car.width, car.height, car.velocity.x)
+            for car in state.cars
+            if car is not state.ego
+        ],
+        dtype=np.float64,
+    ).reshape(-1, 5)
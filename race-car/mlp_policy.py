@@ -0,0 +1,167 @@
+"""
+Learned policy: a small NumPy MLP over the sensor readings and the velocity.
+
+MlpPolicy is a drop-in alternative to HeuristicAgent. On every call it turns
+the request into 18 features (the 16 sensor readings and the two velocity
+components, scaled to about [0, 1]), runs them through one tanh hidden layer
+and picks an action and how many ticks to hold it from two heads of the
+output layer. decide() returns that action repeated, so the game only asks
+again once the batch has been played.
+
+All weights live in one flat parameter vector, which is what the trainer
+(train_policy.py) searches over. batched_forward evaluates many feature rows
+at once, each with its own parameter vector, so a whole population of
+policies plays in lockstep on the batch simulator. For a single request the
+forward pass is a few small matrix products and takes microseconds.
+
+A trained policy is saved as one .npz file:
+
+    RACE_CAR_AGENT=mlp RACE_CAR_POLICY=policy.npz python api.py
+"""
+
+import numpy as np
+
+from dtos import RaceCarPredictRequestDto
+from heuristic import SENSOR_ANGLES
+from src.game.action_log import ACTION_NAMES  # The action head outputs these codes
+
+SENSOR_NAMES = list(SENSOR_ANGLES.values())  # Input order, clockwise from left_side
+SENSOR_STRENGTH = 1000
+SPEED_SCALE = 20.0  # Velocity x of a fast car
+STEER_SCALE = 5.0
+VELOCITY_SCALE = np.array([SPEED_SCALE, STEER_SCALE])
+NUM_FEATURES = len(SENSOR_NAMES) + 2
+DURATIONS = (1, 4, 12)  # Ticks an action can be held for
+HIDDEN = 32
+FORMAT_VERSION = 1
+
+
+def num_params(hidden: int = HIDDEN, durations: tuple = DURATIONS) -> int:
+    """The length of the flat parameter vector of an MLP."""
+    outputs = len(ACTION_NAMES) + len(durations)
+    return NUM_FEATURES * hidden + hidden + hidden * outputs + outputs
+
+
+def init_params(rng: np.random.Generator, hidden: int = HIDDEN, durations: tuple = DURATIONS) -> np.ndarray:
+    """Random parameters with the usual 1/sqrt(fan_in) scale and zero biases."""
+    outputs = len(ACTION_NAMES) + len(durations)
+    w1 = rng.standard_normal((NUM_FEATURES, hidden)) / np.sqrt(NUM_FEATURES)
+    w2 = rng.standard_normal((hidden, outputs)) / np.sqrt(hidden)
+    return np.concatenate([w1.ravel(), np.zeros(hidden), w2.ravel(), np.zeros(outputs)])
+
+
+def features(sensors: np.ndarray, velocity: np.ndarray) -> np.ndarray:
+    """
+    Scale raw observations into network inputs.
+
+    :param sensors: (n, 16) readings in SENSOR_NAMES order, NaN where nothing is seen.
+    :param velocity: (n, 2) velocity x, y.
+    :return: (n, NUM_FEATURES) features.
+    """
+    # fmin ignores NaN, so nothing seen reads as the full sensor range
+    seen = np.fmin(sensors, SENSOR_STRENGTH) / SENSOR_STRENGTH
+    return np.concatenate([seen, velocity / VELOCITY_SCALE], axis=1)
+
+
+def unpack(params: np.ndarray, hidden: int = HIDDEN, durations: tuple = DURATIONS) -> tuple[np.ndarray, ...]:
+    """
+    Split parameter vectors into the weights and biases of both layers.
+
+    :param params: (num_params,) or (n, num_params) parameter vectors.
+    :return: w1 (..., NUM_FEATURES, hidden), b1 (..., hidden), w2 (..., hidden, outputs), b2 (..., outputs).
+    """
+    outputs = len(ACTION_NAMES) + len(durations)
+    end_w1 = NUM_FEATURES * hidden
+    end_b1 = end_w1 + hidden
+    end_w2 = end_b1 + hidden * outputs
+    lead = params.shape[:-1]
+    return (
+        params[..., :end_w1].reshape(lead + (NUM_FEATURES, hidden)),
+        params[..., end_w1:end_b1],
+        params[..., end_b1:end_w2].reshape(lead + (hidden, outputs)),
+        params[..., end_w2:],
+    )
+
+
+def batched_forward(
+    params: np.ndarray, x: np.ndarray, hidden: int = HIDDEN, durations: tuple = DURATIONS
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pick an action and a duration for every feature row.
+
+    :param params: (num_params,) shared by all rows, or (n, num_params) one vector per row.
+    :param x: (n, NUM_FEATURES) features.
+    :return: The action codes and the durations in ticks, both (n,).
+    """
+    w1, b1, w2, b2 = unpack(params, hidden, durations)
+    if params.ndim == 1:
+        y = np.tanh(x @ w1 + b1) @ w2 + b2
+    else:
+        h = np.tanh(np.einsum("nf,nfh->nh", x, w1) + b1)
+        y = np.einsum("nh,nho->no", h, w2) + b2
+    return _heads(y, durations)
+
+
+def _heads(y: np.ndarray, durations: tuple) -> tuple[np.ndarray, np.ndarray]:
+    codes = y[:, : len(ACTION_NAMES)].argmax(axis=1)
+    ticks = np.asarray(durations)[y[:, len(ACTION_NAMES) :].argmax(axis=1)]
+    return codes, ticks
+
+
+class MlpPolicy:
+    def __init__(self, params: np.ndarray | None = None, hidden: int = HIDDEN, durations: tuple = DURATIONS):
+        """
+        Initialize a MlpPolicy object.
+
+        :param params: The flat parameter vector (default is a random one).
+        :param hidden: The width of the hidden layer.
+        :param durations: The numbers of ticks the duration head picks from.
+        """
+        self.hidden = hidden
+        self.durations = tuple(int(d) for d in durations)
+        if params is None:
+            params = init_params(np.random.default_rng(0), hidden, self.durations)
+        params = np.asarray(params, dtype=np.float64)
+        if params.shape != (num_params(hidden, self.durations),):
+            raise ValueError(
+                f"Expected {num_params(hidden, self.durations)} parameters, got {params.shape}"
+            )
+        self.params = params
+        self.layers = unpack(params, hidden, self.durations)
+        self.requests = 0
+
+    def act(self, sensors: np.ndarray, velocity: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Action codes and durations for a batch of raw observations, see features."""
+        w1, b1, w2, b2 = self.layers
+        y = np.tanh(features(sensors, velocity) @ w1 + b1) @ w2 + b2
+        return _heads(y, self.durations)
+
+    def decide(self, request: RaceCarPredictRequestDto) -> list[str]:
+        """
+        Pick the next actions. Same signature as HeuristicAgent.decide.
+
+        :param request: The request of the game.
+        :return: The chosen action, repeated for the ticks it is held.
+        """
+        self.requests += 1
+        # None (nothing seen, or a removed sensor) becomes NaN
+        sensors = np.array([[request.sensors.get(name) for name in SENSOR_NAMES]], dtype=np.float64)
+        velocity = np.array([[request.velocity.get("x", 0.0), request.velocity.get("y", 0.0)]])
+        codes, ticks = self.act(sensors, velocity)
+        return [ACTION_NAMES[codes[0]]] * int(ticks[0])
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            version=FORMAT_VERSION,
+            params=self.params,
+            hidden=self.hidden,
+            durations=np.array(self.durations),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "MlpPolicy":
+        with np.load(path) as data:
+            if int(data["version"]) != FORMAT_VERSION:
+                raise ValueError(f"Unsupported policy version {int(data['version'])}")
+            return cls(data["params"], int(data["hidden"]), tuple(data["durations"].tolist()))
@@ -4,14 +4,16 @@ Hyperparameter tuner for HeuristicAgent (new API).
 
 It will:
 - Randomly sample candidate configs over sensible ranges
-- Evaluate each over a set of seeds
+- Evaluate each over a set of seeds (optionally over a process pool: --workers N)
 - Keep the best K and do a small local refinement
+  (or, with --mode halving, run successive halving on common seeds)
 - Output JSON: tuner_detailed.json, tuner_summary.json
 - Print the top results
 
 Integration:
 1) If your old loop exists (src.game.core.initialize_game_state/game_loop),
-   this script will use it automatically.
+   this script will run it through the headless engine (src.game.headless)
+   automatically.
 
 2) Otherwise, implement the two adapter functions below:
    - adapter_reset(seed: int, agent: HeuristicAgent) -> None
@@ -23,16 +25,18 @@ Refactor note:
   the script will pass them. If not, it will set attributes after construction.
 """
 
-import os, sys, json, math, random, contextlib, io, time
+import os, sys, json, math, random, contextlib, io, time, argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from statistics import mean
 from dataclasses import dataclass, asdict
 
 # --- Optional old engine support -------------------------------------------------
+# Episodes run on the headless engine (no pygame, no 60 FPS clock), which gives
+# the same distance/crashed/ticks as game_loop as fast as the CPU allows.
 HAVE_OLD_ENV = False
 try:
-    import pygame
-    import src.game.core as game_core
-    from src.game.core import initialize_game_state, game_loop
+    from src.game.headless import run_headless
+    from src.game.batch import run_batch
 
     HAVE_OLD_ENV = True
 except Exception:
@@ -40,6 +44,8 @@ except Exception:
 
 # --- Your agent -----------------------------------------------------------------
 from heuristic import HeuristicAgent  # make sure this is your *new* agent
+from episode_cache import EpisodeCache
+from fuzz_crashes import corpus_seeds
 
 
 # --- Adapter (NEW environment): fill these if you don't have old engine ----------
@@ -136,30 +142,10 @@ def run_episode(seed: int, cfg: dict) -> EpisodeResult:
     # Silence noisy sim prints
     with contextlib.redirect_stdout(io.StringIO()):
         if HAVE_OLD_ENV:
-            # headless pygame setup
-            try:
-                import pygame
-
-                os.environ["SDL_VIDEODRIVER"] = "dummy"
-                pygame.quit()
-                pygame.init()
-            except Exception:
-                pass
-
-            # initialize & plug agent
-            initialize_game_state(
-                api_url="http://localhost:8000", seed_value=seed, sensor_removal=0
-            )
-
-            if game_core.STATE is None:
-                raise RuntimeError("Game STATE not initialized")
-            game_core.STATE.agent = _make_agent(cfg)
-
-            # run loop
-            game_loop(verbose=False, log_actions=False, log_path="")
-
-            st = game_core.STATE
-            extra = {}
+            # initialize, plug agent & run loop
+            agent = _make_agent(cfg)
+            st = run_headless(seed, sensor_removal=0, agent=agent)
+            extra = {"requests": getattr(agent, "requests", 0)}
             # Optionally pull more fields if your STATE has them
             return EpisodeResult(
                 seed=seed,
@@ -189,8 +175,32 @@ def run_episode(seed: int, cfg: dict) -> EpisodeResult:
             )
 
 
+def run_episodes(seeds: list[int], cfg: dict) -> list[EpisodeResult]:
+    """Run one episode per seed; with the old engine all seeds run in one lockstep batch."""
+    if not HAVE_OLD_ENV:
+        return [run_episode(s, cfg) for s in seeds]
+
+    agents = [_make_agent(cfg) for _ in seeds]
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch = run_batch(seeds, sensor_removal=0, agents=agents)
+    return [
+        EpisodeResult(
+            seed=seed,
+            distance=float(batch.distance[i]),
+            crashed=bool(batch.crashed[i]),
+            ticks=int(batch.ticks[i]),
+            elapsed_time_ms=float(batch.elapsed_game_time[i]),
+            extra={"requests": getattr(agents[i], "requests", 0)},
+        )
+        for i, seed in enumerate(seeds)
+    ]
+
+
 def evaluate_config(cfg: dict, seeds: list[int]) -> tuple[float, dict]:
-    runs = [run_episode(s, cfg) for s in seeds]
+    return score_runs(cfg, run_episodes(seeds, cfg))
+
+
+def score_runs(cfg: dict, runs: list[EpisodeResult]) -> tuple[float, dict]:
     distances = [r.distance for r in runs]
     crashes = [r.crashed for r in runs]
 
@@ -213,14 +223,137 @@ def evaluate_config(cfg: dict, seeds: list[int]) -> tuple[float, dict]:
         num_runs=len(runs),
         mean_distance=mean(distances),
         crash_rate=crash_rate,
+        mean_requests=mean(r.extra.get("requests", 0) for r in runs),
         ttc_per_km=ttc_viol,
         abort_rate=abort_rate,
         min_distance=min(distances),
         max_distance=max(distances),
+        errors=sum(1 for r in runs if "error" in r.extra),
     )
     return score, info
 
 
+# --- Parallel evaluation ---------------------------------------------------------
+def _failed_episode(seed: int, error: str) -> EpisodeResult:
+    """An episode that raised counts as a crash at distance 0."""
+    return EpisodeResult(
+        seed=seed,
+        distance=0.0,
+        crashed=True,
+        ticks=0,
+        elapsed_time_ms=0.0,
+        extra={"error": error},
+    )
+
+
+def _run_chunk(cfg: dict, seeds: list[int]) -> list[EpisodeResult]:
+    """Worker task: run a chunk of seeds for one config. A failing episode only fails itself."""
+    try:
+        return run_episodes(seeds, cfg)
+    except Exception:
+        pass  # Find the failing episode(s) by running the seeds one by one
+
+    runs = []
+    for seed in seeds:
+        try:
+            runs.append(run_episode(seed, cfg))
+        except Exception as e:
+            runs.append(_failed_episode(seed, repr(e)))
+    return runs
+
+
+class _Progress:
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.errors = 0
+        self.t0 = time.time()
+
+    def update(self, runs: list[EpisodeResult]):
+        self.done += len(runs)
+        self.errors += sum(1 for r in runs if "error" in r.extra)
+        elapsed = max(1e-9, time.time() - self.t0)
+        rate = self.done / elapsed
+        eta = (self.total - self.done) / max(1e-9, rate)
+        print(
+            f"\r  {self.done}/{self.total} episodes  {rate:6.1f} ep/s  ETA {eta:5.0f}s  errors {self.errors}",
+            end="" if self.done < self.total else "\n",
+            flush=True,
+        )
+
+
+def run_configs(
+    cfgs: list[dict],
+    seeds: list[int],
+    workers: int = 1,
+    chunk_size: int | None = None,
+    cache: EpisodeCache | None = None,
+) -> list[list[EpisodeResult]]:
+    """
+    Run every config on the same seeds, fanning (config, seed chunk) tasks
+    out over a process pool. Results come back in the order of cfgs and seeds,
+    whatever order the workers finish in. Episodes found in the cache are not
+    run again, and new results are added to it.
+    """
+    by_seed: list[dict[int, EpisodeResult]] = [{} for _ in cfgs]
+    if cache is not None:
+        for i, cfg in enumerate(cfgs):
+            for seed, result in cache.get_many(cfg, seeds).items():
+                by_seed[i][seed] = EpisodeResult(**result)
+    missing = [[s for s in seeds if s not in by_seed[i]] for i in range(len(cfgs))]
+    total = sum(len(m) for m in missing)
+
+    if chunk_size is None:
+        chunk_size = math.ceil(total / (max(1, workers) * 4))
+    chunk_size = max(1, min(chunk_size, len(seeds)))
+    tasks = [
+        (i, m[j : j + chunk_size])
+        for i, m in enumerate(missing)
+        for j in range(0, len(m), chunk_size)
+    ]
+
+    progress = _Progress(total)
+
+    def collect(i: int, runs: list[EpisodeResult]):
+        for r in runs:
+            by_seed[i][r.seed] = r
+        if cache is not None:
+            cache.put_many(cfgs[i], [asdict(r) for r in runs if "error" not in r.extra])
+        progress.update(runs)
+
+    if workers <= 1:
+        for i, chunk in tasks:
+            collect(i, _run_chunk(cfgs[i], chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_run_chunk, cfgs[i], chunk): (i, chunk) for i, chunk in tasks
+            }
+            for future in as_completed(futures):
+                i, chunk = futures[future]
+                try:
+                    runs = future.result()
+                except Exception as e:  # e.g. a worker process died
+                    runs = [_failed_episode(s, repr(e)) for s in chunk]
+                collect(i, runs)
+
+    return [[by_seed[i][s] for s in seeds] for i in range(len(cfgs))]
+
+
+def evaluate_configs(
+    cfgs: list[dict],
+    seeds: list[int],
+    workers: int = 1,
+    chunk_size: int | None = None,
+    cache: EpisodeCache | None = None,
+) -> list[tuple[float, dict]]:
+    """Score every config on the same seeds, see run_configs."""
+    all_runs = run_configs(
+        cfgs, seeds, workers=workers, chunk_size=chunk_size, cache=cache
+    )
+    return [score_runs(cfg, runs) for cfg, runs in zip(cfgs, all_runs)]
+
+
 # --- Tuner -----------------------------------------------------------------------
 def tune(
     num_candidates: int = 40,
@@ -229,32 +362,53 @@ def tune(
     top_k: int = 8,
     seed_start_small: int = 100,
     seed_start_big: int = 1000,
+    workers: int = 1,
+    chunk_size: int | None = None,
+    cache: EpisodeCache | None = None,
+    coarse_seeds: list[int] | None = None,
 ):
+    """
+    Coarse random sweep on a few seeds, then a refinement of the top_k on more.
+
+    coarse_seeds replaces the seeds_small seeds from seed_start_small, e.g. with
+    the seeds of a crash corpus (see fuzz_crashes.py), which separate good and
+    bad candidates with fewer episodes than arbitrary seeds.
+    """
     random.seed(42)
 
-    print(f"Coarse sweep: {num_candidates} candidates × {seeds_small} seeds")
+    if coarse_seeds is None:
+        coarse_seeds = list(range(seed_start_small, seed_start_small + seeds_small))
+    print(f"Coarse sweep: {num_candidates} candidates × {len(coarse_seeds)} seeds")
+    cfgs = [sample_config() for _ in range(num_candidates)]
+    evaluated = evaluate_configs(
+        cfgs,
+        coarse_seeds,
+        workers=workers,
+        chunk_size=chunk_size,
+        cache=cache,
+    )
     coarse = []
-    for i in range(num_candidates):
-        cfg = sample_config()
-        score, info = evaluate_config(
-            cfg, list(range(seed_start_small, seed_start_small + seeds_small))
-        )
+    for i, (cfg, (score, info)) in enumerate(zip(cfgs, evaluated)):
         info["score_small"] = score
         coarse.append(info)
         print(
-            f"[{i+1:3d}/{num_candidates}] score={score:9.1f} dist={info['mean_distance']:7.1f} crash={info['crash_rate']:.1%} cfg={cfg}"
+            f"[{i+1:3d}/{num_candidates}] score={score:9.1f} dist={info['mean_distance']:7.1f} crash={info['crash_rate']:.1%} req={info['mean_requests']:5.1f} cfg={cfg}"
         )
 
     coarse.sort(key=lambda x: x["score_small"], reverse=True)
     finalists = coarse[:top_k]
 
     print("\nRefinement around top candidates...")
+    cfgs2 = [jitter(f["cfg"]) for f in finalists]
+    evaluated = evaluate_configs(
+        cfgs2,
+        list(range(seed_start_big, seed_start_big + seeds_big)),
+        workers=workers,
+        chunk_size=chunk_size,
+        cache=cache,
+    )
     refined = []
-    for j, f in enumerate(finalists, 1):
-        cfg2 = jitter(f["cfg"])
-        score_big, info_big = evaluate_config(
-            cfg2, list(range(seed_start_big, seed_start_big + seeds_big))
-        )
+    for j, (score_big, info_big) in enumerate(evaluated, 1):
         info_big["score_big"] = score_big
         refined.append(info_big)
         print(
@@ -265,23 +419,171 @@ def tune(
     return coarse, refined
 
 
+def successive_halving(
+    num_candidates: int = 81,
+    min_seeds: int = 3,
+    max_seeds: int = 27,
+    eta: int = 3,
+    seed_start: int = 100,
+    workers: int = 1,
+    chunk_size: int | None = None,
+    cache: EpisodeCache | None = None,
+    seeds: list[int] | None = None,
+):
+    """
+    Multi-fidelity search: evaluate all candidates on a few seeds, keep the best
+    1/eta, evaluate the survivors on eta times as many seeds, and so on.
+
+    Common random numbers: every candidate is scored on a prefix of the same seed
+    list, and survivors only run the seeds they have not run yet, so all
+    candidates in a rung are compared on exactly the same episodes.
+
+    seeds replaces the max_seeds seeds from seed_start, e.g. with the seeds of a
+    crash corpus, so the early rungs run the hardest seeds first.
+    """
+    random.seed(42)
+
+    cfgs = [sample_config() for _ in range(num_candidates)]
+    if seeds is None:
+        seeds = list(range(seed_start, seed_start + max_seeds))
+    max_seeds = len(seeds)
+    runs: list[list[EpisodeResult]] = [[] for _ in cfgs]
+    infos: list[dict] = [{} for _ in cfgs]
+    alive = list(range(num_candidates))
+    rungs = []
+    n_seeds = min(min_seeds, max_seeds)
+
+    while True:
+        new_seeds = seeds[len(runs[alive[0]]) : n_seeds]
+        print(f"Rung {len(rungs)}: {len(alive)} candidates × {n_seeds} seeds")
+        new_runs = run_configs(
+            [cfgs[i] for i in alive],
+            new_seeds,
+            workers=workers,
+            chunk_size=chunk_size,
+            cache=cache,
+        )
+        for i, candidate_runs in zip(alive, new_runs):
+            runs[i].extend(candidate_runs)
+            score, info = score_runs(cfgs[i], runs[i])
+            info["score"] = score
+            infos[i] = info
+
+        alive.sort(key=lambda i: infos[i]["score"], reverse=True)
+        best = infos[alive[0]]
+        rungs.append(
+            dict(
+                seeds=n_seeds,
+                candidates=len(alive),
+                episodes=len(alive) * len(new_seeds),
+                best_score=best["score"],
+                best_cfg=best["cfg"],
+            )
+        )
+        print(
+            f"  best score={best['score']:9.1f} dist={best['mean_distance']:7.1f} crash={best['crash_rate']:.1%}"
+        )
+
+        if n_seeds >= max_seeds or len(alive) == 1:
+            break
+        alive = alive[: max(1, len(alive) // eta)]
+        n_seeds = min(n_seeds * eta, max_seeds)
+
+    # Survivors of the last rung first, then the rest by how far they got
+    ranked = sorted(
+        infos, key=lambda info: (info["num_runs"], info["score"]), reverse=True
+    )
+    episodes = sum(len(r) for r in runs)
+    budget = dict(episodes=episodes, full_budget=num_candidates * max_seeds)
+    print(
+        f"Episodes: {episodes} of {budget['full_budget']} for a full evaluation ({episodes / budget['full_budget']:.1%})"
+    )
+    return ranked, rungs, budget
+
+
 # --- Main ------------------------------------------------------------------------
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processes to evaluate episodes in (default: 1, no pool)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Seeds per worker task (default: about 4 tasks per worker)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["random", "halving"],
+        default="random",
+        help="random: coarse sweep + refinement; halving: successive halving",
+    )
+    parser.add_argument(
+        "--cache",
+        default="episode_cache.sqlite",
+        help="SQLite file with cached episode results (default: episode_cache.sqlite)",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Simulate every episode again"
+    )
+    parser.add_argument(
+        "--corpus",
+        default=None,
+        help="Scenario corpus from fuzz_crashes.py; its seeds replace the coarse / halving seeds",
+    )
+    args = parser.parse_args()
+    cache = None if args.no_cache else EpisodeCache(args.cache)
+    seeds = None
+    if args.corpus:
+        try:
+            seeds = corpus_seeds(args.corpus)  # The tuner plays with all sensors
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"Using {len(seeds)} corpus seeds from {args.corpus}")
+
     t0 = time.time()
-    coarse, refined = tune()
+    if args.mode == "halving":
+        ranked, rungs, budget = successive_halving(
+            workers=args.workers, chunk_size=args.chunk_size, cache=cache, seeds=seeds
+        )
+        detailed = dict(rungs=rungs, ranked=ranked, budget=budget)
+        best = ranked[0]
+        score = best["score"]
+        episodes = budget["episodes"]
+    else:
+        coarse, refined = tune(
+            workers=args.workers, chunk_size=args.chunk_size, cache=cache, coarse_seeds=seeds
+        )
+        detailed = dict(coarse=coarse, refined=refined)
+        best = refined[0]
+        score = best["score_big"]
+        episodes = sum(info["num_runs"] for info in coarse + refined)
     dt = time.time() - t0
+    simulated = episodes
+    if cache is not None:
+        print(f"Episode cache: {cache.hits} hits, {cache.misses} misses ({cache.path})")
+        simulated = cache.misses  # Only episodes missing from the cache were played
+        cache.close()
 
     # Save results
     with open("tuner_detailed.json", "w") as f:
-        json.dump(dict(coarse=coarse, refined=refined), f, indent=2)
-    best = refined[0]
+        json.dump(detailed, f, indent=2)
     summary = {
         "best_cfg": best["cfg"],
-        "score_big": best["score_big"],
+        "mode": args.mode,
+        "score": score,
+        "score_big": score,  # The name this score had before the halving mode
         "mean_distance": best["mean_distance"],
         "crash_rate": best["crash_rate"],
         "ttc_per_km": best["ttc_per_km"],
         "abort_rate": best["abort_rate"],
+        "mean_requests": best.get("mean_requests", 0),
+        "episodes": episodes,
+        "episodes_simulated": simulated,
         "elapsed_seconds": dt,
         "note": "Score = mean(distance)*(1-crash) minus penalties if provided.",
     }
@@ -291,10 +593,15 @@ def main():
     print("\n" + "=" * 60)
     print("TOP RESULTS")
     print("=" * 60)
-    print(f"Best score: {best['score_big']:.1f}")
+    print(f"Best score: {score:.1f}")
     print(f"Mean distance: {best['mean_distance']:.1f}")
     print(f"Crash rate: {best['crash_rate']:.1%}")
     print(f"TTC/km: {best['ttc_per_km']:.2f}  Abort rate: {best['abort_rate']:.2f}")
+    print(f"Requests per episode: {best.get('mean_requests', 0):.1f}")
+    if cache is None:
+        print(f"Episodes simulated: {simulated}")
+    else:
+        print(f"Episodes evaluated: {episodes} ({simulated} simulated, the rest from the episode cache)")
     print("Recommended config:")
     for k, v in best["cfg"].items():
         print(f"  {k}: {v}")
@@ -0,0 +1,483 @@
+"""
+Model-predictive planning agent.
+
+Instead of following fixed action lists, PlannerAgent rebuilds a picture of
+the road from the sensor readings on every call, predicts where the other
+cars will be, and scores many candidate action sequences with a small
+kinematic model of the ego car:
+
+- Every sensor hit is mapped to the lane it lies in (there is at most one car
+  per lane) and narrowed down to an interval for that car's rear edge.
+- Cars are tracked between calls, so their speed follows from how far they
+  moved since the previous reading.
+- Candidates combine a longitudinal action (accelerate / hold / brake for a
+  number of ticks) with an optional lane change up or down, started after a
+  delay. All candidates are simulated at once with NumPy.
+- The best candidate wins; only its first ticks are returned, so the plan is
+  revised as new readings come in.
+
+decide() has the same signature as HeuristicAgent.decide and keeps to a
+per-call time budget, so it fits under the request latency of the
+competition: the budget starts when decide() is called, so tracking counts
+against it, and a group of candidates is only scored if its measured cost
+(with 50% headroom) says it ends before the deadline. The first group, the
+plan to fall back on, is always scored.
+"""
+
+import logging
+import math
+import time
+from collections import deque
+from typing import Iterator
+
+import numpy as np
+
+from dtos import RaceCarPredictRequestDto
+from heuristic import ACTIONS, SENSOR_ANGLES
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.CRITICAL)
+
+# Geometry of the game (see src/game/core.py and src/elements/road.py)
+ROAD_TOP = 40  # Bottom edge of the top wall
+ROAD_BOTTOM = 1160  # Top edge of the bottom wall
+LANE_HEIGHT = 224
+LANE_COUNT = 5
+CAR_WIDTH = 360
+CAR_HEIGHT = 179
+EGO_START_Y = 510  # Top of the ego car in the middle lane
+SPEED_STEP = 0.1  # Velocity change of one ACCELERATE/DECELERATE/STEER action
+SENSOR_STRENGTH = 1000
+ESCAPE_TICKS = 60  # Ticks of steering to move a car height sideways
+MAX_RELATIVE_SPEED = 5.5  # New cars drive at most ~5 px/tick faster or slower than ego
+GROUP_COST_HEADROOM = 1.5  # Timings vary between groups; skip a group unless it fits 1.5 times
+
+SENSOR_DIRECTIONS = {
+    name: (math.sin(math.radians(angle)), -math.cos(math.radians(angle)))
+    for angle, name in SENSOR_ANGLES.items()
+}
+
+
+def lane_top(lane: int) -> int:
+    """Top of a car placed in the given lane (same rounding as place_car)."""
+    y_start = ROAD_TOP + lane * LANE_HEIGHT
+    return int((y_start + y_start + LANE_HEIGHT) / 2 - CAR_HEIGHT / 2)
+
+
+def lane_of(top: float) -> int:
+    """Lane the center of a car with the given top lies in."""
+    lane = int((top + CAR_HEIGHT / 2 - ROAD_TOP) // LANE_HEIGHT)
+    return min(LANE_COUNT - 1, max(0, lane))
+
+
+def steering_moves(top: float, velocity_y: float, horizon: int) -> list[tuple[int, int, int]]:
+    """
+    Steering that takes the ego car to the current or a neighbouring lane.
+
+    A move is (a, b, direction): steer a ticks in the direction (+1 is
+    STEER_RIGHT, down the screen), then b ticks back, after which the y
+    velocity is zero again. Moves also work from the middle of a lane change.
+
+    :param top: The top of the ego car.
+    :param velocity_y: The y velocity of the ego car.
+    :param horizon: The maximum number of ticks a move may take.
+    :return: The moves, one per reachable lane and direction.
+    """
+    m = round(velocity_y / SPEED_STEP)
+    lane = lane_of(top)
+    a = np.arange(horizon + 1)
+    moves = set()
+    for target in (lane - 1, lane, lane + 1):
+        if not 0 <= target < LANE_COUNT:
+            continue
+        dy = lane_top(target) - top
+        if m == 0 and target == lane:
+            continue  # Driving straight on already keeps the lane
+        for direction in (-1, 1):
+            b = a + direction * m
+            # Moved while steering a ticks from m and b ticks back to zero
+            moved = SPEED_STEP * (
+                a * m
+                + direction * a * (a + 1) / 2
+                + b * (m + direction * a)
+                - direction * b * (b + 1) / 2
+            )
+            error = np.where((b >= 0) & (a + b <= horizon), np.abs(moved - dy), np.inf)
+            i = int(np.argmin(error))
+            if error[i] < LANE_HEIGHT / 8:
+                moves.add((i, int(b[i]), direction))
+    return sorted(moves)
+
+
+class PlannerAgent:
+    def __init__(
+        self,
+        base_max_speed: float = 20.0,
+        speed_ramp_rate: float = 0.01,
+        horizon: int = 120,
+        commit_ticks: int = 10,
+        cruise_ticks: int = 30,
+        time_budget: float = 0.02,
+        margin: float = 12.0,
+        lane_change_delays: tuple = (0, 6, 12, 24, 40),
+        hold_ticks: tuple = (5, 15, 40),
+        traffic_memory: int = 300,
+        track_memory: int = 120,
+    ):
+        """
+        :param base_max_speed: Speed the planner does not accelerate beyond at the start.
+        :param speed_ramp_rate: Increase of the maximum speed per tick.
+        :param horizon: The number of ticks every candidate is simulated for.
+        :param commit_ticks: The number of ticks returned when cars are in sight.
+        :param cruise_ticks: The number of ticks returned when no car is in sight.
+        :param time_budget: Seconds decide() may take, tracking included.
+        :param margin: Extra clearance in pixels around the other cars.
+        :param lane_change_delays: Ticks to wait before starting a lane change.
+        :param hold_ticks: Ticks to accelerate or brake before holding the speed
+            (the full horizon is always tried as well).
+        :param traffic_memory: Ticks a car placed on the road is assumed to stay
+            around; cars out of sight may drive as slow as the slowest car placed
+            in that time.
+        :param track_memory: Ticks a car that is out of sight is still predicted.
+        """
+        self.base_max_speed = base_max_speed
+        self.speed_ramp_rate = speed_ramp_rate
+        self.horizon = horizon
+        self.commit_ticks = commit_ticks
+        self.cruise_ticks = cruise_ticks
+        self.time_budget = time_budget
+        self.margin = margin
+        self.lane_change_delays = lane_change_delays
+        self.hold_ticks = hold_ticks
+        self.traffic_memory = traffic_memory
+        self.track_memory = track_memory
+
+        self.reset()
+
+    def reset(self):
+        """Forget everything about the previous game."""
+        self.ego_y = float(EGO_START_Y)
+        self.ego_vy = 0.0
+        self.last_tick = 0
+        self.last_actions: list[str] = []  # In execution order
+        # lane -> (tick, rear lo, rear hi, speed lo, speed hi) of the last sighting
+        self.tracks: dict[int, tuple[int, float, float, float, float]] = {}
+        self.speeds: deque[tuple[int, float]] = deque()  # (tick, ego speed)
+        self.candidates_scored = 0
+        self.seconds_per_plan = 0.0  # Cost of building and scoring one candidate, last measured
+
+    def decide(self, state: RaceCarPredictRequestDto) -> list[str]:
+        deadline = time.perf_counter() + self.time_budget
+
+        if state.elapsed_ticks < self.last_tick:
+            self.reset()  # A new game started (equal ticks are a repeated request)
+        self._advance(state)
+
+        self.speeds.append((state.elapsed_ticks, state.velocity.get("x", 0.0)))
+        while self.speeds[0][0] < state.elapsed_ticks - self.traffic_memory:
+            self.speeds.popleft()
+
+        obstacles = self._observe(state)
+        plan = self._plan(state, obstacles, deadline)
+
+        self.last_actions = plan
+        self.last_tick = state.elapsed_ticks
+        # The game pops actions from the end of the list
+        return plan[::-1]
+
+    def _advance(self, state: RaceCarPredictRequestDto):
+        """Move the ego car's lateral position through the actions run since the last call."""
+        for action in self.last_actions[: state.elapsed_ticks - self.last_tick]:
+            if action == "STEER_LEFT":
+                self.ego_vy -= SPEED_STEP
+            elif action == "STEER_RIGHT":
+                self.ego_vy += SPEED_STEP
+            self.ego_y += self.ego_vy
+        self.ego_vy = state.velocity.get("y", self.ego_vy)
+
+    def _observe(self, state: RaceCarPredictRequestDto) -> np.ndarray:
+        """
+        Turn the sensor readings into predicted cars.
+
+        :return: Array of shape (K, 5) with one row per car:
+            (lane, rear lo, rear hi, speed lo, speed hi), where the rear edge is
+            relative to the ego center at this tick and the speeds are in
+            pixels per tick.
+        """
+        center_y = int(self.ego_y) + CAR_HEIGHT // 2
+        rears: dict[int, tuple[float, float]] = {}
+
+        for name, reading in state.sensors.items():
+            if reading is None or name not in SENSOR_DIRECTIONS:
+                continue
+            dx, dy = SENSOR_DIRECTIONS[name]
+            hit_x = reading * dx
+            hit_y = center_y + reading * dy
+            if hit_y <= ROAD_TOP + 0.5 or hit_y >= ROAD_BOTTOM - 0.5:
+                continue  # A wall
+
+            lane = min(LANE_COUNT - 1, max(0, int((hit_y - ROAD_TOP) // LANE_HEIGHT)))
+            top = lane_top(lane)
+            if abs(hit_y - top) < 1 or abs(hit_y - top - CAR_HEIGHT) < 1 or abs(dx) < 1e-9:
+                lo, hi = hit_x - CAR_WIDTH, hit_x  # Hit the side of the car
+            elif dx > 0:
+                lo = hi = hit_x  # Hit the rear
+            else:
+                lo = hi = hit_x - CAR_WIDTH  # Hit the front
+
+            if lane in rears:
+                old_lo, old_hi = rears[lane]
+                new_lo, new_hi = max(lo, old_lo), min(hi, old_hi)
+                if new_lo <= new_hi + 1:  # Beams hitting a corner may be off by a pixel
+                    lo, hi = min(new_lo, new_hi), max(new_lo, new_hi)
+                else:
+                    # Readings that do not agree: keep everything they allow
+                    lo, hi = min(lo, old_lo), max(hi, old_hi)
+            rears[lane] = (lo, hi)
+
+        ego_speed = state.velocity.get("x", 0.0)
+        tracks = {}
+        for lane, (lo, hi) in rears.items():
+            # A car seen for the first time may have been placed a while ago, when
+            # the ego car drove at a different speed
+            speed_lo, speed_hi = self._slowest(), ego_speed + MAX_RELATIVE_SPEED
+            if lane in self.tracks:
+                tick, prev_lo, prev_hi, _, _ = self.tracks[lane]
+                dt = state.elapsed_ticks - tick
+                moved = (lo + hi) / 2 + state.distance - (prev_lo + prev_hi) / 2
+                speed = moved / dt
+                spread = ((hi - lo) + (prev_hi - prev_lo)) / (2 * dt) + 0.05 * math.sqrt(dt)
+                if speed_lo <= speed <= speed_hi:
+                    speed_lo, speed_hi = max(0.0, speed - spread), speed + spread
+            # Tracks are kept in road coordinates, which do not move with the ego car
+            tracks[lane] = (state.elapsed_ticks, lo + state.distance, hi + state.distance, speed_lo, speed_hi)
+
+        # Cars out of sight (e.g. between two beams) are still there for a while
+        for lane, track in self.tracks.items():
+            if lane not in tracks and state.elapsed_ticks - track[0] <= self.track_memory:
+                tracks[lane] = track
+        self.tracks = tracks
+
+        obstacles = []
+        for lane, (tick, lo, hi, speed_lo, speed_hi) in tracks.items():
+            dt = state.elapsed_ticks - tick
+            lo += speed_lo * dt - state.distance
+            hi += speed_hi * dt - state.distance
+            obstacles.append((lane, lo, hi, speed_lo, speed_hi))
+        return np.array(obstacles, dtype=float).reshape(-1, 5)
+
+    def _unseen(self, state: RaceCarPredictRequestDto) -> np.ndarray:
+        """
+        Cars that may drive just out of sight, in the lanes without a tracked car.
+
+        There is at most one other car per lane, so a lane with a tracked car
+        needs no guessing. In the other lanes a slow car may hide just beyond
+        the reach of the sensors ahead, and a fast one just beyond their reach
+        behind.
+
+        :return: Array of shape (K, 5), in the same format as _observe.
+        """
+        center_y = int(self.ego_y) + CAR_HEIGHT // 2
+        ego_speed = state.velocity.get("x", 0.0)
+        unseen = []
+        for lane in range(LANE_COUNT):
+            if lane in self.tracks:
+                continue
+            top = lane_top(lane)
+            ahead, behind = 0.0, 0.0
+            for name in state.sensors:
+                if name not in SENSOR_DIRECTIONS:
+                    continue
+                dx, dy = SENSOR_DIRECTIONS[name]
+                # Part of the beam that passes through the lane's cars
+                if abs(dy) < 1e-9:
+                    if not top <= center_y <= top + CAR_HEIGHT:
+                        continue
+                    near, far = 0.0, SENSOR_STRENGTH
+                else:
+                    near, far = sorted(((top - center_y) / dy, (top + CAR_HEIGHT - center_y) / dy))
+                    near, far = max(near, 0.0), min(far, SENSOR_STRENGTH)
+                    if near > far:
+                        continue
+                ahead = max(ahead, far * dx)
+                behind = min(behind, far * dx)
+            unseen.append((lane, ahead, ahead, self._slowest(), ego_speed))
+            unseen.append(
+                (lane, behind - CAR_WIDTH, behind - CAR_WIDTH, ego_speed, ego_speed + MAX_RELATIVE_SPEED)
+            )
+        return np.array(unseen, dtype=float).reshape(-1, 5)
+
+    def _slowest(self) -> float:
+        """Lowest speed of a car placed on the road during the traffic memory."""
+        return max(0.0, min(speed for _, speed in self.speeds) - MAX_RELATIVE_SPEED)
+
+    def _candidates(self, state: RaceCarPredictRequestDto) -> Iterator[list[tuple]]:
+        """
+        Candidate plans, grouped in the order they are scored. Groups are built
+        lazily, so the ones the time budget skips cost nothing.
+
+        A plan is (longitudinal action, ticks, steering move, delay), see
+        steering_moves for the moves. A group holds the longitudinal actions
+        of one move. The first group drives straight on, or finishes or undoes
+        a lane change right away, so there is always a plan to fall back on.
+        """
+        max_speed = self.base_max_speed + self.speed_ramp_rate * state.elapsed_ticks
+        ego_speed = state.velocity.get("x", 0.0)
+        longitudinal = [("NOTHING", self.horizon)]
+        for action in ("ACCELERATE", "DECELERATE"):
+            for ticks in (*self.hold_ticks, self.horizon):
+                if action == "ACCELERATE":
+                    ticks = min(ticks, math.ceil((max_speed - ego_speed) / SPEED_STEP))
+                if ticks > 0 and (action, ticks) not in longitudinal:
+                    longitudinal.append((action, ticks))
+
+        if round(self.ego_vy / SPEED_STEP) == 0:
+            yield [(action, ticks, (0, 0, 0), 0) for action, ticks in longitudinal]
+        for delay in self.lane_change_delays:
+            # Without steering the car keeps drifting sideways while it waits
+            top = self.ego_y + self.ego_vy * delay
+            # One group per move keeps the groups small, so the first one (the
+            # fallback) is cheap and the deadline is checked often
+            for move in steering_moves(top, self.ego_vy, self.horizon - delay):
+                yield [(action, ticks, move, delay) for action, ticks in longitudinal]
+
+    def _simulate(self, state: RaceCarPredictRequestDto, plans: list[tuple]):
+        """
+        Run the ego model for all plans at once.
+
+        :return: (codes, x, speed, top), where codes holds the indices into
+            ACTIONS of every tick, x is the ego center relative to now, speed
+            is the x velocity and top is the top of the ego car, all of shape
+            (C, H).
+        """
+        c, h = len(plans), self.horizon
+        ax = np.zeros((c, h))
+        ay = np.zeros((c, h))
+        codes = np.zeros((c, h), dtype=np.int8)
+
+        for i, (action, ticks, (a, b, direction), delay) in enumerate(plans):
+            steer = np.zeros(h, dtype=bool)
+            if a or b:
+                steer[delay : delay + a + b] = True
+                ay[i, delay : delay + a] = direction * SPEED_STEP
+                ay[i, delay + a : delay + a + b] = -direction * SPEED_STEP
+                codes[i, delay : delay + a] = 3 if direction > 0 else 4
+                codes[i, delay + a : delay + a + b] = 4 if direction > 0 else 3
+            # One action per tick: the throttle is used on the ticks without steering
+            throttle = np.flatnonzero(~steer)[:ticks]
+            if action == "ACCELERATE":
+                ax[i, throttle] = SPEED_STEP
+                codes[i, throttle] = 1
+            elif action == "DECELERATE":
+                ax[i, throttle] = -SPEED_STEP
+                codes[i, throttle] = 2
+
+        speed = np.maximum(state.velocity.get("x", 0.0) + np.cumsum(ax, axis=1), 0)
+        x = np.cumsum(speed, axis=1)
+        vy = self.ego_vy + np.cumsum(ay, axis=1)
+        top = np.floor(self.ego_y + np.cumsum(vy, axis=1))
+        return codes, x, speed, top
+
+    def _score(self, plans, obstacles, unseen, x, speed, top) -> np.ndarray:
+        """Distance covered, minus penalties for crashes and for ending up too close."""
+        h = self.horizon
+        score = x[:, -1].copy()
+        ticks = np.arange(1, h + 1)[:, None]  # (H, 1)
+        ego_left = (x - CAR_WIDTH / 2)[:, :, None]  # (C, H, 1)
+        ego_right = (x + CAR_WIDTH / 2)[:, :, None]
+        ego_top = top[:, :, None]
+
+        # Walls
+        crash = (top < ROAD_TOP) | (top + CAR_HEIGHT > ROAD_BOTTOM)
+
+        if len(unseen):
+            lane, lo, hi, speed_lo, speed_hi = unseen.T
+            car_top = ROAD_TOP + lane * LANE_HEIGHT + (LANE_HEIGHT - CAR_HEIGHT) // 2
+            beside = (ego_top < car_top + CAR_HEIGHT) & (car_top < ego_top + CAR_HEIGHT)
+            left = lo + speed_lo * ticks
+            right = hi + speed_hi * ticks + CAR_WIDTH
+            risky = beside & (ego_left < right) & (left < ego_right)
+            score -= 1e4 * risky.any(axis=(1, 2))
+
+        if len(obstacles):
+            lane, lo, hi, speed_lo, speed_hi = obstacles.T
+            car_top = ROAD_TOP + lane * LANE_HEIGHT + (LANE_HEIGHT - CAR_HEIGHT) // 2
+            beside = (ego_top < car_top + CAR_HEIGHT) & (car_top < ego_top + CAR_HEIGHT)
+            # Everywhere the car could be: (H, K)
+            left = lo + speed_lo * ticks
+            right = hi + speed_hi * ticks + CAR_WIDTH
+            crash |= (beside & (ego_left < right) & (left < ego_right)).any(axis=2)
+            # Coming closer than the margin is allowed, but only if nothing else is
+            close = beside & (ego_left < right + self.margin) & (left - self.margin < ego_right)
+            score -= 1e5 * close.any(axis=(1, 2))
+
+            # At the end of the horizon the ego car must still be able to avoid
+            # the cars in its lane by braking (ahead) or accelerating (behind)
+            end_top = ego_top[:, -1]
+            same_lane = (end_top < car_top + CAR_HEIGHT) & (car_top < end_top + CAR_HEIGHT)
+            gap_ahead = left[-1] - self.margin - ego_right[:, -1]
+            closing_ahead = np.maximum(speed[:, -1:] - speed_lo, 0)
+            gap_behind = ego_left[:, -1] - right[-1] - self.margin
+            closing_behind = np.maximum(speed_hi - speed[:, -1:], 0)
+            # Distance covered while the closing speed is brought down to zero
+            needed_ahead = closing_ahead**2 / (2 * SPEED_STEP) + closing_ahead
+            needed_behind = closing_behind**2 / (2 * SPEED_STEP) + closing_behind
+            unsafe = same_lane & (
+                ((gap_ahead >= 0) & (gap_ahead < needed_ahead))
+                | ((gap_behind >= 0) & (gap_behind < needed_behind))
+            )
+            score -= 1e5 * unsafe.any(axis=1)
+
+        # A car out of sight may show up at the end of the front sensor's range,
+        # as slow as the slowest car that could have been placed recently, and
+        # is only reacted to after the actions returned now have been run
+        closing = np.maximum(speed[:, -1] - self._slowest(), 0)
+        in_sight = SENSOR_STRENGTH - CAR_WIDTH / 2 - self.margin
+        # Either brake, or steer into a free lane
+        escape = np.minimum(closing**2 / (2 * SPEED_STEP), closing * ESCAPE_TICKS)
+        needed = escape + closing * self.cruise_ticks
+        score -= 1e4 * (needed > in_sight)
+
+        # Crashing later is less bad than crashing sooner
+        crashes = crash.any(axis=1)
+        first = np.argmax(crash, axis=1)
+        score[crashes] -= 1e7 - 1e3 * first[crashes]
+
+        # Small preference for steering less and for not waiting
+        steering = np.array([a + b for _, _, (a, b, _), _ in plans])
+        delays = np.array([delay for _, _, _, delay in plans])
+        score -= (steering > 0) * (20 + delays) + 0.1 * steering
+        return score
+
+    def _plan(self, state: RaceCarPredictRequestDto, obstacles: np.ndarray, deadline: float) -> list[str]:
+        """
+        Score the candidates until the deadline and return the start of the best one.
+
+        A group is only scored if the last measured cost per candidate, with
+        GROUP_COST_HEADROOM, says it ends before the deadline. The first group
+        is always scored, as the plan to fall back on.
+        """
+        best_score, best_plan, best_codes = -math.inf, None, None
+        unseen = self._unseen(state)
+
+        start = time.perf_counter()
+        for group in self._candidates(state):
+            estimate = GROUP_COST_HEADROOM * self.seconds_per_plan * len(group)
+            if best_plan is not None and start + estimate > deadline:
+                logger.info("Time budget used up, skipping remaining candidates")
+                break
+            codes, x, speed, top = self._simulate(state, group)
+            scores = self._score(group, obstacles, unseen, x, speed, top)
+            self.candidates_scored += len(group)
+            end = time.perf_counter()
+            # Includes building the group, which happens before it is checked
+            self.seconds_per_plan = (end - start) / len(group)
+            start = end
+            i = int(np.argmax(scores))
+            if scores[i] > best_score:
+                best_score, best_plan, best_codes = scores[i], group[i], codes[i]
+
+        logger.info(f"Plan {best_plan} scored {best_score:.1f}")
+        quiet = not len(obstacles) and not (best_codes >= 3).any()
+        n = self.cruise_ticks if quiet else self.commit_ticks
+        return [ACTIONS[code] for code in best_codes[:n]]
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Replay recorded /predict traffic through an agent.
+
+Streams a request log written by the server (RACE_CAR_RECORD, see
+request_log.py) through any agent as fast as it can decide, compares its
+actions with the recorded ones and reports decision-latency percentiles:
+
+    python replay_requests.py requests.bin                         # HeuristicAgent
+    python replay_requests.py requests.bin --agent planner --diffs 10
+    python replay_requests.py requests.bin --agent mlp:policy.npz
+    python replay_requests.py requests.bin --agent my_module:MyAgent --json report.json
+
+Every recorded session gets its own agent, with the same new-game detection
+as the server (sessions.py), so stateful agents see the requests of one game
+in order. The replay is open-loop: the requests are the ones the recorded
+agent's actions led to, so once decisions differ, later ones of the same
+game are compared on states the new agent would not have reached. The first
+difference of every game is reported separately for that reason.
+"""
+
+import argparse
+import importlib
+import json
+import math
+import time
+from itertools import groupby
+
+import numpy as np
+
+from request_log import read_records
+from sessions import AgentSessions
+
+
+def agent_factory(spec: str):
+    """
+    Resolve an agent name into a function that creates a new agent.
+
+    :param spec: heuristic, planner, mlp[:policy.npz] or module:Class.
+    """
+    name, _, argument = spec.partition(":")
+    if name == "heuristic":
+        from heuristic import HeuristicAgent
+
+        return HeuristicAgent
+    if name == "planner":
+        from planner import PlannerAgent
+
+        return PlannerAgent
+    if name == "mlp":
+        from mlp_policy import MlpPolicy
+
+        policy = MlpPolicy.load(argument or "policy.npz")
+        return lambda: MlpPolicy(policy.params, policy.hidden, policy.durations)
+    if argument:
+        return getattr(importlib.import_module(name), argument)
+    raise ValueError(f"Unknown agent {spec!r}; use heuristic, planner, mlp[:path] or module:Class")
+
+
+def run_length(actions: list[str]) -> str:
+    """A short form of an action list, e.g. 'ACCELERATE x12, NOTHING x3'."""
+    return ", ".join(f"{action} x{len(list(group))}" for action, group in groupby(actions)) or "-"
+
+
+def replay(path: str, factory, max_diffs: int = 0) -> dict:
+    """
+    Play every record of a log through new agents.
+
+    :param path: The request log (rotated backups are read first).
+    :param factory: Creates the agent of every game.
+    :param max_diffs: The number of differing decisions to keep as examples.
+    :return: The report.
+    """
+    sessions = AgentSessions(factory, max_sessions=1 << 30, idle_seconds=math.inf)
+    latencies_ns = []
+    recorded_us = []
+    differing = 0
+    first_action_differing = 0
+    diverged_games = set()
+    examples = []
+
+    start = time.perf_counter()
+    for record in read_records(path):
+        agent = sessions.agent_for(record.request, record.session)
+        game = (record.session, sessions.sessions[record.session].games)
+
+        t0 = time.perf_counter_ns()
+        actions = agent.decide(record.request)
+        latencies_ns.append(time.perf_counter_ns() - t0)
+        recorded_us.append(record.latency_us)
+
+        actions = list(actions)
+        if actions != record.actions:
+            differing += 1
+            first_action_differing += actions[:1] != record.actions[:1]
+            diverged_games.add(game)
+            if len(examples) < max_diffs:
+                examples.append(
+                    dict(
+                        session=record.session,
+                        elapsed_ticks=record.request.elapsed_ticks,
+                        recorded=run_length(record.actions),
+                        replayed=run_length(actions),
+                    )
+                )
+    elapsed = time.perf_counter() - start
+
+    total = len(latencies_ns)
+    latencies_us = np.array(latencies_ns) / 1e3
+    report = dict(
+        records=total,
+        sessions=sessions.created,
+        games=sessions.created + sessions.resets,
+        games_with_differences=len(diverged_games),
+        identical=total - differing,
+        differing=differing,
+        first_action_differing=first_action_differing,
+        records_per_second=total / elapsed if elapsed else 0.0,
+    )
+    if total:
+        for q in (50, 90, 99):
+            report[f"latency_us_p{q}"] = float(np.percentile(latencies_us, q))
+            report[f"recorded_latency_us_p{q}"] = float(np.percentile(recorded_us, q))
+        report["latency_us_max"] = float(latencies_us.max())
+        report["recorded_latency_us_max"] = float(max(recorded_us))
+    report["examples"] = examples
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded request log through an agent")
+    parser.add_argument("log", help="The request log written with RACE_CAR_RECORD")
+    parser.add_argument("--agent", default="heuristic", help="heuristic, planner, mlp[:path] or module:Class")
+    parser.add_argument("--diffs", type=int, default=5, help="Differing decisions to print")
+    parser.add_argument("--json", default=None, help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = replay(args.log, agent_factory(args.agent), max_diffs=args.diffs)
+    total = max(1, report["records"])
+    print(
+        f"{report['records']} requests from {report['games']} games in {report['sessions']} sessions, "
+        f"{report['records_per_second']:.0f} requests/s"
+    )
+    print(
+        f"identical: {report['identical']} ({report['identical'] / total:.1%}), "
+        f"differing: {report['differing']} (first action: {report['first_action_differing']}), "
+        f"games with differences: {report['games_with_differences']}"
+    )
+    if report["records"]:
+        print(f"{'':10s} {'p50':>9s} {'p90':>9s} {'p99':>9s} {'max':>9s}  (us)")
+        for label, prefix in (("replayed", "latency_us"), ("recorded", "recorded_latency_us")):
+            print(
+                f"{label:10s} "
+                + " ".join(f"{report[f'{prefix}_{q}']:9.1f}" for q in ("p50", "p90", "p99", "max"))
+            )
+    for example in report["examples"]:
+        print(
+            f"  session {example['session'] or '-'} tick {example['elapsed_ticks']}: "
+            f"recorded [{example['recorded']}] replayed [{example['replayed']}]"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Compact rotating binary log of /predict traffic.
+
+RequestRecorder appends every request the server answered, and the actions
+it answered with, so real traffic can be played through another agent
+later (see replay_requests.py). A file starts with a header and holds
+records back to back, all little-endian:
+
+    magic     4 bytes   b"RCRL"
+    version   uint8
+
+    record:
+    time               float64   seconds since the epoch
+    latency            uint32    microseconds the agent took to decide
+    session length     uint8
+    session            session length bytes (UTF-8), "" without the header
+    elapsed_ticks      uint32
+    did_crash          uint8
+    distance           float64
+    velocity x, y      2 x float64
+    sensor mask        uint16    bit i set if SENSOR_NAMES[i] was in the request
+    readings           float64 for every set bit, NaN for None
+    action count       uint16
+    actions            one byte per action, the index into ACTION_NAMES
+
+A record takes about 200 bytes. Once a file would grow past max_bytes it is
+renamed to path.1 (path.1 to path.2, ...), keeping the newest backups
+files, like logging.handlers.RotatingFileHandler.
+
+record() is called on the server's event loop, so it only encodes the
+record and hands it to a writer thread, which does the file writes,
+flushes and rotations. If the writer falls max_pending records behind,
+e.g. on a stalled disk, new records are dropped and counted instead of
+holding up the server.
+"""
+
+import logging
+import math
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Iterator, NamedTuple
+
+from dtos import RaceCarPredictRequestDto
+from heuristic import SENSOR_ANGLES
+from src.game.action_log import ACTION_CODES, ACTION_NAMES
+
+MAGIC = b"RCRL"
+VERSION = 1
+HEADER = struct.Struct("<4sB")
+SENSOR_NAMES = list(SENSOR_ANGLES.values())
+SENSOR_BITS = {name: 1 << i for i, name in enumerate(SENSOR_NAMES)}
+
+RECORD_START = struct.Struct("<dIB")  # time, latency, session length
+RECORD_STATE = struct.Struct("<IBdddH")  # elapsed_ticks, did_crash, distance, velocity, sensor mask
+COUNT = struct.Struct("<H")
+
+logger = logging.getLogger(__name__)
+
+
+class Record(NamedTuple):
+    time: float
+    latency_us: int
+    session: str
+    request: RaceCarPredictRequestDto
+    actions: list[str]
+
+
+def encode_record(
+    session: str, request: RaceCarPredictRequestDto, actions: list[str], latency_us: int, now: float
+) -> bytes:
+    unknown = [action for action in actions if action not in ACTION_CODES]
+    if unknown:
+        # Storing them as any known action would make the log lie about the answer
+        raise ValueError(f"Unknown actions {sorted(set(unknown))}")
+    # Cut at 255 bytes without splitting a multi-byte character
+    session_bytes = session.encode()[:255].decode(errors="ignore").encode()
+    mask = 0
+    readings = []
+    for name in SENSOR_NAMES:
+        if name in request.sensors:
+            mask |= SENSOR_BITS[name]
+            reading = request.sensors[name]
+            readings.append(math.nan if reading is None else reading)
+    return b"".join(
+        [
+            RECORD_START.pack(now, min(latency_us, 0xFFFFFFFF), len(session_bytes)),
+            session_bytes,
+            RECORD_STATE.pack(
+                request.elapsed_ticks,
+                request.did_crash,
+                request.distance,
+                request.velocity.get("x", 0.0),
+                request.velocity.get("y", 0.0),
+                mask,
+            ),
+            struct.pack(f"<{len(readings)}d", *readings),
+            COUNT.pack(len(actions)),
+            bytes(ACTION_CODES[action] for action in actions),
+        ]
+    )
+
+
+def decode_records(data: bytes) -> Iterator[Record]:
+    """
+    The records of one log file, oldest first.
+
+    A last record cut short, e.g. by killing the server while it wrote, is skipped.
+    """
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a request log")
+    if version != VERSION:
+        raise ValueError(f"Unsupported request log version {version}")
+
+    offset = HEADER.size
+    while offset < len(data):
+        try:
+            record, offset = _decode_record(data, offset)
+        except struct.error:
+            return  # Only a record running past the end of the data fails to unpack
+        if offset > len(data):
+            return
+        yield record
+
+
+def _decode_record(data: bytes, offset: int) -> tuple[Record, int]:
+    now, latency_us, session_length = RECORD_START.unpack_from(data, offset)
+    offset += RECORD_START.size
+    session = data[offset : offset + session_length].decode(errors="replace")
+    offset += session_length
+    elapsed_ticks, did_crash, distance, velocity_x, velocity_y, mask = RECORD_STATE.unpack_from(data, offset)
+    offset += RECORD_STATE.size
+    names = [name for name in SENSOR_NAMES if mask & SENSOR_BITS[name]]
+    readings = struct.unpack_from(f"<{len(names)}d", data, offset)
+    offset += 8 * len(names)
+    (count,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    actions = [ACTION_NAMES[code] for code in data[offset : offset + count]]
+    offset += count
+
+    request = RaceCarPredictRequestDto(
+        did_crash=bool(did_crash),
+        elapsed_ticks=elapsed_ticks,
+        distance=distance,
+        velocity={"x": velocity_x, "y": velocity_y},
+        sensors={
+            name: None if math.isnan(reading) else reading
+            for name, reading in zip(names, readings)
+        },
+    )
+    return Record(now, latency_us, session, request, actions), offset
+
+
+def log_files(path: str) -> list[str]:
+    """A log and its rotated backups, oldest first."""
+    files = [path] if os.path.exists(path) else []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.insert(0, f"{path}.{index}")
+        index += 1
+    return files
+
+
+def read_records(path: str) -> Iterator[Record]:
+    """The records of a log and its rotated backups, oldest first."""
+    files = log_files(path)
+    if not files:
+        raise FileNotFoundError(path)
+    for file in files:
+        with open(file, "rb") as f:
+            yield from decode_records(f.read())
+
+
+class RequestRecorder:
+    def __init__(self, path: str, max_bytes: int = 64 << 20, backups: int = 5, max_pending: int = 10000):
+        """
+        Initialize a RequestRecorder object, appending to the log at path.
+
+        :param path: The log file.
+        :param max_bytes: The size a file is rotated at.
+        :param backups: The number of rotated files to keep.
+        :param max_pending: The number of records waiting for the writer after which new ones are dropped.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.records = 0  # Written by the writer thread
+        self.dropped = 0
+        self.file = None
+        self._open()
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(target=self._write_records, name="request-recorder", daemon=True)
+        self._writer.start()
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file = open(self.path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, VERSION))
+
+    def record(
+        self,
+        request: RaceCarPredictRequestDto,
+        actions: list[str],
+        latency_us: int = 0,
+        session: str = "",
+    ):
+        """
+        Hand one answered request to the writer thread.
+
+        :param request: The request.
+        :param actions: The actions the agent answered with.
+        :param latency_us: The time the agent took to decide, in microseconds.
+        :param session: The session header of the request.
+        :raises ValueError: If an action is not one of ACTION_NAMES.
+        """
+        data = encode_record(session, request, actions, latency_us, time.time())
+        try:
+            self._pending.put_nowait(data)
+        except queue.Full:
+            if self.dropped == 0:
+                logger.warning("The request log writer fell behind, dropping records")
+            self.dropped += 1
+
+    def _write_records(self):
+        while True:
+            data = self._pending.get()
+            try:
+                if data is None:
+                    return
+                if self.file.tell() + len(data) > self.max_bytes:
+                    self._rotate()
+                self.file.write(data)
+                # One write per record, so a killed server or a copy of the live log loses nothing
+                self.file.flush()
+                self.records += 1
+            except Exception:
+                logger.exception("Could not write the request log")
+            finally:
+                self._pending.task_done()
+
+    def _rotate(self):
+        self.file.close()
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{index}"):
+                    os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def flush(self):
+        """Wait until every record handed to record() so far is written."""
+        self._pending.join()
+
+    def close(self):
+        """Write the pending records and close the log."""
+        if self._writer.is_alive():
+            self._pending.put(None)
+            self._writer.join()
+        if not self.file.closed:
+            self.file.close()
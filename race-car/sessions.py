@@ -0,0 +1,161 @@
+"""
+Per-game agent sessions for the /predict endpoint.
+
+Agents such as HeuristicAgent keep state between calls (driving_state,
+last_measurement, lane_change_target, ...), so one shared agent mixes up
+games that are played at the same time or one after the other.
+AgentSessions gives every game its own agent:
+
+- A client that sends the SESSION_HEADER header gets one agent per header
+  value (HttpAgent sends a random one per instance).
+- Without the header, all requests share the DEFAULT_SESSION session.
+- Either way, a request whose elapsed_ticks is lower than the previous
+  request's starts a new game, and so a new agent. Equal ticks are kept,
+  because a prefetching client may ask for the same tick twice.
+- A request for a new session that also sends SESSION_FORK_HEADER starts
+  with a copy of the named session's agent. A prefetching client sends its
+  speculative requests to such a fork, so a discarded guess never touches
+  the agent of the real game, and switches over to the fork when it uses
+  the answer (see HttpAgent.fork and src/game/prefetch.py). A client only
+  forks the session it plays in, so a new fork drops the earlier fork of the
+  same session (a discarded guess) and the session it was forked from (left
+  when the client switched over).
+
+Sessions live in an LRU of at most max_sessions. A session is dropped
+once it has been idle for idle_seconds, or when room is needed for a new
+one, and the least recently used goes first. Sessions live in the memory of
+one server process, so run several uvicorn workers only behind a proxy that
+sends every session to the same worker.
+"""
+
+import copy
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from dtos import RaceCarPredictRequestDto
+
+SESSION_HEADER = "X-Session-Id"
+SESSION_FORK_HEADER = "X-Session-Fork"
+DEFAULT_SESSION = ""
+
+
+class Session:
+    __slots__ = ("agent", "last_tick", "last_seen", "games", "requests", "parent", "fork")
+
+    def __init__(self, agent, now: float):
+        self.agent = agent
+        self.last_tick = -1
+        self.last_seen = now
+        self.games = 1
+        self.requests = 0
+        self.parent: Optional[str] = None  # The session this one was forked from
+        self.fork: Optional[str] = None  # The last fork of this session
+
+
+class AgentSessions:
+    def __init__(
+        self,
+        factory: Callable[[], object],
+        max_sessions: int = 256,
+        idle_seconds: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize an AgentSessions object.
+
+        :param factory: Creates the agent of a new game.
+        :param max_sessions: The most sessions kept at once.
+        :param idle_seconds: A session without requests for this long is dropped.
+        :param clock: The time source, in seconds.
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self.sessions: OrderedDict[str, Session] = OrderedDict()
+
+        self.created = 0
+        self.forked = 0
+        self.dropped_forks = 0  # Forks and parents dropped because the client moved on
+        self.resets = 0  # New games detected from elapsed_ticks going back
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def agent_for(
+        self,
+        request: RaceCarPredictRequestDto,
+        key: Optional[str] = None,
+        fork_of: Optional[str] = None,
+    ):
+        """
+        The agent of the game a request belongs to.
+
+        :param request: The request.
+        :param key: The session header of the request, if any.
+        :param fork_of: The fork header of the request, if any: a new session
+            starts with a copy of this session's agent.
+        :return: The agent to ask.
+        """
+        key = DEFAULT_SESSION if key is None else key
+        now = self.clock()
+        self._evict_idle(now)
+
+        session = self.sessions.get(key)
+        if session is None:
+            # Mark the parent as used first, so making room cannot evict it
+            parent = self.sessions.get(fork_of) if fork_of is not None else None
+            if parent is not None:
+                self.sessions.move_to_end(fork_of)
+                self._drop_stale_forks(parent)
+            while len(self.sessions) >= self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted += 1
+            if parent is not None:
+                session = self.sessions[key] = Session(copy.deepcopy(parent.agent), now)
+                session.last_tick = parent.last_tick
+                session.games = parent.games
+                session.parent = fork_of
+                parent.fork = key
+                self.forked += 1
+            else:
+                session = self.sessions[key] = Session(self.factory(), now)
+            self.created += 1
+        else:
+            self.sessions.move_to_end(key)
+            if request.elapsed_ticks < session.last_tick:
+                session.agent = self.factory()
+                session.games += 1
+                self.resets += 1
+
+        session.last_tick = request.elapsed_ticks
+        session.last_seen = now
+        session.requests += 1
+        return session.agent
+
+    def _drop_stale_forks(self, parent: Session):
+        for stale in (parent.fork, parent.parent):
+            if stale is not None and self.sessions.pop(stale, None) is not None:
+                self.dropped_forks += 1
+        parent.fork = parent.parent = None
+
+    def _evict_idle(self, now: float):
+        # The least recently used session is first, so stop at the first recent one
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if now - session.last_seen < self.idle_seconds:
+                break
+            self.sessions.popitem(last=False)
+            self.evicted += 1
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "created": self.created,
+            "forked": self.forked,
+            "dropped_forks": self.dropped_forks,
+            "resets": self.resets,
+            "evicted": self.evicted,
+        }
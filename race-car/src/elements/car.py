@@ -1,11 +1,52 @@
-import pygame
+import struct
+from random import Random
 from typing import Optional
 from src.mathematics.vector import Vector
+from src.mathematics.rect import Rect
 from src.elements.road import Lane
 from src.mathematics.randomizer import random_number
+from src.optional_pygame import pygame
+
+
+def get_sprite_size(path: str, target_height: int) -> tuple[int, int]:
+    """
+    Compute the size of a sprite scaled to the target height, without loading it.
+
+    The width and height are read from the PNG header, which gives the same
+    result as loading and scaling the image with pygame.
+
+    :param path: The file path to the sprite image.
+    :param target_height: The target height to scale the sprite to.
+    :return: The scaled (width, height) of the sprite.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(24)
+        if header[:8] != b"\x89PNG\r\n\x1a\n":
+            raise ValueError(f"{path} is not a PNG file")
+        width, height = struct.unpack(">II", header[16:24])
+        aspect_ratio = width / height
+        return int(aspect_ratio * target_height), target_height
+    except (OSError, ValueError, struct.error):
+        # Same placeholder size as load_sprite uses if loading fails
+        return target_height, target_height
 
 
 class Car:
+    __slots__ = (
+        "color",
+        "velocity",
+        "lane",
+        "x",
+        "y",
+        "sprite_path",
+        "target_height",
+        "width",
+        "height",
+        "_sprite",
+        "_rect",
+    )
+
     def __init__(
         self,
         color: str,
@@ -25,13 +66,25 @@ class Car:
         self.lane = lane
         self.x = 0
         self.y = 0
-        self.sprite = self.load_sprite(f"public/assets/{color}car.png", target_height)
+        self.sprite_path = f"public/assets/{color}car.png"
+        self.target_height = target_height
+        self.width, self.height = get_sprite_size(self.sprite_path, target_height)
+        self._sprite = None
+        self._rect: Optional[Rect] = None
 
-    def update(self, ego: "Car"):
+    @property
+    def sprite(self) -> "pygame.Surface":
+        """The car's sprite, loaded on first use so headless runs never load it."""
+        if self._sprite is None:
+            self._sprite = self.load_sprite(self.sprite_path, self.target_height)
+        return self._sprite
+
+    def update(self, ego: "Car", rng: Optional[Random] = None):
         """
         Update the car's position based on its velocity and the ego car's velocity.
 
         :param ego: The ego car (reference car).
+        :param rng: The game's random number generator (default is the global one).
         """
         if self == ego:
             self.y += self.velocity.y
@@ -39,7 +92,7 @@ class Car:
 
         self.x += self.velocity.x - ego.velocity.x
         self.y += self.velocity.y
-        rn = random_number() - 0.5
+        rn = (rng.random() if rng is not None else random_number()) - 0.5
         velocity_change = rn / 5
         self.velocity.x = self.velocity.x + velocity_change
 
@@ -69,7 +122,7 @@ class Car:
         """
         self.velocity.y += amount
 
-    def load_sprite(self, path: str, target_height: int) -> pygame.Surface:
+    def load_sprite(self, path: str, target_height: int) -> "pygame.Surface":
         """
         Load the car's sprite from the given file path.
 
@@ -91,20 +144,21 @@ class Car:
             )  # Return a placeholder surface if loading fails
 
     @property
-    def rect(self):
-        """Return the pygame.Rect representing the car's current position and size."""
-        if self.sprite:
-            return pygame.Rect(
-                int(self.x),
-                int(self.y),
-                self.sprite.get_width(),
-                self.sprite.get_height(),
-            )
-        else:
-            # Default size if sprite is missing
-            return pygame.Rect(int(self.x), int(self.y), 50, 50)
-
-    def get_bounds(self) -> pygame.Rect:
+    def rect(self) -> Rect:
+        """
+        Return the Rect representing the car's current position and size.
+
+        The Rect is reused until the car moves to another pixel, so reading
+        it several times per tick (collisions, sensors) builds it only once.
+        """
+        x = int(self.x)
+        y = int(self.y)
+        rect = self._rect
+        if rect is None or rect.x != x or rect.y != y:
+            rect = self._rect = Rect(x, y, self.width, self.height)
+        return rect
+
+    def get_bounds(self) -> Rect:
         """
         Returns the bounding rectangle of the car for collision/sensor purposes.
         """
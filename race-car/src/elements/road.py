@@ -1,7 +1,8 @@
-import pygame
-from typing import List, Dict
+from random import Random
+from typing import List, Dict, Optional
 from src.elements.wall import Wall
 from src.mathematics.randomizer import random_number
+from src.optional_pygame import pygame
 
 
 class Lane:
@@ -28,8 +29,7 @@ class Road:
         self.lanes: List[Lane] = []
         self.walls: List[Wall] = []
 
-        self.surface = pygame.Surface((width, height))
-        self.build_background()
+        self._surface = None
         self.build_lanes(self.lane_height)
 
         self.y_start = self.lanes[0].y_start
@@ -42,6 +42,16 @@ class Road:
             ),  # Bottom wall
         ]
 
+    @property
+    def surface(self) -> "pygame.Surface":
+        """The road background, drawn on first use so headless runs never build it."""
+        if self._surface is None:
+            self._surface = pygame.Surface((self._width, self._height))
+            self.build_background()
+            self.build_sidelines()
+            self.build_middle_lines()
+        return self._surface
+
     def first_lane(self) -> Lane:
         return self.lanes[0]
 
@@ -51,14 +61,15 @@ class Road:
     def last_lane(self) -> Lane:
         return self.lanes[-1]
 
-    def random_lane(self) -> Lane:
-        return self.lanes[int(random_number() * len(self.lanes))]
+    def random_lane(self, rng: Optional[Random] = None) -> Lane:
+        rn = rng.random() if rng is not None else random_number()
+        return self.lanes[int(rn * len(self.lanes))]
 
     def build_background(self):
         """
         Build the road background.
         """
-        self.surface.fill((40, 44, 52))  # Dark gray background
+        self._surface.fill((40, 44, 52))  # Dark gray background
 
     def build_lanes(self, lane_height: float):
         self.lanes.clear()
@@ -67,9 +78,6 @@ class Road:
             y_end = y_start + lane_height
             self.lanes.append(Lane(y_start, y_end, f"Lane {i+1}"))
 
-        self.build_sidelines()
-        self.build_middle_lines()
-
     def build_sidelines(self):
         # Draw top and bottom sidelines
         self.draw_line(
@@ -92,7 +100,7 @@ class Road:
 
     def draw_line(self, x: int, y: int, width: int, height: int, color: tuple):
         pygame.draw.rect(
-            self.surface, color, pygame.Rect(x, int(y), width, int(height))
+            self._surface, color, pygame.Rect(x, int(y), width, int(height))
         )
 
     def get_lane_height(self):
@@ -1,4 +1,6 @@
-import pygame
+from src.mathematics.rect import Rect
+from src.optional_pygame import pygame
+
 
 class Wall:
     def __init__(self, x: int, y: int, width: int, height: int):
@@ -10,10 +12,10 @@ class Wall:
         :param width: The width of the wall.
         :param height: The height of the wall.
         """
-        self.rect = pygame.Rect(x, y, width, height)
+        self.rect = Rect(x, y, width, height)
         self.color = (21, 19, 23)  # Dark gray color
 
-    def draw(self, surface: pygame.Surface):
+    def draw(self, surface: "pygame.Surface"):
         """
         Draw the wall on the given surface.
 
@@ -21,8 +23,8 @@ class Wall:
         """
         pygame.draw.rect(surface, self.color, self.rect)
 
-    def get_bounds(self) -> pygame.Rect:
+    def get_bounds(self) -> Rect:
         """
         Returns the bounding rectangle of the car for collision/sensor purposes.
         """
-        return self.rect
\ No newline at end of file
+        return self.rect
@@ -0,0 +1,99 @@
+"""
+Compact binary action log.
+
+A log is a small header followed by one byte per tick, so a full 3600-tick
+game takes a few kilobytes and loads in one read:
+
+    magic     4 bytes   b"RCAL"
+    version   uint8
+    seed kind uint8     0 = None (only read, from older logs), 1 = int, 2 = str
+    sensor_removal      uint16
+    seed length         uint16
+    seed                seed length bytes (decimal digits for int seeds, UTF-8 for str)
+    actions             one byte per tick, the index into ACTION_NAMES
+
+Byte i holds the action played on tick i + 1.
+"""
+
+import struct
+
+ACTION_NAMES = ["NOTHING", "ACCELERATE", "DECELERATE", "STEER_LEFT", "STEER_RIGHT"]
+ACTION_CODES = {name: code for code, name in enumerate(ACTION_NAMES)}
+
+MAGIC = b"RCAL"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHH")
+SEED_NONE, SEED_INT, SEED_STR = 0, 1, 2
+
+
+class ActionLog:
+    def __init__(self, seed_value=None, sensor_removal: int = 0, actions: bytes = b""):
+        """
+        Initialize an ActionLog object.
+
+        :param seed_value: The seed the game was created with (an int, a str or None).
+        :param sensor_removal: The number of random sensors removed in the game.
+        :param actions: The action codes played so far, one byte per tick.
+        """
+        self.seed_value = seed_value
+        self.sensor_removal = sensor_removal
+        self.actions = bytearray(actions)
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+    def append(self, action: str):
+        """Record the action of the next tick."""
+        self.actions.append(ACTION_CODES.get(action, 0))
+
+    def action(self, tick: int) -> str:
+        """
+        The action played on the given tick (ticks start at 1).
+
+        :return: The action, or NOTHING for ticks beyond the end of the log.
+        """
+        if 1 <= tick <= len(self.actions):
+            return ACTION_NAMES[self.actions[tick - 1]]
+        return "NOTHING"
+
+    def to_bytes(self) -> bytes:
+        """
+        :raises TypeError: If the seed is not an int or a str. Other seeds
+            (None, float, bool, ...) could not be replayed into the same game.
+        """
+        seed_value = self.seed_value
+        if isinstance(seed_value, int) and not isinstance(seed_value, bool):
+            kind, seed = SEED_INT, str(seed_value).encode()
+        elif isinstance(seed_value, str):
+            kind, seed = SEED_STR, seed_value.encode()
+        else:
+            raise TypeError(f"Only int and str seeds can be logged, got {type(seed_value).__name__}")
+        header = HEADER.pack(MAGIC, VERSION, kind, self.sensor_removal, len(seed))
+        return header + seed + bytes(self.actions)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ActionLog":
+        magic, version, kind, sensor_removal, seed_length = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not an action log")
+        if version != VERSION:
+            raise ValueError(f"Unsupported action log version {version}")
+
+        start = HEADER.size
+        seed = data[start : start + seed_length].decode()
+        if kind == SEED_NONE:
+            seed_value = None
+        elif kind == SEED_INT:
+            seed_value = int(seed)
+        else:
+            seed_value = seed
+        return cls(seed_value, sensor_removal, data[start + seed_length :])
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "ActionLog":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
@@ -0,0 +1,371 @@
+"""
+Lockstep batch simulator.
+
+Advances N headless episodes at once. Ego and car positions and velocities,
+lanes, crash flags and sensor readings live in NumPy arrays (one row per
+episode), and the game logic of GameState is applied to all rows together.
+
+Every episode keeps its own seeded random.Random and draws from it in the
+same order as GameState does, and the arithmetic is the same, so each row
+ends with exactly the distance/crashed/ticks of run_headless for its seed.
+"""
+
+from typing import Optional
+import numpy as np
+from heuristic import HeuristicAgent
+from dtos import RaceCarPredictRequestDto
+from ..elements.sensor import SENSOR_STRENGTH
+from ..mathematics.raycast import batch_ray_aabb_distances
+from ..mathematics.vector import Vector
+from .action_log import ACTION_CODES
+from .core import GameState, LANE_COUNT, SURFACE_WIDTH, SENSOR_OPTIONS, MAX_TICKS
+from .headless import TICK_MS
+
+SENSOR_NAMES = [name for _, name in SENSOR_OPTIONS]
+CAR_SLOTS = LANE_COUNT - 1  # Number of other cars in every episode
+X_OFFSET_BEHIND = -0.5
+X_OFFSET_IN_FRONT = 1.5
+
+
+class BatchGameState:
+    def __init__(self, seeds: list, sensor_removal: int = 0, agents=None):
+        """
+        Initialize one episode per seed, exactly like GameState.create does.
+
+        :param seeds: The seed of every episode.
+        :param sensor_removal: The number of random sensors to remove.
+        :param agents: One agent per episode (default is a new HeuristicAgent each).
+        """
+        if not seeds:
+            raise ValueError("A batch needs at least one seed")
+        states = [GameState.create("", s, sensor_removal=sensor_removal) for s in seeds]
+        n = len(states)
+        self.size = n
+        self.sensor_removal = sensor_removal
+        self.rngs = [state.rng for state in states]
+        self.agents: list[HeuristicAgent] = (
+            list(agents) if agents is not None else [state.agent for state in states]
+        )
+
+        first = states[0]
+        self.lanes = [(lane.y_start, lane.y_end) for lane in first.road.lanes]
+        self.walls = np.array(
+            [
+                (r.left, r.top, r.right, r.bottom)
+                for r in (wall.get_bounds() for wall in first.road.walls)
+            ],
+            dtype=float,
+        ).reshape(-1, 4)
+
+        # Ego car
+        self.ego_x = np.zeros(n)
+        self.ego_y = np.zeros(n)
+        self.ego_vx = np.zeros(n)
+        self.ego_vy = np.zeros(n)
+        self.ego_width = np.zeros(n)
+        self.ego_height = np.zeros(n)
+
+        # Other cars, one column per car
+        self.car_x = np.zeros((n, CAR_SLOTS))
+        self.car_y = np.zeros((n, CAR_SLOTS))
+        self.car_vx = np.zeros((n, CAR_SLOTS))
+        self.car_vy = np.zeros((n, CAR_SLOTS))
+        self.car_width = np.zeros((n, CAR_SLOTS))
+        self.car_height = np.zeros((n, CAR_SLOTS))
+        self.car_lane = np.full((n, CAR_SLOTS), -1, dtype=int)
+        self.car_active = np.zeros((n, CAR_SLOTS), dtype=bool)
+        # Order of the cars on the road and in the bucket matters for the RNG
+        self.car_order: list[list[int]] = [[] for _ in range(n)]
+        self.car_bucket: list[list[int]] = [[] for _ in range(n)]
+
+        # Sensors, one column per entry of SENSOR_OPTIONS
+        self.beams = np.array(
+            [
+                Vector(0, -SENSOR_STRENGTH).rotate(angle).to_array()
+                for angle, _ in SENSOR_OPTIONS
+            ],
+            dtype=float,
+        )
+        self.strengths = np.full(len(SENSOR_OPTIONS), float(SENSOR_STRENGTH))
+        self.sensor_columns: list[list[int]] = [[] for _ in range(n)]
+        self.readings = np.full((n, len(SENSOR_OPTIONS)), np.nan)
+        self.sensors_stale = np.zeros(n, dtype=bool)  # See GameState.update_sensors
+
+        self.crashed = np.zeros(n, dtype=bool)
+        self.distance = np.zeros(n)
+        self.ticks = np.zeros(n, dtype=int)
+        self.elapsed_game_time = np.zeros(n)
+        self.active = np.ones(n, dtype=bool)
+        self.actions: list[list[str]] = [[] for _ in range(n)]
+
+        for i, state in enumerate(states):
+            self._load(i, state)
+
+    def _load(self, i: int, state: GameState):
+        """Copy a newly created game into row i."""
+        self.rngs[i] = state.rng
+        self.ego_x[i] = state.ego.x
+        self.ego_y[i] = state.ego.y
+        self.ego_vx[i] = state.ego.velocity.x
+        self.ego_vy[i] = state.ego.velocity.y
+        self.ego_width[i] = state.ego.width
+        self.ego_height[i] = state.ego.height
+
+        # All cars start in the car bucket
+        self.car_x[i] = 0
+        self.car_y[i] = 0
+        self.car_vx[i] = 0
+        self.car_vy[i] = 0
+        self.car_width[i] = [car.width for car in state.car_bucket]
+        self.car_height[i] = [car.height for car in state.car_bucket]
+        self.car_lane[i] = -1
+        self.car_active[i] = False
+        self.car_order[i] = []
+        self.car_bucket[i] = list(range(CAR_SLOTS))
+
+        self.sensor_columns[i] = [SENSOR_NAMES.index(sensor.name) for sensor in state.sensors]
+        self.readings[i] = np.nan
+        self.sensors_stale[i] = False
+
+        self.crashed[i] = False
+        self.distance[i] = 0
+        self.ticks[i] = 0
+        self.elapsed_game_time[i] = 0
+        self.active[i] = True
+        self.actions[i] = []
+
+    def reset_episode(self, i: int, seed_value, agent=None):
+        """
+        Start a new episode in row i, exactly like GameState.create does.
+
+        :param i: The row to reuse.
+        :param seed_value: The seed of the new episode.
+        :param agent: The agent of the new episode (default is a new HeuristicAgent).
+        """
+        state = GameState.create("", seed_value, sensor_removal=self.sensor_removal)
+        self._load(i, state)
+        self.agents[i] = agent if agent is not None else state.agent
+
+    # Game logic, applied to the active episodes
+    def handle_action(self, codes: np.ndarray):
+        active = self.active
+        self.ego_vx = np.where(
+            active & (codes == ACTION_CODES["ACCELERATE"]), self.ego_vx + 0.1, self.ego_vx
+        )
+        slowed = self.ego_vx - 0.1
+        slowed = np.where(slowed < 0, 0.0, slowed)
+        self.ego_vx = np.where(
+            active & (codes == ACTION_CODES["DECELERATE"]), slowed, self.ego_vx
+        )
+        self.ego_vy = np.where(
+            active & (codes == ACTION_CODES["STEER_LEFT"]),
+            self.ego_vy + -0.1,
+            self.ego_vy,
+        )
+        self.ego_vy = np.where(
+            active & (codes == ACTION_CODES["STEER_RIGHT"]),
+            self.ego_vy + 0.1,
+            self.ego_vy,
+        )
+
+    def update_cars(self):
+        active = self.active
+        self.ego_y = np.where(active, self.ego_y + self.ego_vy, self.ego_y)
+
+        # Every car on the road draws one number, in road order
+        rn = np.full((self.size, CAR_SLOTS), 0.5)
+        for i in np.flatnonzero(active):
+            rng = self.rngs[i]
+            for slot in self.car_order[i]:
+                rn[i, slot] = rng.random()
+
+        moving = active[:, None] & self.car_active
+        self.car_x = np.where(
+            moving, self.car_x + (self.car_vx - self.ego_vx[:, None]), self.car_x
+        )
+        self.car_y = np.where(moving, self.car_y + self.car_vy, self.car_y)
+        self.car_vx = np.where(moving, self.car_vx + (rn - 0.5) / 5, self.car_vx)
+
+    def remove_passed_cars(self):
+        min_distance = -1000
+        max_distance = SURFACE_WIDTH + 1000
+        passed = (
+            self.active[:, None]
+            & self.car_active
+            & ((self.car_x < min_distance) | (self.car_x > max_distance))
+        )
+
+        for i in np.flatnonzero(passed.any(axis=1)):
+            order = self.car_order[i]
+            self.car_order[i] = [slot for slot in order if not passed[i, slot]]
+            self.car_bucket[i].extend(slot for slot in order if passed[i, slot])
+
+        self.car_lane[passed] = -1
+        self.car_active[passed] = False
+
+    def place_car(self):
+        speed_coeff_modifier = 5
+
+        for i in np.flatnonzero(self.active):
+            order = self.car_order[i]
+            if len(order) + 1 > LANE_COUNT:
+                continue
+
+            rng = self.rngs[i]
+            taken = {self.car_lane[i, slot] for slot in order}
+            open_lanes = [lane for lane in range(len(self.lanes)) if lane not in taken]
+            lane = rng.choice(open_lanes)
+            x_offset = rng.choice([X_OFFSET_BEHIND, X_OFFSET_IN_FRONT])
+            horizontal_velocity_coefficient = rng.random() * speed_coeff_modifier
+
+            if not self.car_bucket[i]:
+                continue
+            slot = self.car_bucket[i].pop()
+
+            ego_velocity_x = self.ego_vx[i].item()
+            self.car_vx[i, slot] = (
+                ego_velocity_x + horizontal_velocity_coefficient
+                if x_offset == X_OFFSET_BEHIND
+                else ego_velocity_x - horizontal_velocity_coefficient
+            )
+            self.car_vy[i, slot] = 0
+            order.append(slot)
+
+            y_start, y_end = self.lanes[lane]
+            width = int(self.car_width[i, slot])
+            height = int(self.car_height[i, slot])
+            self.car_x[i, slot] = (SURFACE_WIDTH * x_offset) - (width // 2)
+            self.car_y[i, slot] = int((y_start + y_end) / 2 - height / 2)
+            self.car_lane[i, slot] = lane
+            self.car_active[i, slot] = True
+
+    def _ego_bounds(self, rows: np.ndarray) -> tuple[np.ndarray, ...]:
+        left = np.trunc(self.ego_x[rows])
+        top = np.trunc(self.ego_y[rows])
+        return left, top, left + self.ego_width[rows], top + self.ego_height[rows]
+
+    def _car_boxes(self, rows: np.ndarray) -> np.ndarray:
+        """Boxes (left, top, right, bottom) of the cars and walls, NaN for cars off the road."""
+        left = np.trunc(self.car_x[rows])
+        top = np.trunc(self.car_y[rows])
+        cars = np.stack(
+            [left, top, left + self.car_width[rows], top + self.car_height[rows]],
+            axis=2,
+        )
+        cars[~self.car_active[rows]] = np.nan
+        walls = np.broadcast_to(self.walls, (len(rows),) + self.walls.shape)
+        return np.concatenate([cars, walls], axis=1)
+
+    def update_sensors(self):
+        """Mark the readings of the active episodes as out of date, like GameState.update_sensors."""
+        self.sensors_stale |= self.active
+
+    def read_sensors(self, rows: Optional[np.ndarray] = None):
+        """
+        Bring the readings of the given episodes (default is all) up to date, in one batch.
+        """
+        stale = self.sensors_stale if rows is None else self.sensors_stale[rows]
+        rows = np.flatnonzero(stale) if rows is None else np.asarray(rows)[stale]
+        if not len(rows):
+            return
+        self.sensors_stale[rows] = False
+        left, top, _, _ = self._ego_bounds(rows)
+        origins = np.stack(
+            [
+                left + self.ego_width[rows] // 2,
+                top + self.ego_height[rows] // 2,
+            ],
+            axis=1,
+        )
+        self.readings[rows] = batch_ray_aabb_distances(
+            origins, self.beams, self._car_boxes(rows), self.strengths
+        )
+
+    def check_collisions(self):
+        rows = np.flatnonzero(self.active)
+        left, top, right, bottom = (b[:, None] for b in self._ego_bounds(rows))
+        boxes = self._car_boxes(rows)
+        overlap = (
+            (left < boxes[:, :, 2])
+            & (top < boxes[:, :, 3])
+            & (right > boxes[:, :, 0])
+            & (bottom > boxes[:, :, 1])
+        )
+        self.crashed[rows] |= overlap.any(axis=1)
+
+    def get_action(self, i: int) -> list[str]:
+        """
+        Asks the agent of episode i for the next actions, like GameState.get_action.
+        """
+        self.read_sensors(np.array([i]))
+        sensors_data = {}
+        for column in self.sensor_columns[i]:
+            reading = self.readings[i, column]
+            sensors_data[SENSOR_NAMES[column]] = (
+                None if np.isnan(reading) else reading.item()
+            )
+
+        data = RaceCarPredictRequestDto(
+            did_crash=bool(self.crashed[i]),
+            elapsed_ticks=int(self.ticks[i]),
+            distance=self.distance[i].item(),
+            velocity={"x": self.ego_vx[i].item(), "y": self.ego_vy[i].item()},
+            sensors=sensors_data,
+        )
+
+        return self.agents[i].decide(data)
+
+    def update_game(self, codes: np.ndarray) -> "BatchGameState":
+        self.handle_action(codes)
+        self.distance = np.where(
+            self.active, self.distance + self.ego_vx, self.distance
+        )
+        self.update_cars()
+        self.remove_passed_cars()
+        self.place_car()
+        self.update_sensors()
+
+        return self
+
+    def step(self, max_ticks: int = MAX_TICKS):
+        """
+        Advance all active episodes by one tick, like one iteration of run_headless.
+        """
+        self.elapsed_game_time[self.active] += TICK_MS
+        self.ticks[self.active] += 1
+        self.active &= ~(self.crashed | (self.ticks > max_ticks))
+
+        codes = np.zeros(self.size, dtype=int)
+        # Read the sensors of all episodes whose agent is asked on this tick at once
+        self.read_sensors(
+            np.array([i for i in np.flatnonzero(self.active) if not self.actions[i]], dtype=int)
+        )
+        for i in np.flatnonzero(self.active):
+            actions = self.actions[i]
+            if not actions:
+                actions.extend(self.get_action(i))
+            codes[i] = ACTION_CODES.get(actions.pop(), 0)
+
+        self.update_game(codes)
+        self.check_collisions()
+
+
+def run_batch(
+    seeds: list,
+    sensor_removal: int = 0,
+    agents: Optional[list[HeuristicAgent]] = None,
+    max_ticks: int = MAX_TICKS,
+) -> BatchGameState:
+    """
+    Play one episode per seed in lockstep until all of them have ended.
+
+    :param seeds: The seed of every episode.
+    :param sensor_removal: The number of random sensors to remove.
+    :param agents: One agent per episode (default is a new HeuristicAgent each).
+    :param max_ticks: The number of ticks after which an episode ends.
+    :return: The final batch state; distance, crashed and ticks hold the results.
+    """
+    batch = BatchGameState(seeds, sensor_removal=sensor_removal, agents=agents)
+    while batch.active.any():
+        batch.step(max_ticks)
+    return batch
@@ -1,15 +1,21 @@
-import pygame
-from time import sleep
+from time import sleep, perf_counter_ns
 from typing import Any
 import requests
-from typing import List, Optional
-from ..mathematics.randomizer import seed, random_choice, random_number
+from typing import List, NamedTuple, Optional
+from random import Random
+from ..mathematics.randomizer import create_rng
 from ..elements.car import Car
 from ..elements.road import Road
-from ..elements.sensor import Sensor
+from ..elements.sensor import Sensor, SensorArray
 from ..mathematics.vector import Vector
+from ..optional_pygame import pygame  # Only needed by game_loop, see headless.py
+from .action_log import ActionLog
+from .profiler import TickProfiler
 import json
+import secrets
+import os
 from heuristic import HeuristicAgent
+from http_agent import HttpAgent
 from dtos import RaceCarPredictRequestDto
 
 # Define constants
@@ -21,105 +27,385 @@ LANE_COUNT = 5
 CAR_COLORS = ["yellow", "blue", "red"]
 MAX_TICKS = 60 * 60  # 60 seconds @ 60 fps
 MAX_MS = 60 * 1000600  # 60 seconds flat
+SENSOR_OPTIONS = [
+    (90, "front"),
+    (135, "right_front"),
+    (180, "right_side"),
+    (225, "right_back"),
+    (270, "back"),
+    (315, "left_back"),
+    (0, "left_side"),
+    (45, "left_front"),
+    (22.5, "left_side_front"),
+    (67.5, "front_left_front"),
+    (112.5, "front_right_front"),
+    (157.5, "right_side_front"),
+    (202.5, "right_side_back"),
+    (247.5, "back_right_back"),
+    (292.5, "back_left_back"),
+    (337.5, "left_side_back"),
+]
+
+
+def intersects(rect1, rect2):
+    return rect1.colliderect(rect2)
+
+
+class GameSnapshot(NamedTuple):
+    """
+    Compact copy of the values that change while a game is played.
+
+    Cars are stored by reference together with their values, so a snapshot can
+    only be restored into the GameState it was taken from.
+    """
+
+    ticks: int
+    distance: float
+    crashed: bool
+    elapsed_game_time: float
+    rng_state: tuple
+    cars: tuple  # (car, x, y, velocity x, velocity y, lane) for the cars on the road
+    car_bucket: tuple  # Cars waiting to be placed, in order
+    readings: tuple  # Cached sensor readings, in the order of GameState.sensors
+    sensors_stale: bool  # Whether the readings are out of date with the cars
 
 
 # Define game state
 class GameState:
-    def __init__(self, api_url: str):
+    """
+    A single game: its own RNG, road, cars, sensors and agent.
+
+    Game states share nothing, so any number of games can run side by side
+    in one process or thread pool.
+    """
+
+    def __init__(self, api_url: str, rng: Optional[Random] = None):
         self.ego: Car = None
         self.cars: list[Car] = []
         self.car_bucket: list[Car] = []
         self.sensors: list[Sensor] = []
+        self.sensor_array: SensorArray | None = None
         self.road: Road = None
         self.statistics: dict[str, Any] = {}
         self.sensors_enabled = True
+        self.sensors_stale = False  # The cars moved since the sensors were last read
         self.api_url = api_url
         self.crashed = False
         self.elapsed_game_time = 0
         self.distance = 0
         self.latest_action = "NOTHING"
         self.ticks = 0
-        self.agent: HeuristicAgent | None = None
+        self.agent: HeuristicAgent | None = None  # Or any object with the same decide()
+        self.rng = rng
+        self.seed_value = None
+        self.sensor_removal = 0
+        self.profiler: TickProfiler | None = None  # Times the phases of every tick when set
+
+    @classmethod
+    def create(cls, api_url: str, seed_value, sensor_removal=0) -> "GameState":
+        """
+        Create a new game with its own RNG seeded with seed_value.
+
+        :param api_url: The URL of the agent API.
+        :param seed_value: The seed for the game's random number generator. None
+            draws a random int seed, which is kept in seed_value so the game
+            can still be replayed.
+        :param sensor_removal: The number of random sensors to remove.
+        :return: The initialized game state.
+        """
+        if seed_value is None:
+            seed_value = secrets.randbits(32)
+        state = cls(api_url, create_rng(seed_value))
+        state.seed_value = seed_value
+        state.sensor_removal = sensor_removal
+
+        # Create environment
+        state.road = Road(SURFACE_WIDTH, SURFACE_HEIGHT, LANE_COUNT)
+        middle_lane = state.road.middle_lane()
+        lane_height = state.road.get_lane_height()
+
+        # Create ego car
+        ego_velocity = Vector(10, 0)
+        state.ego = Car(
+            "yellow",
+            ego_velocity,
+            lane=middle_lane,
+            target_height=int(lane_height * 0.8),
+        )
+        state.ego.x = (SURFACE_WIDTH // 2) - (state.ego.width // 2)
+        state.ego.y = int(
+            (middle_lane.y_start + middle_lane.y_end) / 2 - state.ego.height / 2
+        )
+        sensor_options = list(SENSOR_OPTIONS)
+
+        for _ in range(sensor_removal):  # Removes random sensors
+            random_sensor = state.rng.choice(sensor_options)
+            sensor_options.remove(random_sensor)
+        state.sensors = [
+            Sensor(state.ego, angle, name, state) for angle, name in sensor_options
+        ]
+        state.sensor_array = SensorArray(state.ego, state.sensors, state)
+
+        # Create other cars and add to car bucket
+        for i in range(0, LANE_COUNT - 1):
+            car_colors = ["blue", "red"]
+            color = state.rng.choice(car_colors)
+            car = Car(color, Vector(8, 0), target_height=int(lane_height * 0.8))
+            state.car_bucket.append(car)
+
+        state.cars = [state.ego]
+
+        state.agent = HeuristicAgent()
+        return state
+
+    # Game logic
+    def handle_action(self, action: str):
+        if action == "ACCELERATE":
+            self.ego.speed_up()
+        elif action == "DECELERATE":
+            self.ego.slow_down()
+        elif action == "STEER_LEFT":
+            self.ego.turn(-0.1)
+        elif action == "STEER_RIGHT":
+            self.ego.turn(0.1)
+        else:
+            pass
+
+    def update_cars(self):
+        for car in self.cars:
+            car.update(self.ego, self.rng)
+
+    def remove_passed_cars(self):
+        min_distance = -1000
+        max_distance = SURFACE_WIDTH + 1000
+        cars_to_keep = []
+        cars_to_retire = []
+
+        for car in self.cars:
+            if car.x < min_distance or car.x > max_distance:
+                cars_to_retire.append(car)
+            else:
+                cars_to_keep.append(car)
+
+        for car in cars_to_retire:
+            self.car_bucket.append(car)
+            car.lane = None
+
+        self.cars = cars_to_keep
+
+    def place_car(self):
+        if len(self.cars) > LANE_COUNT:
+            return
+
+        speed_coeff_modifier = 5
+        x_offset_behind = -0.5
+        x_offset_in_front = 1.5
+
+        open_lanes = [
+            lane
+            for lane in self.road.lanes
+            if not any(c.lane == lane for c in self.cars if c != self.ego)
+        ]
+        lane = self.rng.choice(open_lanes)
+        x_offset = self.rng.choice([x_offset_behind, x_offset_in_front])
+        horizontal_velocity_coefficient = self.rng.random() * speed_coeff_modifier
+
+        car = self.car_bucket.pop() if self.car_bucket else None
+        if not car:
+            return
+
+        velocity_x = (
+            self.ego.velocity.x + horizontal_velocity_coefficient
+            if x_offset == x_offset_behind
+            else self.ego.velocity.x - horizontal_velocity_coefficient
+        )
+        car.velocity.set(velocity_x, 0)
+        self.cars.append(car)
+
+        car.x = (SURFACE_WIDTH * x_offset) - (car.width // 2)
+        car.y = int((lane.y_start + lane.y_end) / 2 - car.height / 2)
+        car.lane = lane
+
+    def get_action(self) -> list[str]:
+        """
+        Asks the agent for the next actions based on the current game state.
+        Returns a list of action strings.
+        """
+        request = self.build_request()
+        if self.profiler is None:
+            return self.agent.decide(request)
+
+        start = perf_counter_ns()
+        actions = self.agent.decide(request)
+        self.profiler.add("agent", perf_counter_ns() - start)
+        return actions
+
+    def build_request(self) -> RaceCarPredictRequestDto:
+        """
+        The request the agent is asked with in the current game state.
+        """
+        # Prepare sensor data
+        self.read_sensors()
+        sensors_data = {}
+        for sensor in self.sensors:
+            sensors_data[sensor.name] = sensor.reading
+
+        data = RaceCarPredictRequestDto(
+            did_crash=self.crashed,
+            elapsed_ticks=self.ticks,
+            distance=self.distance,
+            velocity={"x": self.ego.velocity.x, "y": self.ego.velocity.y},
+            sensors=sensors_data,
+        )
+
+        return data
+
+    def update_game(self, current_action: str) -> "GameState":
+        if self.profiler is not None:
+            return self._update_game_profiled(current_action)
+        self.handle_action(current_action)
+        self.distance += self.ego.velocity.x
+        self.update_cars()
+        self.remove_passed_cars()
+        self.place_car()
+        self.update_sensors()
+
+        return self
+
+    def _update_game_profiled(self, current_action: str) -> "GameState":
+        """update_game, timing every phase with the profiler."""
+        profiler = self.profiler
+        profiler.ticks += 1
+        t0 = perf_counter_ns()
+        self.handle_action(current_action)
+        t1 = perf_counter_ns()
+        self.distance += self.ego.velocity.x
+        self.update_cars()
+        t2 = perf_counter_ns()
+        self.remove_passed_cars()
+        t3 = perf_counter_ns()
+        self.place_car()
+        t4 = perf_counter_ns()
+        self.update_sensors()
+
+        profiler.add("handle_action", t1 - t0)
+        profiler.add("update_cars", t2 - t1)
+        profiler.add("remove_passed_cars", t3 - t2)
+        profiler.add("place_car", t4 - t3)
+        return self
+
+    def update_sensors(self):
+        """
+        Mark the sensor readings as out of date.
+
+        Readings are only needed when the agent is asked for actions, so they
+        are computed on the first read_sensors() (or Sensor.reading) after
+        the cars moved, not on every tick.
+        """
+        self.sensors_stale = True
+
+    def read_sensors(self):
+        """
+        Bring the sensor readings up to date with the current positions.
+        """
+        if not self.sensors_stale:
+            return
+        self.sensors_stale = False
+        start = perf_counter_ns() if self.profiler is not None else 0
+        if self.sensor_array is not None:
+            self.sensor_array.update()
+        else:
+            for sensor in self.sensors:
+                sensor.update()
+        if self.profiler is not None:
+            self.profiler.add("sensors", perf_counter_ns() - start)
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        Capture the game so it can be restored later, e.g. to try several futures
+        from the same tick. The agent is not included.
+        """
+        return GameSnapshot(
+            self.ticks,
+            self.distance,
+            self.crashed,
+            self.elapsed_game_time,
+            self.rng.getstate(),
+            tuple(
+                (car, car.x, car.y, car.velocity.x, car.velocity.y, car.lane)
+                for car in self.cars
+            ),
+            tuple(self.car_bucket),
+            # The cached values, so a snapshot never triggers a sensor sweep
+            tuple(sensor._reading for sensor in self.sensors),
+            self.sensors_stale,
+        )
+
+    def restore(self, snapshot: GameSnapshot):
+        """
+        Reset the game to a snapshot taken with snapshot().
+        """
+        self.ticks = snapshot.ticks
+        self.distance = snapshot.distance
+        self.crashed = snapshot.crashed
+        self.elapsed_game_time = snapshot.elapsed_game_time
+        self.rng.setstate(snapshot.rng_state)
+
+        cars = []
+        for car, x, y, velocity_x, velocity_y, lane in snapshot.cars:
+            car.x = x
+            car.y = y
+            car.velocity.set(velocity_x, velocity_y)
+            car.lane = lane
+            cars.append(car)
+        self.cars = cars
+        self.car_bucket = list(snapshot.car_bucket)
+
+        for sensor, reading in zip(self.sensors, snapshot.readings):
+            sensor.reading = reading
+        self.sensors_stale = snapshot.sensors_stale
+
+    def check_collisions(self):
+        if self.profiler is not None:
+            start = perf_counter_ns()
+            self._check_collisions()
+            self.profiler.add("collisions", perf_counter_ns() - start)
+        else:
+            self._check_collisions()
 
+    def _check_collisions(self):
+        ego = self.ego
+        ego_rect = ego.rect
 
-STATE = None
+        # Handle collisions
+        for car in self.cars:
+            if car is not ego and intersects(ego_rect, car.rect):
+                self.crashed = True
 
+        # Check collision with walls
+        for wall in self.road.walls:
+            if intersects(ego_rect, wall.rect):
+                self.crashed = True
 
-def intersects(rect1, rect2):
-    return rect1.colliderect(rect2)
+
+# The game driven by game_loop and the module-level functions below
+STATE = None
 
 
-# Game logic
 def handle_action(action: str):
-    if action == "ACCELERATE":
-        STATE.ego.speed_up()
-    elif action == "DECELERATE":
-        STATE.ego.slow_down()
-    elif action == "STEER_LEFT":
-        STATE.ego.turn(-0.1)
-    elif action == "STEER_RIGHT":
-        STATE.ego.turn(0.1)
-    else:
-        pass
+    STATE.handle_action(action)
 
 
 def update_cars():
-    for car in STATE.cars:
-        car.update(STATE.ego)
+    STATE.update_cars()
 
 
 def remove_passed_cars():
-    min_distance = -1000
-    max_distance = SURFACE_WIDTH + 1000
-    cars_to_keep = []
-    cars_to_retire = []
-
-    for car in STATE.cars:
-        if car.x < min_distance or car.x > max_distance:
-            cars_to_retire.append(car)
-        else:
-            cars_to_keep.append(car)
-
-    for car in cars_to_retire:
-        STATE.car_bucket.append(car)
-        car.lane = None
-
-    STATE.cars = cars_to_keep
+    STATE.remove_passed_cars()
 
 
 def place_car():
-    if len(STATE.cars) > LANE_COUNT:
-        return
-
-    speed_coeff_modifier = 5
-    x_offset_behind = -0.5
-    x_offset_in_front = 1.5
-
-    open_lanes = [
-        lane
-        for lane in STATE.road.lanes
-        if not any(c.lane == lane for c in STATE.cars if c != STATE.ego)
-    ]
-    lane = random_choice(open_lanes)
-    x_offset = random_choice([x_offset_behind, x_offset_in_front])
-    horizontal_velocity_coefficient = random_number() * speed_coeff_modifier
-
-    car = STATE.car_bucket.pop() if STATE.car_bucket else None
-    if not car:
-        return
-
-    velocity_x = (
-        STATE.ego.velocity.x + horizontal_velocity_coefficient
-        if x_offset == x_offset_behind
-        else STATE.ego.velocity.x - horizontal_velocity_coefficient
-    )
-    car.velocity = Vector(velocity_x, 0)
-    STATE.cars.append(car)
-
-    car_sprite = car.sprite
-    car.x = (SURFACE_WIDTH * x_offset) - (car_sprite.get_width() // 2)
-    car.y = int((lane.y_start + lane.y_end) / 2 - car_sprite.get_height() / 2)
-    car.lane = lane
+    STATE.place_car()
 
 
 def get_action():
@@ -130,123 +416,89 @@ def get_action():
     if STATE is None:
         return ["NOTHING"]
 
-    # Prepare sensor data
-    sensors_data = {}
-    for sensor in STATE.sensors:
-        sensors_data[sensor.name] = sensor.reading
+    return STATE.get_action()
 
-    data = RaceCarPredictRequestDto(
-        did_crash=STATE.crashed,
-        elapsed_ticks=STATE.ticks,
-        distance=STATE.distance,
-        velocity={"x": STATE.ego.velocity.x, "y": STATE.ego.velocity.y},
-        sensors=sensors_data,
-    )
 
-    return STATE.agent.decide(data)
+# Parsed action logs by path, so every file is read only once
+ACTION_LOGS: dict[str, dict[int, str]] = {}
 
 
-def get_action_json():
+def get_action_json(path: str = "actions_log.json"):
     """
     Get action depending on tick from the actions_log.json.
     Finds the action for the current STATE.ticks.
     """
-    try:
-        with open("actions_log.json", "r") as f:
-            actions = json.load(f)
-            for entry in actions:
-                if entry.get("tick") == STATE.ticks:
-                    return entry.get("action", "NOTHING")
-            return "NOTHING"
-    except FileNotFoundError:
-        return "NOTHING"
-
-
-def initialize_game_state(api_url: str, seed_value: str, sensor_removal=0):
-    seed(seed_value)
+    if path not in ACTION_LOGS:
+        try:
+            with open(path, "r") as f:
+                actions = json.load(f)
+        except FileNotFoundError:
+            actions = []
+        ACTION_LOGS[path] = {
+            entry.get("tick"): entry.get("action", "NOTHING") for entry in actions
+        }
+    return ACTION_LOGS[path].get(STATE.ticks, "NOTHING")
+
+
+def initialize_game_state(
+    api_url: str, seed_value: str, sensor_removal=0, agent=None, use_api=False
+):
     global STATE
-    STATE = GameState(api_url)
-
-    # Create environment
-    STATE.road = Road(SURFACE_WIDTH, SURFACE_HEIGHT, LANE_COUNT)
-    middle_lane = STATE.road.middle_lane()
-    lane_height = STATE.road.get_lane_height()
-
-    # Create ego car
-    ego_velocity = Vector(10, 0)
-    STATE.ego = Car(
-        "yellow", ego_velocity, lane=middle_lane, target_height=int(lane_height * 0.8)
-    )
-    ego_sprite = STATE.ego.sprite
-    STATE.ego.x = (SURFACE_WIDTH // 2) - (ego_sprite.get_width() // 2)
-    STATE.ego.y = int(
-        (middle_lane.y_start + middle_lane.y_end) / 2 - ego_sprite.get_height() / 2
-    )
-    sensor_options = [
-        (90, "front"),
-        (135, "right_front"),
-        (180, "right_side"),
-        (225, "right_back"),
-        (270, "back"),
-        (315, "left_back"),
-        (0, "left_side"),
-        (45, "left_front"),
-        (22.5, "left_side_front"),
-        (67.5, "front_left_front"),
-        (112.5, "front_right_front"),
-        (157.5, "right_side_front"),
-        (202.5, "right_side_back"),
-        (247.5, "back_right_back"),
-        (292.5, "back_left_back"),
-        (337.5, "left_side_back"),
-    ]
-
-    for _ in range(sensor_removal):  # Removes random sensors
-        random_sensor = random_choice(sensor_options)
-        sensor_options.remove(random_sensor)
-    STATE.sensors = [
-        Sensor(STATE.ego, angle, name, STATE) for angle, name in sensor_options
-    ]
-
-    # Create other cars and add to car bucket
-    for i in range(0, LANE_COUNT - 1):
-        car_colors = ["blue", "red"]
-        color = random_choice(car_colors)
-        car = Car(color, Vector(8, 0), target_height=int(lane_height * 0.8))
-        STATE.car_bucket.append(car)
-
-    STATE.cars = [STATE.ego]
-
-    STATE.agent = HeuristicAgent()
+    STATE = GameState.create(api_url, seed_value, sensor_removal=sensor_removal)
+    if use_api:
+        STATE.agent = HttpAgent(api_url)  # Ask the /predict endpoint at api_url
+    elif agent is not None:
+        STATE.agent = agent  # e.g. a PlannerAgent instead of the HeuristicAgent
+    print(f"Seeded RNG with {STATE.seed_value}")
 
 
 def update_game(current_action: str):
-    handle_action(current_action)
-    STATE.distance += STATE.ego.velocity.x
-    update_cars()
-    remove_passed_cars()
-    place_car()
-    for sensor in STATE.sensors:
-        sensor.update()
+    return STATE.update_game(current_action)
 
-    return STATE
+
+def check_collisions():
+    STATE.check_collisions()
 
 
 # Main game loop
-ACTION_LOG = []
+ACTION_LOG = None
 
 
 def game_loop(
-    verbose: bool = True, log_actions: bool = True, log_path: str = "actions_log.json"
+    verbose: bool = True,
+    log_actions: bool = True,
+    log_path: str = "actions_log.bin",
+    trace_path: Optional[str] = None,
+    prefetch_ticks: Optional[int] = None,
+    profile_path: Optional[str] = None,
+    render_every: int = 1,
 ):
-    global STATE
+    global STATE, ACTION_LOG
+    ACTION_LOG = ActionLog(STATE.seed_value, STATE.sensor_removal)
+    if profile_path is not None and STATE.profiler is None:
+        STATE.profiler = TickProfiler()  # Saved to profile_path at the end, see profiler.py
+    profiler = STATE.profiler
+    recorder = None
+    if trace_path is not None:
+        from .trace import TraceRecorder  # trace.py imports this module
+
+        recorder = TraceRecorder(STATE)
+    driver = None
+    if prefetch_ticks is not None:
+        from .prefetch import PrefetchDriver  # prefetch.py imports this module
+
+        # Request the next actions while the last prefetch_ticks queued ones are played
+        driver = PrefetchDriver(STATE.agent, lead_ticks=prefetch_ticks)
     clock = pygame.time.Clock()
     screen = None
     actions = []
     if verbose:
-        surface = pygame.Surface((SURFACE_WIDTH, SURFACE_HEIGHT))
+        from .renderer import Renderer  # renderer.py imports this module
+
         screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Race Car Game")
+        # Draws every render_every-th tick, updating only the changed parts of the window
+        renderer = Renderer(screen, every=render_every)
 
     while True:
         # Handle pygame events (including quit)
@@ -263,85 +515,66 @@ def game_loop(
             print(
                 f"Game over: Crashed: {STATE.crashed}, Ticks: {STATE.ticks}, Elapsed time: {STATE.elapsed_game_time} ms, Distance: {STATE.distance}"
             )
+            if isinstance(STATE.agent, HttpAgent):
+                stats = STATE.agent.summary()
+                if stats["requests"]:
+                    print(
+                        f"Requests: {stats['episode_requests']}, Latency: mean {stats['mean_ms']:.2f} ms, "
+                        f"p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms, max {stats['max_ms']:.2f} ms"
+                    )
+            if driver is not None:
+                driver.close()
+                STATE.statistics["prefetch"] = {
+                    "requests": driver.requests,
+                    "hits": driver.hits,
+                    "discards": driver.discards,
+                }
+                print(
+                    f"Prefetched batches: {driver.hits} used, {driver.discards} discarded, {driver.requests} requests"
+                )
             break
 
-        if not actions:
-            # Handle action - get_action() is a method for using arrow keys to steer - implement own logic here!
-            action_list = get_action()
-            for act in action_list:
-                actions.append(act)
-        action = actions.pop()
-
-        # Log the action with tick
+        if driver is not None:
+            action = driver.next_action(STATE)
+        else:
+            if not actions:
+                # Handle action - get_action() is a method for using arrow keys to steer - implement own logic here!
+                action_list = get_action()
+                for act in action_list:
+                    actions.append(act)
+            action = actions.pop()
+
+        # Log the action of this tick
         if log_actions:
-            ACTION_LOG.append({"tick": STATE.ticks, "action": action})
-
-        handle_action(action)
-
-        STATE.distance += STATE.ego.velocity.x
-        update_cars()
-        remove_passed_cars()
-        place_car()
+            ACTION_LOG.append(action)
 
         # print("Current action:", action)
         # print("Currnet tick:", STATE.ticks)
 
-        # Update sensors
-        for sensor in STATE.sensors:
-            sensor.update()
-
-        # Handle collisions
-        for car in STATE.cars:
-            if car != STATE.ego and intersects(STATE.ego.rect, car.rect):
-                STATE.crashed = True
-
-        # Check collision with walls
-        for wall in STATE.road.walls:
-            if intersects(STATE.ego.rect, wall.rect):
-                STATE.crashed = True
+        update_game(action)
+        check_collisions()
+        if recorder is not None:
+            recorder.record(action)
 
         # Render game (only if verbose)
-        if verbose:
-            surface.fill((0, 0, 0))  # Clear the screen with black
-
-            # Draw the road background
-            surface.blit(STATE.road.surface, (0, 0))
-
-            # Draw all walls
-            for wall in STATE.road.walls:
-                wall.draw(surface)
-
-            # Draw all cars
-            for car in STATE.cars:
-                if car.sprite:
-                    surface.blit(car.sprite, (car.x, car.y))
-                    bounds = car.get_bounds()
-                    color = (255, 0, 0) if car == STATE.ego else (0, 255, 0)
-                    pygame.draw.rect(surface, color, bounds, width=2)
-                else:
-                    pygame.draw.rect(
-                        surface,
-                        (255, 255, 0) if car == STATE.ego else (0, 0, 255),
-                        car.rect,
-                    )
-
-            # Draw sensors if enabled
+        if verbose and renderer.due(STATE.ticks):
             if STATE.sensors_enabled:
-                for sensor in STATE.sensors:
-                    sensor.draw(surface)
-
-            pygame.transform.smoothscale(surface, (SCREEN_WIDTH, SCREEN_HEIGHT), screen)
-
-            pygame.display.flip()
-
-    # # Save actions to file after game ends
-    # import os
-    # if log_actions:
-    #     log_dir = os.path.dirname(log_path)
-    #     if log_dir and not os.path.exists(log_dir):
-    #         os.makedirs(log_dir, exist_ok=True)
-    #     with open(log_path, "w") as f:
-    #         json.dump(ACTION_LOG, f, indent=2)
+                STATE.read_sensors()  # Timed as sensors, not as render
+            render_start = perf_counter_ns()
+            pygame.display.update(renderer.draw(STATE))
+            if profiler is not None:
+                profiler.add("render", perf_counter_ns() - render_start)
+
+    # Save actions to file after game ends, see replay.py to play them back
+    if log_actions:
+        log_dir = os.path.dirname(log_path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        ACTION_LOG.save(log_path)
+    if recorder is not None:
+        recorder.save(trace_path)
+    if profile_path is not None:
+        profiler.save(profile_path)
 
 
 # Initialization - not used
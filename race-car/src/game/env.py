@@ -0,0 +1,201 @@
+"""
+reset/step environments for training and evaluating agents.
+
+RaceCarEnv plays one game with GameState, one tick per step. VecRaceCarEnv
+plays many games in lockstep on BatchGameState, so one step call advances
+every episode by a tick. Both return the fields of RaceCarPredictRequestDto
+as NumPy arrays instead of a DTO:
+
+    did_crash      bool
+    elapsed_ticks  int           ticks played so far (the game asks its agent with elapsed_ticks + 1)
+    distance       float64
+    velocity       (2,) float64  x, y
+    sensors        (16,) float64 readings in SENSOR_NAMES order, NaN for None or removed sensors
+
+VecRaceCarEnv adds a leading axis of size num_envs to every field. The
+reward of a step is the distance driven on it.
+
+Seeding is deterministic: reset(seed) starts the episodes seed, seed + 1,
+..., seed + num_envs - 1, and every later episode takes the next unused
+seed. With auto_reset, an episode that ends is replaced by a new one in the
+same step; the observation returned for it is the first of the new
+episode, and info holds the final distance and crash flag of the old one.
+"""
+
+import numpy as np
+from .action_log import ACTION_CODES, ACTION_NAMES
+from .batch import BatchGameState, SENSOR_NAMES
+from .core import GameState, MAX_TICKS
+from .headless import TICK_MS
+
+
+def action_code(action) -> int:
+    """The code of an action given by name or by code."""
+    if isinstance(action, str):
+        return ACTION_CODES.get(action, 0)
+    return int(action)
+
+
+class RaceCarEnv:
+    def __init__(self, sensor_removal: int = 0, max_ticks: int = MAX_TICKS):
+        """
+        Initialize a RaceCarEnv object. Call reset before the first step.
+
+        :param sensor_removal: The number of random sensors to remove.
+        :param max_ticks: The number of ticks after which an episode ends.
+        """
+        self.sensor_removal = sensor_removal
+        self.max_ticks = max_ticks
+        self.state: GameState | None = None
+        self.next_seed = 0
+
+    def reset(self, seed=None) -> dict:
+        """
+        Start a new episode.
+
+        :param seed: The seed of the episode (default is the seed after the last one).
+        :return: The first observation.
+        """
+        if seed is None:
+            seed = self.next_seed
+        if isinstance(seed, int):
+            self.next_seed = seed + 1
+        self.state = GameState.create("", seed, sensor_removal=self.sensor_removal)
+        return self.observe()
+
+    def step(self, action) -> tuple[dict, float, bool, dict]:
+        """
+        Play one tick, like one iteration of run_headless.
+
+        :param action: The action to play, by name or by code.
+        :return: The observation, the reward, whether the episode is over and an info dict.
+        """
+        state = self.state
+        if state is None:
+            raise RuntimeError("Call reset before step")
+        if self.done:
+            raise RuntimeError("The episode is over, call reset")
+
+        distance = state.distance
+        state.elapsed_game_time += TICK_MS
+        state.ticks += 1
+        state.update_game(ACTION_NAMES[action_code(action)])
+        state.check_collisions()
+
+        info = {"seed": state.seed_value, "crashed": state.crashed}
+        return self.observe(), state.distance - distance, self.done, info
+
+    @property
+    def done(self) -> bool:
+        return self.state.crashed or self.state.ticks >= self.max_ticks
+
+    def observe(self) -> dict:
+        state = self.state
+        sensors = np.full(len(SENSOR_NAMES), np.nan)
+        for sensor in state.sensors:
+            if sensor.reading is not None:
+                sensors[SENSOR_NAMES.index(sensor.name)] = sensor.reading
+        return {
+            "did_crash": state.crashed,
+            "elapsed_ticks": state.ticks,
+            "distance": state.distance,
+            "velocity": np.array([state.ego.velocity.x, state.ego.velocity.y]),
+            "sensors": sensors,
+        }
+
+
+class VecRaceCarEnv:
+    def __init__(
+        self,
+        num_envs: int,
+        sensor_removal: int = 0,
+        max_ticks: int = MAX_TICKS,
+        auto_reset: bool = True,
+    ):
+        """
+        Initialize a VecRaceCarEnv object. Call reset before the first step.
+
+        :param num_envs: The number of episodes played in lockstep.
+        :param sensor_removal: The number of random sensors to remove.
+        :param max_ticks: The number of ticks after which an episode ends.
+        :param auto_reset: Whether to replace ended episodes by new ones in step.
+            Without it, ended episodes stay frozen until the next reset.
+        """
+        self.num_envs = num_envs
+        self.sensor_removal = sensor_removal
+        self.max_ticks = max_ticks
+        self.auto_reset = auto_reset
+        self.batch: BatchGameState | None = None
+        self.seeds = np.zeros(num_envs, dtype=int)
+        self.next_seed = 0
+
+    def reset(self, seed: int | None = None) -> dict:
+        """
+        Start num_envs new episodes with consecutive seeds.
+
+        :param seed: The seed of the first episode (default is the seed after the last one).
+        :return: The first observations.
+        """
+        if seed is None:
+            seed = self.next_seed
+        self.seeds = np.arange(seed, seed + self.num_envs)
+        self.next_seed = seed + self.num_envs
+        self.batch = BatchGameState(
+            self.seeds.tolist(), sensor_removal=self.sensor_removal, agents=[None] * self.num_envs
+        )
+        return self.observe()
+
+    def step(self, actions) -> tuple[dict, np.ndarray, np.ndarray, dict]:
+        """
+        Play one tick in every running episode.
+
+        :param actions: One action per episode, by name or by code.
+        :return: The observations, the rewards, which episodes ended on this
+            step and an info dict with the 'seed', 'final_distance',
+            'final_crashed' and 'final_ticks' of every episode (the final
+            values are only meaningful where the episode ended).
+        """
+        batch = self.batch
+        if batch is None:
+            raise RuntimeError("Call reset before step")
+
+        codes = np.array([action_code(action) for action in actions], dtype=int)
+        if codes.shape != (self.num_envs,):
+            raise ValueError(f"Expected {self.num_envs} actions, got {len(codes)}")
+
+        distance = batch.distance.copy()
+        batch.elapsed_game_time[batch.active] += TICK_MS
+        batch.ticks[batch.active] += 1
+        batch.update_game(np.where(batch.active, codes, 0))
+        batch.check_collisions()
+
+        reward = batch.distance - distance
+        done = batch.active & (batch.crashed | (batch.ticks >= self.max_ticks))
+        batch.active &= ~done
+        info = {
+            "seed": self.seeds.copy(),
+            "final_distance": batch.distance.copy(),
+            "final_crashed": batch.crashed.copy(),
+            "final_ticks": batch.ticks.copy(),
+        }
+
+        if self.auto_reset:
+            for i in np.flatnonzero(done):
+                self.seeds[i] = self.next_seed
+                self.next_seed += 1
+                batch.reset_episode(i, int(self.seeds[i]), agent=None)
+        return self.observe(), reward, done, info
+
+    def observe(self) -> dict:
+        batch = self.batch
+        batch.read_sensors()
+        sensors = np.full_like(batch.readings, np.nan)
+        for i, columns in enumerate(batch.sensor_columns):
+            sensors[i, columns] = batch.readings[i, columns]
+        return {
+            "did_crash": batch.crashed.copy(),
+            "elapsed_ticks": batch.ticks.copy(),
+            "distance": batch.distance.copy(),
+            "velocity": np.stack([batch.ego_vx, batch.ego_vy], axis=1),
+            "sensors": sensors,
+        }
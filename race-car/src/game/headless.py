@@ -0,0 +1,128 @@
+"""
+Headless simulation engine.
+
+Runs the same game logic as core.game_loop, but without pygame: there is no
+display, no 60 FPS clock and no sprite loading, so an episode runs as fast
+as the CPU allows. For the same seed, distance, crashed and ticks are
+identical to core.game_loop.
+
+Every call plays its own GameState, so episodes can run concurrently, e.g.
+in a thread pool.
+"""
+
+from typing import Optional
+from heuristic import HeuristicAgent
+from .action_log import ActionLog
+from .core import GameState, MAX_TICKS, MAX_MS
+from .prefetch import PrefetchDriver
+from .profiler import TickProfiler
+
+TICK_MS = 1000 / 60  # Nominal duration of a tick @ 60 fps
+
+
+def run_headless(
+    seed_value,
+    sensor_removal: int = 0,
+    agent: Optional[HeuristicAgent] = None,
+    max_ticks: int = MAX_TICKS,
+    trace_path: Optional[str] = None,
+    prefetch_ticks: Optional[int] = None,
+    profile_path: Optional[str] = None,
+    action_log: Optional[ActionLog] = None,
+) -> GameState:
+    """
+    Initialize a game and play it to the end without rendering or throttling.
+
+    :param seed_value: The seed for the game's random number generator.
+    :param sensor_removal: The number of random sensors to remove.
+    :param agent: The agent deciding the actions, e.g. a PlannerAgent (default is a new HeuristicAgent).
+    :param max_ticks: The number of ticks after which the game ends.
+    :param trace_path: Where to save a per-tick trace of the game (.npz, see trace.py).
+    :param prefetch_ticks: Request the next actions in the background once this many
+        queued actions are left (see prefetch.py); the counts end up in state.statistics.
+    :param profile_path: Where to save the time spent per phase of the tick (.json, see profiler.py).
+    :param action_log: An ActionLog to append the action of every tick to.
+    :return: The final game state.
+    """
+    state = GameState.create("", seed_value, sensor_removal=sensor_removal)
+    if action_log is not None and action_log.seed_value is None:
+        action_log.seed_value = state.seed_value  # The seed drawn for an unseeded game
+    if agent is not None:
+        state.agent = agent
+    if profile_path is not None:
+        state.profiler = TickProfiler()
+    recorder = None
+    if trace_path is not None:
+        from .trace import TraceRecorder  # trace.py imports this module via batch.py
+
+        recorder = TraceRecorder(state, max_ticks)
+
+    driver = None
+    if prefetch_ticks is not None:
+        driver = PrefetchDriver(state.agent, lead_ticks=prefetch_ticks)
+
+    _play(state, max_ticks, recorder=recorder, driver=driver, action_log=action_log)
+
+    if recorder is not None:
+        recorder.save(trace_path)
+    if profile_path is not None:
+        state.profiler.save(profile_path)
+    if driver is not None:
+        driver.close()
+        state.statistics["prefetch"] = {
+            "requests": driver.requests,
+            "hits": driver.hits,
+            "discards": driver.discards,
+        }
+    return state
+
+
+def continue_headless(
+    state: GameState,
+    agent: Optional[HeuristicAgent] = None,
+    max_ticks: int = MAX_TICKS,
+    action_log: Optional[ActionLog] = None,
+) -> GameState:
+    """
+    Play a game that is already under way to the end, e.g. one restored by a Replayer.
+
+    :param state: The game, after state.ticks ticks were played.
+    :param agent: The agent to take over from here (default is the game's agent).
+    :param max_ticks: The number of ticks after which the game ends.
+    :param action_log: An ActionLog to append the action of every tick to.
+    :return: The final game state.
+    """
+    if agent is not None:
+        state.agent = agent
+    return _play(state, max_ticks, action_log=action_log)
+
+
+def _play(
+    state: GameState,
+    max_ticks: int,
+    recorder=None,
+    driver: Optional[PrefetchDriver] = None,
+    action_log: Optional[ActionLog] = None,
+) -> GameState:
+    actions = []
+    while True:
+        state.elapsed_game_time += TICK_MS
+        state.ticks += 1
+
+        if state.crashed or state.ticks > max_ticks or state.elapsed_game_time > MAX_MS:
+            break
+
+        if driver is not None:
+            action = driver.next_action(state)
+        else:
+            if not actions:
+                actions.extend(state.get_action())
+            action = actions.pop()
+
+        state.update_game(action)
+        state.check_collisions()
+        if recorder is not None:
+            recorder.record(action)
+        if action_log is not None:
+            action_log.append(action)
+    return state
@@ -0,0 +1,169 @@
+"""
+Speculative prefetching of the next action batch.
+
+Normally the game asks its agent for new actions only once the queue is
+empty, so every request stalls the game for a full round trip. A
+PrefetchDriver sends the next request in a background thread as soon as
+only lead_ticks actions are left, and keeps playing the queued actions
+while it is answered.
+
+The request is sent before the ticks it is meant for have been played, so
+it is a prediction: elapsed_ticks, distance and velocity are exact (they
+follow from the queued actions alone), but the sensor readings are the ones
+of the tick it was sent on. When the queue runs out, the driver compares
+the prediction with the real request and throws the prefetched actions
+away if the game diverged from it: a sensor started or stopped seeing a car
+(e.g. a new car appeared in front), or a reading moved by more than
+tolerance pixels. It then asks the agent again, like the game normally does.
+The default tolerance is small on purpose: agents such as HeuristicAgent
+estimate the speeds of other cars from how readings change between calls,
+and accepting answers to readings that moved by 10 px or more made
+HeuristicAgent crash far more often on seeds 100-129.
+
+Agents keep state between calls, so a speculative request goes to a fork of
+the agent (fork_agent): agent.fork() if it has one, like HttpAgent, which
+asks a server-side copy of its session, and a deep copy otherwise. Only when
+the answer is used does the agent take over the fork's state (adopt_fork);
+after a discard the untouched agent is asked for the real request. That
+repeats the elapsed_ticks of the discarded guess, so agents must only take
+ticks that go back as the start of a new game, not equal ones.
+"""
+
+import copy
+import math
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from dtos import RaceCarPredictRequestDto
+from .core import GameState
+
+
+def predict_request(
+    request: RaceCarPredictRequestDto, actions: list[str]
+) -> RaceCarPredictRequestDto:
+    """
+    Predict the request of the tick after the given actions have been played.
+
+    :param request: The request of the current tick, before its action is played.
+    :param actions: The actions of the current and the next ticks, in playing order.
+    :return: The predicted request, with the sensor readings of the current tick.
+    """
+    velocity_x = request.velocity["x"]
+    velocity_y = request.velocity["y"]
+    distance = request.distance
+    # Same arithmetic as Car.speed_up/slow_down/turn and GameState.update_game
+    for action in actions:
+        if action == "ACCELERATE":
+            velocity_x += 0.1
+        elif action == "DECELERATE":
+            velocity_x -= 0.1
+            if velocity_x < 0:
+                velocity_x = 0
+        elif action == "STEER_LEFT":
+            velocity_y += -0.1
+        elif action == "STEER_RIGHT":
+            velocity_y += 0.1
+        distance += velocity_x
+
+    return request.model_copy(
+        update={
+            "elapsed_ticks": request.elapsed_ticks + len(actions),
+            "distance": distance,
+            "velocity": {"x": velocity_x, "y": velocity_y},
+        }
+    )
+
+
+def diverged(
+    predicted: RaceCarPredictRequestDto,
+    actual: RaceCarPredictRequestDto,
+    tolerance: float,
+) -> bool:
+    """
+    Whether the game moved too far from a predicted request to use its answer.
+
+    :param tolerance: The largest change of a sensor reading that is still accepted.
+    """
+    if actual.did_crash or actual.elapsed_ticks != predicted.elapsed_ticks:
+        return True
+    for name, reading in actual.sensors.items():
+        old = predicted.sensors.get(name)
+        if (old is None) != (reading is None):
+            return True  # A car came into or went out of sight
+        if reading is not None and not math.isclose(old, reading, abs_tol=tolerance):
+            return True
+    return False
+
+
+def fork_agent(agent):
+    """A copy of an agent to ask a speculative request, leaving the agent untouched."""
+    fork = getattr(agent, "fork", None)
+    return fork() if fork is not None else copy.deepcopy(agent)
+
+
+def adopt_fork(agent, fork):
+    """Bring an agent to the state of its fork, whose answer was used."""
+    adopt = getattr(agent, "adopt", None)
+    if adopt is not None:
+        adopt(fork)
+    else:
+        agent.__dict__.update(fork.__dict__)
+
+
+class PrefetchDriver:
+    def __init__(self, agent, lead_ticks: int = 5, tolerance: float = 2.0):
+        """
+        Initialize a PrefetchDriver object.
+
+        :param agent: The agent to ask, e.g. a HttpAgent.
+        :param lead_ticks: The number of queued actions left when the next batch is requested.
+        :param tolerance: The largest change of a sensor reading for which a prefetched batch is still used.
+        """
+        self.agent = agent
+        self.lead_ticks = lead_ticks
+        self.tolerance = tolerance
+        self.actions: list[str] = []
+        # The predicted request, the fork of the agent asked with it and its answer
+        self.pending: Optional[tuple[RaceCarPredictRequestDto, object, Future]] = None
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+        self.requests = 0
+        self.hits = 0  # Prefetched batches that were used
+        self.discards = 0  # Prefetched batches thrown away because the game diverged
+
+    def next_action(self, state: GameState) -> str:
+        """
+        The action for the current tick, asking the agent first if the queue is empty.
+
+        :param state: The game, before the action of the current tick is played.
+        """
+        if not self.actions:
+            self.actions = self._take(state)
+        action = self.actions.pop()
+
+        if self.pending is None and len(self.actions) <= self.lead_ticks:
+            # The game pops actions from the end of the list
+            queued = [action] + self.actions[::-1]
+            request = predict_request(state.build_request(), queued)
+            fork = fork_agent(self.agent)
+            self.pending = (request, fork, self.executor.submit(fork.decide, request))
+            self.requests += 1
+        return action
+
+    def _take(self, state: GameState) -> list[str]:
+        actual = state.build_request()
+        if self.pending is not None:
+            predicted, fork, future = self.pending
+            self.pending = None
+            actions = future.result()  # Also keeps the agent from being called twice at once
+            if actions and not diverged(predicted, actual, self.tolerance):
+                adopt_fork(self.agent, fork)
+                self.hits += 1
+                return list(actions)
+            self.discards += 1
+
+        self.requests += 1
+        return list(self.agent.decide(actual)) or ["NOTHING"]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,231 @@
+"""
+Renderer for the game window and for offline video export.
+
+The Renderer draws straight at the resolution of its target, so there is no
+full-size 1600x1200 frame to smoothscale on every tick: the road and walls
+are scaled once into a background, the car sprites once per car, and
+reading texts are rendered once per distinct text. Every frame only restores
+the background under what was drawn on the previous frame and draws the new
+frame, and draw() returns those areas so the window updates just them.
+
+With every=N only every N-th tick is drawn, so watching a long run costs a
+fraction of the simulation.
+
+render_episode replays an action log (see replay.py) into PNG frames, or
+into a video if ffmpeg is installed, without opening a window:
+
+    python -m src.game.renderer actions_log.bin frames/
+    python -m src.game.renderer actions_log.bin game.mp4 --every 2
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+from collections import OrderedDict
+from typing import Optional
+
+import pygame
+
+from ..elements.sensor import get_font
+from .action_log import ActionLog
+from .core import GameState, SURFACE_WIDTH, SURFACE_HEIGHT, SCREEN_WIDTH
+from .replay import Replayer
+
+TEXT_CACHE_SIZE = 1024
+VIDEO_SUFFIXES = (".mp4", ".mkv", ".webm", ".avi", ".mov", ".gif")
+
+
+class Renderer:
+    def __init__(self, target: pygame.Surface, every: int = 1, show_sensors: bool = True):
+        """
+        Initialize a Renderer object.
+
+        :param target: The surface to draw on, e.g. the display; its width sets the scale.
+        :param every: Draw only every N-th tick.
+        :param show_sensors: Whether to draw the sensor beams and readings.
+        """
+        self.target = target
+        self.scale = target.get_width() / SURFACE_WIDTH
+        self.every = max(1, every)
+        self.show_sensors = show_sensors
+
+        self.background: Optional[pygame.Surface] = None
+        self.sprites: dict[tuple, pygame.Surface] = {}
+        self.texts: OrderedDict[str, pygame.Surface] = OrderedDict()
+        self.font = get_font(max(8, round(16 * self.scale)))
+        self.line_width = max(1, round(2 * self.scale))
+        self.drawn: list[pygame.Rect] = []  # Areas drawn on the last frame
+
+    def due(self, tick: int) -> bool:
+        """Whether the frame of the given tick should be drawn."""
+        return tick % self.every == 0
+
+    def draw(self, state: GameState) -> list[pygame.Rect]:
+        """
+        Draw the current frame of the game.
+
+        :param state: The game to draw.
+        :return: The areas of the target that changed.
+        """
+        target = self.target
+        if self.background is None:
+            self.background = self._build_background(state)
+            target.blit(self.background, (0, 0))
+            changed = [target.get_rect()]
+        else:
+            # Erase the last frame
+            for rect in self.drawn:
+                target.blit(self.background, rect, rect)
+            changed = list(self.drawn)
+
+        drawn = []
+        scale = self.scale
+        for car in state.cars:
+            x, y = int(car.x * scale), int(car.y * scale)
+            width, height = int(car.width * scale), int(car.height * scale)
+            color = (255, 0, 0) if car == state.ego else (0, 255, 0)
+            sprite = self._sprite(car, width, height)
+            if sprite is not None:
+                drawn.append(target.blit(sprite, (x, y)))
+                drawn.append(pygame.draw.rect(target, color, (x, y, width, height), 1))
+            else:
+                color = (255, 255, 0) if car == state.ego else (0, 0, 255)
+                drawn.append(pygame.draw.rect(target, color, (x, y, width, height)))
+
+        if self.show_sensors and state.sensors_enabled:
+            state.read_sensors()
+            for sensor in state.sensors:
+                start = (sensor.beam_start[0] * scale, sensor.beam_start[1] * scale)
+                end = (sensor.beam_end[0] * scale, sensor.beam_end[1] * scale)
+                drawn.append(
+                    pygame.draw.line(target, sensor.sensor_color, start, end, self.line_width)
+                )
+                if sensor.text:
+                    position = (
+                        start[0] + 0.3 * (end[0] - start[0]),
+                        start[1] + 0.3 * (end[1] - start[1]),
+                    )
+                    drawn.append(target.blit(self._text(sensor.text), position))
+
+        self.drawn = [rect.clip(target.get_rect()) for rect in drawn]
+        return changed + self.drawn
+
+    def _build_background(self, state: GameState) -> pygame.Surface:
+        """The road and walls at the target's size; they never move."""
+        full = state.road.surface.copy()
+        for wall in state.road.walls:
+            wall.draw(full)
+        return pygame.transform.smoothscale(full, self.target.get_size())
+
+    def _sprite(self, car, width: int, height: int) -> Optional[pygame.Surface]:
+        key = (car.sprite_path, width, height)
+        if key not in self.sprites:
+            sprite = car.sprite
+            self.sprites[key] = (
+                pygame.transform.smoothscale(sprite, (width, height)) if sprite else None
+            )
+        return self.sprites[key]
+
+    def _text(self, text: str) -> pygame.Surface:
+        surface = self.texts.get(text)
+        if surface is None:
+            surface = self.texts[text] = self.font.render(text, True, (255, 255, 255))
+            if len(self.texts) > TEXT_CACHE_SIZE:
+                self.texts.popitem(last=False)
+        else:
+            self.texts.move_to_end(text)
+        return surface
+
+
+class VideoWriter:
+    def __init__(self, path: str, size: tuple[int, int], fps: float):
+        """
+        Initialize a VideoWriter object, which pipes raw frames to ffmpeg.
+
+        :param path: The video file to write; ffmpeg picks the format from the suffix.
+        :param size: The (width, height) of the frames.
+        :param fps: The frame rate of the video.
+        """
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("Video export needs ffmpeg; render to a directory of PNG frames instead")
+        width, height = size
+        self.process = subprocess.Popen(
+            [
+                ffmpeg, "-loglevel", "error", "-y",
+                "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps),
+                "-i", "-",
+                "-pix_fmt", "yuv420p", path,
+            ],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, surface: pygame.Surface):
+        self.process.stdin.write(pygame.image.tobytes(surface, "RGB"))
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+def render_episode(
+    log: ActionLog,
+    out: str,
+    every: int = 1,
+    width: int = SCREEN_WIDTH,
+    fps: float = 60,
+) -> int:
+    """
+    Replay an action log and save its frames, without a display.
+
+    :param log: The action log to render.
+    :param out: A directory for PNG frames, or a video file (.mp4, .webm, ...; needs ffmpeg).
+    :param every: Save only every N-th tick.
+    :param width: The width of the frames; the height keeps the aspect ratio of the game.
+    :param fps: The frame rate of a video (divided by every, so it plays at game speed).
+    :return: The number of frames written.
+    """
+    size = (width, round(width * SURFACE_HEIGHT / SURFACE_WIDTH))
+    target = pygame.Surface(size)
+    renderer = Renderer(target, every=every)
+    replayer = Replayer(log)
+
+    writer = None
+    if out.lower().endswith(VIDEO_SUFFIXES):
+        writer = VideoWriter(out, size, fps / renderer.every)
+    else:
+        os.makedirs(out, exist_ok=True)
+
+    frames = 0
+    try:
+        while replayer.step():
+            state = replayer.state
+            if not renderer.due(state.ticks):
+                continue
+            renderer.draw(state)
+            if writer is not None:
+                writer.write(target)
+            else:
+                pygame.image.save(target, os.path.join(out, f"frame_{state.ticks:05d}.png"))
+            frames += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a race car action log to frames or a video")
+    parser.add_argument("log", help="Path to the binary action log")
+    parser.add_argument("out", help="Directory for PNG frames, or a video file such as game.mp4")
+    parser.add_argument("--every", type=int, default=1, help="Render every N-th tick")
+    parser.add_argument("--width", type=int, default=SCREEN_WIDTH, help="Width of the frames")
+    args = parser.parse_args()
+
+    frames = render_episode(ActionLog.load(args.log), args.out, every=args.every, width=args.width)
+    print(f"Wrote {frames} frames to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Deterministic replay of action logs.
+
+A game is fully determined by its seed, sensor_removal and the action of
+every tick, so an ActionLog is enough to rebuild the game at any tick. The
+Replayer plays the log on the headless engine and keeps a snapshot every
+few ticks; seeking to a tick restores the closest earlier snapshot and plays
+only the ticks after it, so inspecting a crash at any tick takes
+milliseconds once the ticks before it have been played.
+
+    python -m src.game.replay actions_log.bin --tick 1234
+"""
+
+import argparse
+from .action_log import ActionLog
+from .core import GameState, GameSnapshot
+from .headless import TICK_MS
+
+
+class Replayer:
+    def __init__(self, log: ActionLog, checkpoint_every: int = 100):
+        """
+        Initialize a Replayer object at tick 0.
+
+        :param log: The action log to replay.
+        :param checkpoint_every: The number of ticks between two snapshots.
+        """
+        if log.seed_value is None:
+            raise ValueError("The game was not seeded, so it cannot be replayed")
+        self.log = log
+        self.checkpoint_every = checkpoint_every
+        self.state = GameState.create("", log.seed_value, sensor_removal=log.sensor_removal)
+        self.checkpoints: dict[int, GameSnapshot] = {0: self.state.snapshot()}
+
+    def step(self) -> bool:
+        """
+        Play the next tick of the log.
+
+        :return: False if the game is over, so there was no tick to play.
+        """
+        state = self.state
+        if state.crashed or state.ticks >= len(self.log):
+            return False
+
+        state.elapsed_game_time += TICK_MS
+        state.ticks += 1
+        state.update_game(self.log.action(state.ticks))
+        state.check_collisions()
+
+        if state.ticks % self.checkpoint_every == 0:
+            self.checkpoints.setdefault(state.ticks, state.snapshot())
+        return True
+
+    def seek(self, tick: int) -> GameState:
+        """
+        Move the game to right after the given tick was played.
+
+        Stops early at the crash or at the end of the log; state.ticks is the
+        last tick played.
+
+        :param tick: The tick to move to (0 is the start of the game).
+        :return: The game state, which is reused by later calls.
+        """
+        start = max(t for t in self.checkpoints if t <= tick)
+        if not start <= self.state.ticks <= tick:
+            self.state.restore(self.checkpoints[start])
+        while self.state.ticks < tick and self.step():
+            pass
+        return self.state
+
+    def run(self) -> GameState:
+        """Play the whole log."""
+        return self.seek(len(self.log))
+
+
+def replay(log: ActionLog, tick: int | None = None) -> GameState:
+    """
+    Rebuild the game of an action log.
+
+    :param log: The action log to replay.
+    :param tick: The tick to stop after (default is the end of the log).
+    :return: The game state after the tick.
+    """
+    replayer = Replayer(log)
+    return replayer.run() if tick is None else replayer.seek(tick)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a race car action log")
+    parser.add_argument("log", help="Path to the binary action log")
+    parser.add_argument("--tick", type=int, default=None, help="Tick to stop after")
+    args = parser.parse_args()
+
+    log = ActionLog.load(args.log)
+    state = replay(log, args.tick)
+    print(f"Seed: {log.seed_value}, sensor removal: {log.sensor_removal}, ticks logged: {len(log)}")
+    print(
+        f"Tick: {state.ticks}, Crashed: {state.crashed}, Distance: {state.distance}, "
+        f"Ego: ({state.ego.x}, {state.ego.y}) v=({state.ego.velocity.x}, {state.ego.velocity.y})"
+    )
+    for car in state.cars:
+        if car != state.ego:
+            print(f"  Car {car.color}: ({car.x:.1f}, {car.y}) v={car.velocity.x:.2f}")
+    for sensor in state.sensors:
+        print(f"  {sensor.name}: {sensor.reading}")
+
+
+if __name__ == "__main__":
+    main()
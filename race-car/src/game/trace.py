@@ -0,0 +1,161 @@
+"""
+Columnar per-tick episode traces.
+
+A TraceRecorder writes one row per tick into preallocated NumPy arrays and
+saves the episode as one .npz file. Row t - 1 holds the state right after
+tick t was played:
+
+    sensors    (T, 16) float32  readings in SENSOR_NAMES order, NaN for None or removed sensors
+    ego_vx     (T,)    float64  ego velocity
+    ego_vy     (T,)    float64
+    ego_y      (T,)    float64  ego y-position (top of the car)
+    distance   (T,)    float64
+    action     (T,)    uint8    index into ACTION_NAMES of the action played
+    car_x      (T, 4)  float32  other cars' x-position relative to the ego car, NaN when off the road
+    car_y      (T, 4)  float32
+    car_vx     (T, 4)  float32
+    car_vy     (T, 4)  float32
+    crashed    (T,)    bool
+
+Every game has the same four other cars, so a car keeps its column for the
+whole episode. load_traces concatenates the columns of many episodes into
+single arrays, with an episode index per row.
+"""
+
+import numpy as np
+from .action_log import ACTION_CODES
+from .batch import SENSOR_NAMES, CAR_SLOTS
+from .core import GameState, MAX_TICKS
+
+COLUMNS = {
+    "sensors": (np.float32, (len(SENSOR_NAMES),)),
+    "ego_vx": (np.float64, ()),
+    "ego_vy": (np.float64, ()),
+    "ego_y": (np.float64, ()),
+    "distance": (np.float64, ()),
+    "action": (np.uint8, ()),
+    "car_x": (np.float32, (CAR_SLOTS,)),
+    "car_y": (np.float32, (CAR_SLOTS,)),
+    "car_vx": (np.float32, (CAR_SLOTS,)),
+    "car_vy": (np.float32, (CAR_SLOTS,)),
+    "crashed": (np.bool_, ()),
+}
+
+
+class TraceRecorder:
+    def __init__(self, state: GameState, max_ticks: int = MAX_TICKS):
+        """
+        Initialize a TraceRecorder object for a new game.
+
+        :param state: The game to record, before its first tick.
+        :param max_ticks: The number of rows to preallocate.
+        """
+        self.state = state
+        self.size = 0
+        self.columns = {
+            name: np.zeros((max_ticks + 1, *shape), dtype=dtype)
+            for name, (dtype, shape) in COLUMNS.items()
+        }
+        # All other cars start in the car bucket and keep their column
+        self.car_slots = {id(car): slot for slot, car in enumerate(state.car_bucket)}
+        self.sensor_columns = [SENSOR_NAMES.index(sensor.name) for sensor in state.sensors]
+
+    def record(self, action: str):
+        """
+        Record the tick that was just played.
+
+        :param action: The action played on the tick.
+        """
+        state = self.state
+        row = self.size
+        if row == len(self.columns["action"]):
+            self._grow()
+        c = self.columns
+
+        sensors = c["sensors"][row]
+        sensors[:] = np.nan
+        for column, sensor in zip(self.sensor_columns, state.sensors):
+            if sensor.reading is not None:
+                sensors[column] = sensor.reading
+
+        ego = state.ego
+        c["ego_vx"][row] = ego.velocity.x
+        c["ego_vy"][row] = ego.velocity.y
+        c["ego_y"][row] = ego.y
+        c["distance"][row] = state.distance
+        c["action"][row] = ACTION_CODES.get(action, 0)
+        c["crashed"][row] = state.crashed
+
+        for name in ("car_x", "car_y", "car_vx", "car_vy"):
+            c[name][row] = np.nan
+        for car in state.cars:
+            slot = self.car_slots.get(id(car))
+            if slot is None:
+                continue  # The ego car
+            c["car_x"][row, slot] = car.x - ego.x
+            c["car_y"][row, slot] = car.y
+            c["car_vx"][row, slot] = car.velocity.x
+            c["car_vy"][row, slot] = car.velocity.y
+
+        self.size += 1
+
+    def _grow(self):
+        for name, column in self.columns.items():
+            self.columns[name] = np.concatenate([column, np.zeros_like(column)])
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        """The recorded rows of every column."""
+        return {name: column[: self.size] for name, column in self.columns.items()}
+
+    def save(self, path: str, compressed: bool = False):
+        """
+        Save the episode as an .npz file.
+
+        :param path: The file to write.
+        :param compressed: Whether to zip-compress the columns (smaller, slower to load).
+        """
+        seed = self.state.seed_value
+        save = np.savez_compressed if compressed else np.savez
+        save(
+            path,
+            seed=np.array("" if seed is None else str(seed)),
+            sensor_removal=np.array(self.state.sensor_removal),
+            **self.arrays(),
+        )
+
+
+def load_trace(path: str) -> dict[str, np.ndarray]:
+    """
+    Load one episode saved by TraceRecorder.save.
+
+    :param path: The .npz file to read.
+    :return: The columns, plus the 'seed' and 'sensor_removal' of the game.
+    """
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def load_traces(paths: list[str]) -> dict[str, np.ndarray]:
+    """
+    Load many episodes into one array per column.
+
+    :param paths: The .npz files to read.
+    :return: The concatenated columns, plus 'episode' (the index into paths of
+        every row), 'offsets' (the first row of every episode, and the total
+        number of rows at the end) and 'seed' and 'sensor_removal' per episode.
+    """
+    traces = [load_trace(path) for path in paths]
+    lengths = [len(trace["action"]) for trace in traces]
+    out = {
+        name: np.concatenate([trace[name] for trace in traces])
+        if traces
+        else np.zeros((0, *shape), dtype=dtype)
+        for name, (dtype, shape) in COLUMNS.items()
+    }
+    out["episode"] = np.repeat(np.arange(len(traces)), lengths)
+    out["offsets"] = np.concatenate([[0], np.cumsum(lengths)]).astype(int)
+    out["seed"] = np.array([str(trace["seed"]) for trace in traces])
+    out["sensor_removal"] = np.array(
+        [int(trace["sensor_removal"]) for trace in traces], dtype=int
+    )
+    return out
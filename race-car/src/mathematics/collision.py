@@ -1,5 +1,5 @@
-import pygame
 from .vector import Vector  # Assuming a Vector class exists
+from .rect import Rect
 from typing import Optional, List
 
 
@@ -9,7 +9,7 @@ class Line:
         self.end = end
 
 
-def intersects(a: pygame.Rect, b: pygame.Rect) -> bool:
+def intersects(a: Rect, b: Rect) -> bool:
     """
     Check if two rectangles intersect.
 
@@ -56,7 +56,7 @@ def get_intersection_point(v: Line, u: Line) -> Optional[Vector]:
     return intersection
 
 
-def get_lines_of_rectangle(r: pygame.Rect) -> List[Line]:
+def get_lines_of_rectangle(r: Rect) -> List[Line]:
     """
     Get the lines (edges) of a rectangle.
 
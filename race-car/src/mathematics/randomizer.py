@@ -2,6 +2,17 @@ import random
 
 rng = None  # Global random number generator instance
 
+def create_rng(seed_value: str) -> random.Random:
+    """
+    Create a new random number generator seeded with the given seed value.
+
+    Each game owns its own generator, so games do not share random streams.
+
+    :param seed_value: The seed value as a string.
+    :return: The seeded random number generator.
+    """
+    return random.Random(seed_value)
+
 def seed(seed_value: str):
     """
     Seed the random number generator with the given seed value.
@@ -9,7 +20,7 @@ def seed(seed_value: str):
     :param seed_value: The seed value as a string.
     """
     global rng
-    rng = random.Random(seed_value)
+    rng = create_rng(seed_value)
     print(f"Seeded RNG with {seed_value}")
     print(rng)
 
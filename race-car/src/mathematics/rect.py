@@ -0,0 +1,74 @@
+class Rect:
+    """
+    Pure-Python stand-in for pygame.Rect.
+
+    Only the geometry used by the simulation is implemented. Coordinates are
+    truncated to integers exactly like pygame does, so collision checks and
+    sensor readings are identical with and without pygame.
+    """
+
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x: float, y: float, width: float, height: float):
+        """
+        Initialize a Rect object.
+
+        :param x: The x-coordinate of the top-left corner.
+        :param y: The y-coordinate of the top-left corner.
+        :param width: The width of the rectangle.
+        :param height: The height of the rectangle.
+        """
+        self.x = int(x)
+        self.y = int(y)
+        self.width = int(width)
+        self.height = int(height)
+
+    @property
+    def left(self) -> int:
+        return self.x
+
+    @property
+    def right(self) -> int:
+        return self.x + self.width
+
+    @property
+    def top(self) -> int:
+        return self.y
+
+    @property
+    def bottom(self) -> int:
+        return self.y + self.height
+
+    @property
+    def centerx(self) -> int:
+        return self.x + self.width // 2
+
+    @property
+    def centery(self) -> int:
+        return self.y + self.height // 2
+
+    def colliderect(self, other: "Rect") -> bool:
+        """
+        Check if this rectangle overlaps another one (same rules as pygame).
+
+        :param other: The other rectangle.
+        :return: True if the rectangles overlap, False otherwise.
+        """
+        if not (self.width and self.height and other.width and other.height):
+            return False
+        return (
+            self.x < other.x + other.width
+            and self.y < other.y + other.height
+            and self.x + self.width > other.x
+            and self.y + self.height > other.y
+        )
+
+    # Sequence protocol, so a Rect can be passed anywhere pygame expects a rect
+    def __len__(self) -> int:
+        return 4
+
+    def __getitem__(self, index: int) -> int:
+        return (self.x, self.y, self.width, self.height)[index]
+
+    def __repr__(self) -> str:
+        return f"Rect({self.x}, {self.y}, {self.width}, {self.height})"
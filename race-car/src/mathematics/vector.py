@@ -1,7 +1,25 @@
 import math
+from functools import lru_cache
 from typing import List
 
+
+@lru_cache(maxsize=None)
+def rotation(degrees: float) -> tuple[float, float]:
+    """
+    The cosine and sine of an angle in degrees, computed once per angle.
+
+    Sensors rotate by the same few angles over and over.
+
+    :param degrees: The angle in degrees.
+    :return: (cos, sin) of the angle.
+    """
+    radians = math.radians(degrees)
+    return math.cos(radians), math.sin(radians)
+
+
 class Vector:
+    __slots__ = ("x", "y")
+
     def __init__(self, x: float = 0, y: float = 0):
         """
         Initialize a Vector object.
@@ -67,6 +85,53 @@ class Vector:
         """
         return Vector(self.x - v.x, self.y - v.y)
 
+    def iadd(self, v):
+        """
+        Add another Vector or a scalar to this Vector in place.
+
+        :param v: A Vector or a scalar value.
+        :return: This Vector.
+        """
+        if isinstance(v, Vector):
+            self.x += v.x
+            self.y += v.y
+        else:
+            self.x += v
+            self.y += v
+        return self
+
+    def isub(self, v):
+        """
+        Subtract another Vector from this Vector in place.
+
+        :param v: A Vector to subtract.
+        :return: This Vector.
+        """
+        self.x -= v.x
+        self.y -= v.y
+        return self
+
+    def iscale(self, v: float):
+        """
+        Scale this Vector by a scalar value in place.
+
+        :param v: The scalar value to scale by.
+        :return: This Vector.
+        """
+        self.x *= v
+        self.y *= v
+        return self
+
+    def set(self, x: float, y: float):
+        """
+        Overwrite both coordinates.
+
+        :return: This Vector.
+        """
+        self.x = x
+        self.y = y
+        return self
+
     def scale(self, v: float):
         """
         Scale the Vector by a scalar value.
@@ -101,11 +166,8 @@ class Vector:
         :param degrees: The angle to rotate by, in degrees.
         :return: A new Vector with the rotated values.
         """
-        radians = math.radians(degrees)
-        return Vector(
-            math.cos(radians) * self.x - math.sin(radians) * self.y,
-            math.sin(radians) * self.x + math.cos(radians) * self.y
-        )
+        cos, sin = rotation(degrees)
+        return Vector(cos * self.x - sin * self.y, sin * self.x + cos * self.y)
 
     def distance(self, v):
         """
@@ -114,4 +176,4 @@ class Vector:
         :param v: Another Vector.
         :return: The distance as a float.
         """
-        return math.sqrt((v.x - self.x) ** 2 + (v.y - self.y) ** 2)
\ No newline at end of file
+        return math.sqrt((v.x - self.x) ** 2 + (v.y - self.y) ** 2)
@@ -0,0 +1,12 @@
+"""
+pygame, or None where it is not installed.
+
+Only drawing and game_loop use pygame; headless simulation (see
+game/headless.py) runs without it. Modules that need it for drawing
+import it from here.
+"""
+
+try:
+    import pygame
+except ImportError:
+    pygame = None
@@ -16,13 +16,14 @@ def test_game_with_api():
     # seed = 794775
 
     print("🚗 Starting race car game with API integration...")
-    print("API URL: http://localhost:8000")
+    print("API URL: http://localhost:9052 (start it with: python api.py)")
 
     # Initialize the game state with the API URL
     initialize_game_state(
-        api_url="http://localhost:8000",
+        api_url="http://localhost:9052",
         seed_value=seed,
         sensor_removal=0,  # Keep all sensors
+        use_api=True,  # Ask api.py over HTTP instead of calling the agent directly
     )
 
     print("✅ Game state initialized!")
@@ -34,7 +35,7 @@ def test_game_with_api():
         game_loop(
             verbose=True,  # Show the game window
             log_actions=False,
-            log_path="test_actions_log.json",
+            log_path="test_actions_log.bin",
         )
     except KeyboardInterrupt:
         print("\n🛑 Game stopped by user")
@@ -45,5 +46,23 @@ def test_game_with_api():
     print("Seed:", seed)
 
 
+def test_prefetch_with_api(seed: int = 104, prefetch_ticks: int = 5):
+    """Test that prefetching against the API keeps one game one episode."""
+    from http_agent import HttpAgent
+    from src.game.headless import run_headless
+
+    agent = HttpAgent("http://localhost:9052")
+    try:
+        state = run_headless(seed, agent=agent, prefetch_ticks=prefetch_ticks)
+    finally:
+        agent.close()
+
+    stats = agent.summary()
+    print("Prefetch:", state.statistics["prefetch"], "Requests:", stats["requests"])
+    # Asking again after a discarded batch repeats a tick, which must not start a new episode
+    assert len(agent.requests_per_episode) == 1, agent.requests_per_episode
+    assert stats["episode_requests"] == stats["requests"], stats
+
+
 if __name__ == "__main__":
     test_game_with_api()
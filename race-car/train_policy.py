@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Evolution-strategies trainer for MlpPolicy (see mlp_policy.py).
+
+Every generation:
+- Sample population // 2 Gaussian directions and evaluate the mean
+  parameters moved both ways along each (antithetic sampling).
+- Every candidate plays the same seeds (common random numbers). The
+  population is split into chunks over a process pool, and each chunk plays
+  all its (candidate, seed) episodes in lockstep on BatchGameState, with
+  one batched forward pass per tick for all episodes that need new actions.
+- The fitness of a candidate is its mean distance, which is the score of the
+  game (a crash ends the game, so it costs the distance not driven).
+- Move the mean along the rank-weighted directions with Adam.
+
+Every eval_every generations the mean is scored on fixed validation seeds
+and saved to --out when it is the best so far:
+
+    python train_policy.py --generations 100 --population 32 --seeds 4 --workers 8 --out policy.npz
+    RACE_CAR_AGENT=mlp RACE_CAR_POLICY=policy.npz python api.py
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mlp_policy import (
+    DURATIONS,
+    HIDDEN,
+    SENSOR_NAMES,
+    MlpPolicy,
+    batched_forward,
+    features,
+    init_params,
+)
+from src.game.batch import BatchGameState, SENSOR_NAMES as BATCH_SENSOR_NAMES
+from src.game.core import MAX_TICKS
+from src.game.headless import TICK_MS
+
+# Columns of BatchGameState.readings in the input order of the policy
+POLICY_COLUMNS = [BATCH_SENSOR_NAMES.index(name) for name in SENSOR_NAMES]
+
+
+def play_population(
+    params: np.ndarray,
+    seeds: list[int],
+    sensor_removal: int = 0,
+    max_ticks: int = MAX_TICKS,
+    hidden: int = HIDDEN,
+    durations: tuple = DURATIONS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Play every seed with every parameter vector, all episodes in lockstep.
+
+    The game is stepped like BatchGameState.step, so the distances are the
+    ones MlpPolicy would get from run_headless or through api.py.
+
+    :param params: (candidates, num_params) parameter vectors.
+    :param seeds: The seeds every candidate plays.
+    :return: The distances and crash flags, both (candidates, len(seeds)).
+    """
+    num_candidates = len(params)
+    owner = np.repeat(np.arange(num_candidates), len(seeds))
+    with contextlib.redirect_stdout(io.StringIO()):
+        batch = BatchGameState(
+            list(seeds) * num_candidates, sensor_removal=sensor_removal, agents=[None] * len(owner)
+        )
+    # Removed sensors read as nothing seen
+    present = np.zeros_like(batch.readings, dtype=bool)
+    for i, columns in enumerate(batch.sensor_columns):
+        present[i, columns] = True
+
+    codes = np.zeros(batch.size, dtype=int)
+    remaining = np.zeros(batch.size, dtype=int)
+    while batch.active.any():
+        batch.elapsed_game_time[batch.active] += TICK_MS
+        batch.ticks[batch.active] += 1
+        batch.active &= ~(batch.crashed | (batch.ticks > max_ticks))
+
+        rows = np.flatnonzero(batch.active & (remaining == 0))
+        if len(rows):
+            batch.read_sensors(rows)
+            sensors = np.where(present[rows], batch.readings[rows], np.nan)[:, POLICY_COLUMNS]
+            velocity = np.stack([batch.ego_vx[rows], batch.ego_vy[rows]], axis=1)
+            codes[rows], remaining[rows] = batched_forward(
+                params[owner[rows]], features(sensors, velocity), hidden, durations
+            )
+        remaining[batch.active] -= 1
+
+        batch.update_game(np.where(batch.active, codes, 0))
+        batch.check_collisions()
+
+    shape = (num_candidates, len(seeds))
+    return batch.distance.reshape(shape), batch.crashed.reshape(shape)
+
+
+def _play_chunk(params, seeds, sensor_removal, max_ticks, hidden, durations):
+    return play_population(params, seeds, sensor_removal, max_ticks, hidden, durations)
+
+
+def evaluate_population(
+    params: np.ndarray,
+    seeds: list[int],
+    workers: int = 1,
+    sensor_removal: int = 0,
+    max_ticks: int = MAX_TICKS,
+    hidden: int = HIDDEN,
+    durations: tuple = DURATIONS,
+    pool: ProcessPoolExecutor | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Play every seed with every parameter vector, split over a process pool.
+
+    :return: The distances and crash flags, both (candidates, len(seeds)).
+    """
+    args = (seeds, sensor_removal, max_ticks, hidden, durations)
+    if pool is None or workers <= 1:
+        return play_population(params, *args)
+    chunks = np.array_split(params, min(workers, len(params)))
+    futures = [pool.submit(_play_chunk, chunk, *args) for chunk in chunks]
+    results = [future.result() for future in futures]
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def centered_ranks(x: np.ndarray) -> np.ndarray:
+    """Fitness shaping: ranks scaled to [-0.5, 0.5], so only the order of the scores matters."""
+    ranks = np.empty(len(x))
+    ranks[x.argsort()] = np.arange(len(x))
+    return ranks / max(1, len(x) - 1) - 0.5
+
+
+class Adam:
+    def __init__(self, size: int, lr: float, beta1: float = 0.9, beta2: float = 0.999):
+        self.lr = lr
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.m = np.zeros(size)
+        self.v = np.zeros(size)
+        self.t = 0
+
+    def step(self, gradient: np.ndarray) -> np.ndarray:
+        """The update for a gradient to ascend."""
+        self.t += 1
+        self.m = self.beta1 * self.m + (1 - self.beta1) * gradient
+        self.v = self.beta2 * self.v + (1 - self.beta2) * gradient**2
+        m_hat = self.m / (1 - self.beta1**self.t)
+        v_hat = self.v / (1 - self.beta2**self.t)
+        return self.lr * m_hat / (np.sqrt(v_hat) + 1e-8)
+
+
+def train(
+    generations: int = 100,
+    population: int = 32,
+    seeds_per_generation: int = 4,
+    sigma: float = 0.05,
+    lr: float = 0.02,
+    weight_decay: float = 0.005,
+    validation_seeds: list[int] | None = None,
+    eval_every: int = 5,
+    sensor_removal: int = 0,
+    max_ticks: int = MAX_TICKS,
+    hidden: int = HIDDEN,
+    durations: tuple = DURATIONS,
+    workers: int = 1,
+    rng_seed: int = 0,
+    out: str | None = "policy.npz",
+) -> tuple[MlpPolicy, list[dict]]:
+    """
+    Train a MlpPolicy with antithetic evolution strategies.
+
+    :param generations: The number of updates of the mean.
+    :param population: Candidates per generation (rounded up to an even number).
+    :param seeds_per_generation: Seeds every candidate plays per generation; they
+        change every generation, from seed 10000 up, away from the usual test seeds.
+    :param sigma: The standard deviation of the parameter noise.
+    :param lr: The Adam learning rate.
+    :param weight_decay: Pulls the parameters toward zero, relative to lr.
+    :param validation_seeds: Seeds the mean is scored on (default 100..109).
+    :param eval_every: Generations between two validations.
+    :param workers: Processes to play episodes in.
+    :param out: Where to save the best validated policy (None to not save).
+    :return: The best validated policy and the history of the run.
+    """
+    rng = np.random.default_rng(rng_seed)
+    validation_seeds = validation_seeds or list(range(100, 110))
+    theta = init_params(rng, hidden, durations)
+    optimizer = Adam(len(theta), lr)
+    half = math.ceil(population / 2)
+    eval_args = dict(
+        workers=workers, sensor_removal=sensor_removal, max_ticks=max_ticks, hidden=hidden, durations=durations
+    )
+
+    history = []
+    best_score, best = -math.inf, MlpPolicy(theta, hidden, durations)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for generation in range(generations):
+            t0 = time.time()
+            seeds = list(range(10000 + generation * seeds_per_generation, 10000 + (generation + 1) * seeds_per_generation))
+            noise = rng.standard_normal((half, len(theta)))
+            candidates = np.concatenate([theta + sigma * noise, theta - sigma * noise])
+            distances, crashed = evaluate_population(candidates, seeds, pool=pool, **eval_args)
+
+            fitness = distances.mean(axis=1)
+            weights = centered_ranks(fitness)
+            gradient = (weights[:half] - weights[half:]) @ noise / (2 * half * sigma)
+            theta = theta + optimizer.step(gradient - weight_decay * theta)
+
+            entry = dict(
+                generation=generation,
+                mean_distance=float(fitness.mean()),
+                best_distance=float(fitness.max()),
+                crash_rate=float(crashed.mean()),
+                seconds=time.time() - t0,
+            )
+            if (generation + 1) % eval_every == 0 or generation == generations - 1:
+                val_distances, val_crashed = evaluate_population(theta[None], validation_seeds, pool=None, **eval_args)
+                entry["validation_distance"] = float(val_distances.mean())
+                entry["validation_crash_rate"] = float(val_crashed.mean())
+                if entry["validation_distance"] > best_score:
+                    best_score = entry["validation_distance"]
+                    best = MlpPolicy(theta.copy(), hidden, durations)
+                    if out:
+                        best.save(out)
+            history.append(entry)
+            print(
+                f"[{generation + 1:4d}/{generations}] dist={entry['mean_distance']:8.1f} "
+                f"best={entry['best_distance']:8.1f} crash={entry['crash_rate']:.1%} "
+                + (
+                    f"val={entry['validation_distance']:8.1f} val_crash={entry['validation_crash_rate']:.1%} "
+                    if "validation_distance" in entry
+                    else ""
+                )
+                + f"({entry['seconds']:.1f}s)"
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return best, history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a MlpPolicy with evolution strategies")
+    parser.add_argument("--generations", type=int, default=100)
+    parser.add_argument("--population", type=int, default=32, help="Candidates per generation")
+    parser.add_argument("--seeds", type=int, default=4, help="Seeds every candidate plays per generation")
+    parser.add_argument("--sigma", type=float, default=0.05, help="Standard deviation of the parameter noise")
+    parser.add_argument("--lr", type=float, default=0.02, help="Adam learning rate")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS, help="Shorter episodes train faster")
+    parser.add_argument("--sensor-removal", type=int, default=0)
+    parser.add_argument("--hidden", type=int, default=HIDDEN, help="Width of the hidden layer")
+    parser.add_argument("--workers", type=int, default=1, help="Processes to play episodes in")
+    parser.add_argument("--out", default="policy.npz", help="Where to save the best policy")
+    parser.add_argument("--history", default=None, help="Also write the training history to this JSON file")
+    args = parser.parse_args()
+
+    _, history = train(
+        generations=args.generations,
+        population=args.population,
+        seeds_per_generation=args.seeds,
+        sigma=args.sigma,
+        lr=args.lr,
+        sensor_removal=args.sensor_removal,
+        max_ticks=args.max_ticks,
+        hidden=args.hidden,
+        workers=args.workers,
+        out=args.out,
+    )
+    if args.history:
+        with open(args.history, "w") as f:
+            json.dump(history, f, indent=2)
+    print(f"Saved the best policy to {args.out}")
+
+
+if __name__ == "__main__":
+    main()